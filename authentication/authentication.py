@@ -0,0 +1,138 @@
+"""
+JWT authentication without a user query on every request.
+
+simplejwt's ``JWTAuthentication`` loads the whole user row for every
+authenticated request. ``CachedJWTAuthentication`` keeps the few fields the
+API needs (``USER_FIELDS``) in an in-process LRU cache with a time to live,
+and returns a ``User`` built from them with every other field deferred; a
+deferred field is loaded on first access.
+
+Saving or deleting a user, including deactivating them, evicts their entry
+in the process that made the change (see ``authentication.signals``). Other
+worker processes see the change once their entry expires, after at most
+``JWT_USER_CACHE_TTL`` seconds. Writes that bypass model signals, such as
+``QuerySet.update()``, must call ``user_cache.clear()``.
+
+With ``JWT_STATELESS_AUTH`` the user is built from the signed token claims
+alone (see ``authentication.tokens``) and the database is not consulted on
+ordinary requests. Refreshing a token always checks the user through the
+cache (``get_stored_user``), so a deactivated user keeps access until their
+current access token expires, or for up to ``JWT_USER_CACHE_TTL`` seconds
+longer if another worker still caches them as active. Tokens issued without
+the claims fall back to the cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# Loaded for the request user
+USER_FIELDS = ('id', 'email', 'name', 'is_active')
+# Token claims carrying the same fields in stateless mode
+USER_CLAIMS = ('email', 'name')
+
+
+class UserCache:
+    """
+    Thread-safe LRU cache of ``USER_FIELDS`` dicts by user id, sized and timed
+    by the ``JWT_USER_CACHE_SIZE`` and ``JWT_USER_CACHE_TTL`` settings
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = OrderedDict()
+        # Bumped by every eviction, so a row read before one is not stored
+        self.generation = 0
+
+    def get(self, user_id):
+        with self.lock:
+            item = self.rows.get(user_id)
+            if item is None:
+                return None
+            expires, row = item
+            if expires <= time.monotonic():
+                del self.rows[user_id]
+                return None
+            self.rows.move_to_end(user_id)
+            return row
+
+    def set(self, user_id, row, generation):
+        ttl = settings.JWT_USER_CACHE_TTL
+        if ttl <= 0:
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.rows[user_id] = (time.monotonic() + ttl, row)
+            self.rows.move_to_end(user_id)
+            while len(self.rows) > settings.JWT_USER_CACHE_SIZE:
+                self.rows.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.generation += 1
+            self.rows.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.rows.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if settings.JWT_STATELESS_AUTH and all(claim in validated_token for claim in USER_CLAIMS):
+            # Tokens are only issued to active users
+            return self.build_user({
+                'id': user_id,
+                **{claim: validated_token[claim] for claim in USER_CLAIMS},
+                'is_active': True,
+            })
+        return self.get_stored_user(validated_token)
+
+    def get_stored_user(self, validated_token):
+        """
+        Return the token's user from the cache or the database, ignoring
+        stateless claims; raise ``AuthenticationFailed`` for deleted and
+        deactivated users
+        """
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Needs the password hash, which is not cached
+            return super().get_user(validated_token)
+
+        row = user_cache.get(user_id)
+        if row is None:
+            generation = user_cache.generation
+            row = next(iter(
+                self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                .order_by().values(*USER_FIELDS)
+            ), None)
+            if row is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user_id, row, generation)
+
+        if not row['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return self.build_user(row)
+
+    def build_user(self, row):
+        # from_db() takes the values in model field order
+        names = [field.attname for field in self.user_model._meta.concrete_fields if field.attname in row]
+        return self.user_model.from_db(DEFAULT_DB_ALIAS, names, [row[name] for name in names])
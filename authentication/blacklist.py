@@ -0,0 +1,145 @@
+"""
+Refresh-token blacklist.
+
+A refresh token is blacklisted by inserting its ``jti`` into
+``BlacklistedToken``. The primary key makes that insert the authoritative
+check: when it fails, the token was already used (rotated or logged out), so
+rotating a token costs a single ``INSERT`` and no lookup.
+
+An in-memory Bloom filter per process holds the unexpired ``jti`` values of
+the table when the process first needs it, plus every token the process
+blacklisted since. Other processes' inserts are not in it, so a miss only
+means "not blacklisted as far as this process knows": ``contains()`` confirms
+misses against the table unless the caller is about to make the
+authoritative insert anyway, as a rotating refresh is. Then only a hit, true
+or false (about ``TOKEN_BLACKLIST_ERROR_RATE``), costs a query, and a reused
+token is rejected before the insert is attempted.
+
+A row is useless once its token has expired, so expired rows are deleted in
+batches: every ``TOKEN_BLACKLIST_PURGE_EVERY`` inserts in a process, and by
+the ``purge_token_blacklist`` management command.
+"""
+
+import hashlib
+import math
+import threading
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone as django_timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import BlacklistedToken
+
+
+class BloomFilter:
+    """
+    Set of strings with no false negatives and a false positive rate of
+    ``error_rate`` while it holds at most ``capacity`` items
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        positions = self.positions(key)
+        with self.lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+
+def expiry(token):
+    return datetime.fromtimestamp(token['exp'], tz=timezone.utc)
+
+
+def purge_expired(batch_size, now=None):
+    """
+    Delete one batch of rows whose token has expired; return the number
+    deleted
+    """
+    expired = BlacklistedToken.objects.filter(expires_at__lte=now or django_timezone.now())
+    batch = list(expired.order_by().values_list('pk', flat=True)[:batch_size])
+    if not batch:
+        return 0
+    return BlacklistedToken.objects.filter(pk__in=batch).delete()[0]
+
+
+class TokenBlacklist:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.filter = None
+        self.inserts = 0
+
+    def get_filter(self):
+        """
+        Return this process's filter, (re)building it from the table on first
+        use and once it holds more tokens than it was sized for
+        """
+        bloom = self.filter
+        if bloom is not None and bloom.count <= bloom.capacity:
+            return bloom
+        with self.lock:
+            if self.filter is bloom:
+                bloom = BloomFilter(
+                    max(settings.TOKEN_BLACKLIST_CAPACITY, BlacklistedToken.objects.count() * 2),
+                    settings.TOKEN_BLACKLIST_ERROR_RATE
+                )
+                unexpired = BlacklistedToken.objects.filter(expires_at__gt=django_timezone.now())
+                for jti in unexpired.values_list('jti', flat=True).iterator():
+                    bloom.add(jti)
+                self.filter = bloom
+            return self.filter
+
+    def contains(self, jti, confirm_misses=True):
+        """
+        Whether ``jti`` is blacklisted. Pass ``confirm_misses=False`` only
+        when ``blacklist()`` runs next and decides for tokens this process's
+        filter has not seen.
+        """
+        if not confirm_misses and jti not in self.get_filter():
+            return False
+        return BlacklistedToken.objects.filter(pk=jti).exists()
+
+    def blacklist(self, token):
+        """
+        Blacklist a validated refresh token. Return False when it already was,
+        i.e. when the token is being reused.
+        """
+        jti = token[api_settings.JTI_CLAIM]
+        bloom = self.get_filter()
+        try:
+            with transaction.atomic():
+                BlacklistedToken.objects.create(jti=jti, expires_at=expiry(token))
+        except IntegrityError:
+            bloom.add(jti)
+            return False
+        bloom.add(jti)
+
+        with self.lock:
+            self.inserts += 1
+            purge = self.inserts % settings.TOKEN_BLACKLIST_PURGE_EVERY == 0
+        if purge:
+            purge_expired(settings.TOKEN_BLACKLIST_PURGE_BATCH_SIZE)
+        return True
+
+    def reset(self):
+        self.filter = None
+
+
+token_blacklist = TokenBlacklist()
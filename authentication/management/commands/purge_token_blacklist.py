@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from authentication.blacklist import purge_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete blacklisted refresh tokens that have expired, in batches, so "
+        "the blacklist only holds tokens that could still be used."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.TOKEN_BLACKLIST_PURGE_BATCH_SIZE,
+            help=f"Rows deleted per query (default: {settings.TOKEN_BLACKLIST_PURGE_BATCH_SIZE}).",
+        )
+
+    def handle(self, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        started = time.perf_counter()
+        now = timezone.now()
+        deleted = 0
+        while True:
+            batch = purge_expired(batch_size, now)
+            if not batch:
+                break
+            deleted += batch
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Deleted {deleted} tokens")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} expired blacklisted tokens in {elapsed:.2f}s."
+        ))
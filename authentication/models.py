@@ -13,3 +13,14 @@ class User(AbstractUser):
     
     def __str__(self):
         return self.email
+
+class BlacklistedToken(models.Model):
+    """
+    Refresh token that may no longer be used, by its ``jti`` claim. Rows are
+    purged once the token has expired (see ``authentication.blacklist``).
+    """
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
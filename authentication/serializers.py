@@ -1,6 +1,10 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.password_validation import validate_password
+from .blacklist import token_blacklist
 
 User = get_user_model()
 
@@ -55,4 +59,23 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'name', 'email', 'username', 'date_joined')
-        read_only_fields = ('id', 'date_joined')
\ No newline at end of file
+        read_only_fields = ('id', 'date_joined')
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """
+    A signed, unexpired refresh token that is not blacklisted. Invalid
+    tokens are rejected with 401, like an invalid access token.
+    """
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, value):
+        try:
+            token = RefreshToken(value)
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+        # Refresh with rotation and logout both blacklist the token next,
+        # and that insert catches what this process's filter misses
+        inserts = api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION
+        if token_blacklist.contains(token[api_settings.JTI_CLAIM], confirm_misses=not inserts):
+            raise InvalidToken('Token is blacklisted')
+        return token
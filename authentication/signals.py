@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Evict the user from the authentication cache now, and again once the
+    write commits in case a request cached the old row in between
+    """
+    user_pk = instance.pk
+    user_cache.discard(user_pk)
+    transaction.on_commit(lambda: user_cache.discard(user_pk))
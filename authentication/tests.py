@@ -1,3 +1,256 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import views
+from .authentication import user_cache
+from .blacklist import BloomFilter, token_blacklist
+from .models import BlacklistedToken
+from .tokens import tokens_for_user
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    """
+    JWT authentication answers from the user cache, and every change to the
+    user evicts it
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+
+    def setUp(self):
+        user_cache.clear()
+        self.authenticate(RefreshToken.for_user(self.user).access_token)
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def get_dashboard(self, user_queries):
+        """
+        GET the dashboard, which runs two queries besides loading the user
+        """
+        with self.assertNumQueries(user_queries + 2):
+            return self.client.get(reverse('dashboard'))
+
+    def test_user_is_cached(self):
+        self.assertEqual(self.get_dashboard(1).status_code, 200)
+        self.assertEqual(self.get_dashboard(0).status_code, 200)
+
+    def test_cached_user_has_the_profile_fields(self):
+        from .authentication import CachedJWTAuthentication
+
+        token = AccessToken.for_user(self.user)
+        authentication = CachedJWTAuthentication()
+        authentication.get_user(token)
+        with self.assertNumQueries(0):
+            user = authentication.get_user(token)
+            self.assertEqual((user.pk, user.email, user.name, user.is_active), (self.user.pk, 'owner@example.test', 'Owner', True))
+        # Other fields are loaded on access
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, 'owner')
+
+    def test_save_and_deactivation_evict(self):
+        self.get_dashboard(1)
+        self.user.name = 'Renamed'
+        self.user.save()
+        self.get_dashboard(1)
+        self.user.is_active = False
+        self.user.save()
+        # Refused after loading the user, before the view runs
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'User is inactive')
+
+    def test_delete_evicts(self):
+        self.get_dashboard(1)
+        self.user.delete()
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 401)
+
+    def test_entries_expire(self):
+        with mock.patch('authentication.authentication.time.monotonic', return_value=1000.0):
+            self.get_dashboard(1)
+            self.get_dashboard(0)
+        with mock.patch('authentication.authentication.time.monotonic', return_value=1061.0):
+            self.get_dashboard(1)
+
+    @override_settings(JWT_USER_CACHE_SIZE=1)
+    def test_least_recently_used_entries_are_evicted(self):
+        other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+        self.get_dashboard(1)
+        self.authenticate(RefreshToken.for_user(other).access_token)
+        self.get_dashboard(1)
+        self.authenticate(RefreshToken.for_user(self.user).access_token)
+        self.get_dashboard(1)
+
+    @override_settings(JWT_USER_CACHE_TTL=0)
+    def test_cache_can_be_disabled(self):
+        self.get_dashboard(1)
+        self.get_dashboard(1)
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_mode_trusts_the_claims(self):
+        self.authenticate(tokens_for_user(self.user).access_token)
+        self.assertEqual(self.get_dashboard(0).status_code, 200)
+        # Tokens without the claims fall back to the cache
+        self.authenticate(RefreshToken.for_user(self.user).access_token)
+        self.get_dashboard(1)
+        self.get_dashboard(0)
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_login_issues_stateless_tokens(self):
+        self.client.credentials()
+        response = self.client.post(reverse('login'), {
+            'email': 'owner@example.test', 'password': 'Owner-Pass-123'
+        }, format='json')
+        token = AccessToken(response.json()['tokens']['access'])
+        self.assertEqual((token['email'], token['name']), ('owner@example.test', 'Owner'))
+
+
+class TokenBlacklistTests(APITestCase):
+    """
+    Refresh tokens rotate, work once, and can be revoked by logging out
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+
+    def setUp(self):
+        user_cache.clear()
+        token_blacklist.reset()
+
+    def refresh(self, token):
+        return self.client.post(reverse('token-refresh'), {'refresh': str(token)}, format='json')
+
+    def test_refresh_rotates_the_token(self):
+        token = RefreshToken.for_user(self.user)
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        tokens = response.json()['tokens']
+        self.assertNotEqual(RefreshToken(tokens['refresh'])['jti'], token['jti'])
+        self.assertEqual(AccessToken(tokens['access'])['user_id'], self.user.pk)
+        self.assertTrue(BlacklistedToken.objects.filter(jti=token['jti']).exists())
+        # The new token works once too
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 200)
+
+    def test_reused_token_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)
+        # Answered from this process's filter, without an insert
+        with self.assertNumQueries(1):
+            response = self.refresh(token)
+        self.assertEqual(response.status_code, 401)
+
+    def test_insert_catches_reuse_the_filter_missed(self):
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)
+        # A fresh filter that has not seen the token, as in another process
+        token_blacklist.filter = BloomFilter(100, 0.01)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_invalid_and_inactive(self):
+        self.assertEqual(self.refresh('not-a-token').status_code, 401)
+        self.assertEqual(self.refresh(RefreshToken.for_user(self.user).access_token).status_code, 401)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.refresh(RefreshToken.for_user(self.user)).status_code, 401)
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_refresh_checks_the_user(self):
+        token = tokens_for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.refresh(tokens_for_user(self.user)).status_code, 401)
+
+    @mock.patch.object(views.api_settings, 'ROTATE_REFRESH_TOKENS', False)
+    def test_without_rotation(self):
+        token = RefreshToken.for_user(self.user)
+        for _ in range(2):
+            response = self.refresh(token)
+            self.assertEqual(list(response.json()['tokens']), ['access'])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+    def test_logout(self):
+        token = RefreshToken.for_user(self.user)
+        response = self.client.post(reverse('logout'), {'refresh': str(token)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_filter_is_loaded_from_the_table(self):
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)
+        token_blacklist.reset()
+        self.assertIn(token['jti'], token_blacklist.get_filter())
+        self.assertTrue(token_blacklist.contains(token['jti']))
+        with self.assertNumQueries(0):
+            self.assertFalse(token_blacklist.contains('never-issued', confirm_misses=False))
+        # Misses are confirmed against the table by default
+        with self.assertNumQueries(1):
+            self.assertFalse(token_blacklist.contains('never-issued'))
+
+    @mock.patch.object(views.api_settings, 'ROTATE_REFRESH_TOKENS', False)
+    def test_logout_in_another_process_is_seen(self):
+        from .blacklist import TokenBlacklist
+
+        token = RefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        # Another worker, whose filter was loaded before, blacklists it
+        token_blacklist.get_filter()
+        with mock.patch('authentication.views.token_blacklist', TokenBlacklist()):
+            self.client.post(reverse('logout'), {'refresh': str(token)}, format='json')
+        self.assertNotIn(token['jti'], token_blacklist.get_filter())
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000, 0.01)
+        members = [f'member-{i}' for i in range(1000)]
+        for member in members:
+            bloom.add(member)
+        self.assertTrue(all(member in bloom for member in members))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_expired_tokens_are_purged(self):
+        from datetime import timedelta
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        now = timezone.now()
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(jti=f'expired-{i}', expires_at=now - timedelta(seconds=1)) for i in range(5)]
+            + [BlacklistedToken(jti='live', expires_at=now + timedelta(days=1))]
+        )
+        out = StringIO()
+        call_command('purge_token_blacklist', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 5 expired', out.getvalue())
+        self.assertEqual(list(BlacklistedToken.objects.values_list('jti', flat=True)), ['live'])
+
+    @override_settings(TOKEN_BLACKLIST_PURGE_EVERY=2)
+    def test_inserts_purge_expired_tokens(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        BlacklistedToken.objects.create(jti='expired', expires_at=timezone.now() - timedelta(seconds=1))
+        token_blacklist.inserts = 0
+        self.refresh(RefreshToken.for_user(self.user))
+        self.assertTrue(BlacklistedToken.objects.filter(jti='expired').exists())
+        self.refresh(RefreshToken.for_user(self.user))
+        self.assertFalse(BlacklistedToken.objects.filter(jti='expired').exists())
@@ -0,0 +1,17 @@
+from django.conf import settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import USER_CLAIMS
+
+
+def tokens_for_user(user):
+    """
+    Return a refresh token for ``user``. In stateless mode it carries the
+    ``USER_CLAIMS``, which its access tokens inherit, so authentication can
+    build the user without a query (see ``authentication.authentication``).
+    """
+    refresh = RefreshToken.for_user(user)
+    if settings.JWT_STATELESS_AUTH:
+        for claim in USER_CLAIMS:
+            refresh[claim] = getattr(user, claim)
+    return refresh
@@ -4,4 +4,6 @@ from . import views
 urlpatterns = [
     path('register/', views.register, name='register'),
     path('login/', views.login, name='login'),
+    path('token/refresh/', views.refresh_token, name='token-refresh'),
+    path('logout/', views.logout, name='logout'),
 ]
\ No newline at end of file
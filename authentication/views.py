@@ -2,12 +2,19 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import get_user_model
-from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
+from healthcare_backend.db.routers import pin_to_primary
+from healthcare_backend.throttling import throttle_scope
+from .authentication import CachedJWTAuthentication
+from .blacklist import token_blacklist
+from .serializers import RefreshTokenSerializer, UserRegistrationSerializer, UserLoginSerializer, UserSerializer
+from .tokens import tokens_for_user
 
 User = get_user_model()
 
+@throttle_scope('register')
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -17,9 +24,11 @@ def register(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
+        # The new user's first requests must not miss their row on a replica
+        pin_to_primary(user.pk)
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         
         return Response({
             'message': 'User registered successfully',
@@ -32,6 +41,7 @@ def register(request):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@throttle_scope('login')
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
@@ -43,7 +53,7 @@ def login(request):
         user = serializer.validated_data['user']
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         
         return Response({
             'message': 'Login successful',
@@ -55,3 +65,46 @@ def login(request):
         }, status=status.HTTP_200_OK)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def refresh_token(request):
+    """
+    Return a new access token for a refresh token. With ROTATE_REFRESH_TOKENS
+    a new refresh token is returned too, and with BLACKLIST_AFTER_ROTATION
+    the old one is blacklisted, so it works only once.
+    """
+    serializer = RefreshTokenSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    refresh = serializer.validated_data['refresh']
+
+    # Deleted and deactivated users get no new tokens, even though stateless
+    # access tokens would let them through
+    CachedJWTAuthentication().get_stored_user(refresh)
+
+    tokens = {'access': str(refresh.access_token)}
+    if api_settings.ROTATE_REFRESH_TOKENS:
+        # The insert decides between two requests racing with the same token
+        if api_settings.BLACKLIST_AFTER_ROTATION and not token_blacklist.blacklist(refresh):
+            raise InvalidToken('Token is blacklisted')
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        tokens['refresh'] = str(refresh)
+
+    return Response({
+        'message': 'Token refreshed successfully',
+        'tokens': tokens
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def logout(request):
+    """
+    Blacklist a refresh token. Access tokens already issued stay valid until
+    they expire.
+    """
+    serializer = RefreshTokenSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    token_blacklist.blacklist(serializer.validated_data['refresh'])
+    return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
@@ -0,0 +1,68 @@
+"""
+Benchmark doctor autocomplete lookups against the in-process prefix index.
+
+Seeds a throwaway test database with doctors, builds the index once, then
+times lookups for prefixes of increasing length and reports the median and
+99th percentile latency in microseconds.
+
+Usage:
+    python benchmarks/autocomplete.py [--rows 50000] [--lookups 2000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000, help="Doctors in the directory (default: 50000).")
+    parser.add_argument('--lookups', type=int, default=2000, help="Lookups per prefix (default: 2000).")
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    from doctors.autocomplete import doctor_index
+    from healthcare_backend.testing import seed_dataset
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user = get_user_model().objects.create_user(
+            email='bench@example.test', username='bench', name='Bench', password='Bench-Pass-123'
+        )
+        seed_dataset(user, args.rows)
+
+        started = time.perf_counter()
+        doctor_index.search('warm up', 1)
+        print(f"Built the index over {args.rows} doctors in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        print(f"{'prefix':<16}{'available only':>16}{'p50 us':>10}{'p99 us':>10}")
+        for prefix in ('d', 'doc', 'doctor 0', 'doctor 0001', 'card', 'neuro'):
+            for is_available in (None, True):
+                timings = []
+                for _ in range(args.lookups):
+                    started = time.perf_counter()
+                    doctor_index.search(prefix, 10, is_available=is_available)
+                    timings.append((time.perf_counter() - started) * 1e6)
+                timings.sort()
+                p99 = timings[int(len(timings) * 0.99) - 1]
+                print(f"{prefix:<16}{str(bool(is_available)):>16}{statistics.median(timings):>10.1f}{p99:>10.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""
+Benchmark the read endpoints under concurrent load, ASGI against WSGI.
+
+Seeds a throwaway test database, starts each server in a subprocess against
+it, and drives the patient and doctor list/detail and care team GETs from
+100 to 1,000 concurrent keep-alive clients. Reports throughput and the
+median and 99th percentile latency per server and concurrency level.
+
+Servers:
+    wsgi       - the WSGI application under ``--wsgi-command``
+    asgi-sync  - the ASGI application with the sync views (ASYNC_VIEWS=False)
+    asgi       - the ASGI application with the native async read views
+
+Usage:
+    python benchmarks/concurrency.py [--rows 2000] [--clients 100,250,500,1000]
+                                     [--duration 10] [--servers wsgi,asgi-sync,asgi]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
+
+WSGI_COMMAND = f'{sys.executable} -m gunicorn --config gunicorn.conf.py --bind 127.0.0.1:{{port}} --workers 1 ' \
+               'healthcare_backend.wsgi:application'
+ASGI_COMMAND = f'{sys.executable} -m uvicorn healthcare_backend.asgi:application --port {{port}} ' \
+               '--no-access-log --log-level warning'
+
+
+def database_url(settings_dict):
+    """
+    URL of the test database for the server subprocesses
+    """
+    if settings_dict['ENGINE'].endswith('sqlite3'):
+        return f"sqlite:///{settings_dict['NAME']}"
+    credentials = quote(settings_dict['USER'] or '')
+    if settings_dict['PASSWORD']:
+        credentials += ':' + quote(settings_dict['PASSWORD'])
+    host = settings_dict['HOST'] or 'localhost'
+    port = f":{settings_dict['PORT']}" if settings_dict['PORT'] else ''
+    return f"postgres://{credentials}@{host}{port}/{settings_dict['NAME']}"
+
+
+async def read_response(reader):
+    """
+    Read one HTTP/1.1 response; return ``(status, keep_alive)``
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    elif status not in (204, 304):
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close' and lines[0].startswith('HTTP/1.1')
+
+
+async def run_client(port, requests, offset, deadline, timings, errors):
+    reader = writer = None
+    sent = offset
+    while time.perf_counter() < deadline:
+        request = requests[sent % len(requests)]
+        sent += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            status, keep_alive = await asyncio.wait_for(read_response(reader), 60)
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+            errors.append(None)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        if status == 200:
+            timings.append(time.perf_counter() - started)
+        else:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, requests, clients, duration):
+    timings, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        run_client(port, requests, offset, deadline, timings, errors)
+        for offset in range(clients)
+    ))
+    return timings, errors
+
+
+def wait_until_serving(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not listen on port {port} within {timeout} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000, help="Patients and doctors (default: 2000).")
+    parser.add_argument('--clients', default='100,250,500,1000',
+                        help="Comma-separated concurrency levels (default: 100,250,500,1000).")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per level (default: 10).")
+    parser.add_argument('--servers', default='wsgi,asgi-sync,asgi',
+                        help="Comma-separated servers to compare (default: wsgi,asgi-sync,asgi).")
+    parser.add_argument('--wsgi-command', default=WSGI_COMMAND,
+                        help="WSGI server command; {port} is substituted (default: gunicorn, one worker).")
+    parser.add_argument('--asgi-command', default=ASGI_COMMAND,
+                        help="ASGI server command; {port} is substituted (default: uvicorn, one worker).")
+    parser.add_argument('--port', type=int, default=8765, help="Port the servers listen on (default: 8765).")
+    args = parser.parse_args()
+
+    # One descriptor per client connection on each side
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    import django
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from healthcare_backend.testing import seed_dataset
+    from mappings.models import PatientDoctorMapping
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    if connection.vendor == 'sqlite':
+        # The servers run in other processes, so the database must be a file
+        workdir = tempfile.TemporaryDirectory()
+        connection.settings_dict['TEST']['NAME'] = str(Path(workdir.name) / 'concurrency.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user = get_user_model().objects.create_user(
+            email='bench@example.test', username='bench', name='Bench', password='Bench-Pass-123'
+        )
+        patients, doctors, _ = seed_dataset(user, args.rows)
+        # A care team of ordinary size; the first patient sees every doctor
+        PatientDoctorMapping.objects.bulk_create([
+            PatientDoctorMapping(patient=patients[1], doctor=doctor) for doctor in doctors[:5]
+        ])
+        token = RefreshToken.for_user(user).access_token
+        paths = [
+            reverse('patient-list-create'),
+            reverse('patient-detail', args=[patients[2].pk]),
+            reverse('doctor-list-create'),
+            reverse('doctor-detail', args=[doctors[2].pk]),
+            reverse('patient-doctors', args=[patients[1].pk]),
+        ]
+        requests = [
+            f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n\r\n'.encode('ascii')
+            for path in paths
+        ]
+        env = {
+            **os.environ,
+            'DATABASE_URL': database_url(connection.settings_dict),
+            'DEBUG': 'False',
+            'ALLOWED_HOSTS': '127.0.0.1',
+        }
+        servers = {
+            'wsgi': (args.wsgi_command, {}),
+            'asgi-sync': (args.asgi_command, {'ASYNC_VIEWS': 'False'}),
+            'asgi': (args.asgi_command, {'ASYNC_VIEWS': 'True'}),
+        }
+        levels = [int(level) for level in args.clients.split(',')]
+
+        logs = tempfile.mkdtemp(prefix='concurrency-')
+        print(f"Server output is written to {logs}")
+        print(f"{'server':<12}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name in args.servers.split(','):
+            command, extra_env = servers[name]
+            log = open(Path(logs) / f'{name}.log', 'wb')
+            process = subprocess.Popen(
+                shlex.split(command.format(port=args.port)),
+                cwd=ROOT,
+                env={**env, **extra_env},
+                stdout=log,
+                stderr=subprocess.STDOUT
+            )
+            try:
+                wait_until_serving(args.port, process)
+                # Warm up connections, caches and the first-request imports
+                asyncio.run(load(args.port, requests, 10, 1))
+                for clients in levels:
+                    timings, errors = asyncio.run(load(args.port, requests, clients, args.duration))
+                    timings.sort()
+                    p50 = statistics.median(timings) * 1000 if timings else float('nan')
+                    p99 = timings[max(0, int(len(timings) * 0.99) - 1)] * 1000 if timings else float('nan')
+                    print(f"{name:<12}{clients:>8}{len(timings) / args.duration:>10.0f}"
+                          f"{p50:>10.1f}{p99:>10.1f}{len(errors):>8}")
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+                log.close()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
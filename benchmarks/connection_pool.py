@@ -0,0 +1,117 @@
+"""
+Benchmark the per-request cost of pooled PostgreSQL connections.
+
+Replays Django's request lifecycle with ``CONN_MAX_AGE = 0`` - connect on the
+first query, run it, close when the request finishes - against the configured
+PostgreSQL database, once with Django's own backend (a new connection per
+request) and once with the pooled backend (a checkout and checkin). Reports
+requests per second and the median and 99th percentile request latency, from
+one or more threads sharing the process's pool.
+
+Requires a PostgreSQL database (``DATABASE_URL`` or ``DB_NAME``/``DB_USER``).
+
+Usage:
+    python benchmarks/connection_pool.py [--requests 2000] [--threads 1,4,16]
+                                         [--query "SELECT 1"]
+"""
+
+import argparse
+import copy
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
+
+PLAIN_ENGINE = 'django.db.backends.postgresql'
+POOL_ENGINE = 'healthcare_backend.db.backends.postgresql_pool'
+
+
+def serve(wrapper_class, settings_dict, alias, requests, query, timings):
+    # Database wrappers belong to the thread that made them, as in Django
+    connection = wrapper_class(settings_dict, alias)
+    for _ in range(requests):
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            cursor.fetchall()
+        # What the request_finished signal does with CONN_MAX_AGE = 0
+        connection.close_if_unusable_or_obsolete()
+        timings.append(time.perf_counter() - started)
+    connection.close()
+
+
+def run(wrapper_class, settings_dict, alias, requests, threads, query):
+    timings = []
+    workers = [
+        threading.Thread(
+            target=serve,
+            args=(wrapper_class, settings_dict, alias, requests // threads, query, timings)
+        )
+        for _ in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sorted(timings), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per case (default: 2000).")
+    parser.add_argument('--threads', default='1,4,16',
+                        help="Comma-separated numbers of concurrent threads (default: 1,4,16).")
+    parser.add_argument('--query', default='SELECT 1', help="Query each request runs (default: SELECT 1).")
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.db import DEFAULT_DB_ALIAS
+    from django.db.utils import OperationalError, load_backend
+
+    from healthcare_backend.db.pool import pool_stats
+
+    configured = settings.DATABASES[DEFAULT_DB_ALIAS]
+    if configured['ENGINE'] not in (PLAIN_ENGINE, POOL_ENGINE):
+        raise SystemExit("This benchmark needs PostgreSQL: set DATABASE_URL or DB_NAME and DB_USER.")
+
+    plain = copy.deepcopy(configured)
+    plain.update(ENGINE=PLAIN_ENGINE, CONN_MAX_AGE=0)
+    plain['OPTIONS'].pop('pool', None)
+    pooled = copy.deepcopy(configured)
+    pooled.update(ENGINE=POOL_ENGINE, CONN_MAX_AGE=0)
+    pooled['OPTIONS'].setdefault('pool', dict(settings.DB_POOL_OPTIONS))
+    levels = [int(level) for level in args.threads.split(',')]
+    # Every thread may hold a connection at once
+    pooled['OPTIONS']['pool']['max_size'] = max(levels + [pooled['OPTIONS']['pool'].get('max_size', 10)])
+
+    probe = load_backend(PLAIN_ENGINE).DatabaseWrapper(plain, DEFAULT_DB_ALIAS)
+    try:
+        probe.ensure_connection()
+    except OperationalError as exc:
+        raise SystemExit(f"Cannot connect to PostgreSQL: {exc}")
+    probe.close()
+
+    print(f"{'backend':<10}{'threads':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, settings_dict in (('direct', plain), ('pooled', pooled)):
+        wrapper_class = load_backend(settings_dict['ENGINE']).DatabaseWrapper
+        # Warm up: imports, and the pool's first connections
+        run(wrapper_class, settings_dict, DEFAULT_DB_ALIAS, max(levels), max(levels), args.query)
+        for threads in levels:
+            timings, elapsed = run(wrapper_class, settings_dict, DEFAULT_DB_ALIAS, args.requests, threads, args.query)
+            p99 = timings[max(0, int(len(timings) * 0.99) - 1)]
+            print(f"{name:<10}{threads:>8}{len(timings) / elapsed:>10.0f}"
+                  f"{statistics.median(timings) * 1000:>10.2f}{p99 * 1000:>10.2f}")
+    print(f"Pool: {pool_stats().get(DEFAULT_DB_ALIAS)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Time the read endpoints against a recorded baseline.
+
+Seeds a throwaway test database at each dataset size, issues every GET in
+``explain_hotpaths.HOTPATHS`` with the response cache bypassed, and records
+the best wall time and the response size per request in a JSON baseline. A
+run fails when a request is slower than the baseline by more than
+``--threshold`` times (plus ``--time-slack`` seconds of noise) or its response
+grew by more than ``--threshold`` times. New requests are added to the
+baseline; existing entries are only replaced with ``--update``.
+
+Usage:
+    python benchmarks/endpoints.py BASELINE.json [--rows 10,1000,10000] [--repeat 5]
+                                   [--threshold 1.5] [--time-slack 0.025] [--update]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
+
+
+class PerformanceBaseline:
+    """
+    Wall time and response size per request, compared against the values
+    previously recorded in ``path``
+    """
+
+    def __init__(self, path, threshold, time_slack, update):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.time_slack = time_slack
+        self.update = update
+        self.baseline = self.load()
+        self.results = {}
+
+    def load(self):
+        try:
+            with open(self.path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def check(self, key, seconds, size):
+        """
+        Record a measurement and return a list of regression messages,
+        empty when the measurement is within the threshold
+        """
+        self.results[key] = {'seconds': round(seconds, 6), 'bytes': size}
+        previous = self.baseline.get(key)
+        if previous is None or self.update:
+            return []
+
+        problems = []
+        if seconds > previous['seconds'] * self.threshold + self.time_slack:
+            problems.append(
+                f"{key}: {seconds:.4f}s exceeds baseline {previous['seconds']:.4f}s x{self.threshold}"
+            )
+        if size > previous['bytes'] * self.threshold:
+            problems.append(
+                f"{key}: {size} bytes exceeds baseline {previous['bytes']} bytes x{self.threshold}"
+            )
+        return problems
+
+    def save(self):
+        """
+        Merge this run's measurements into the baseline file
+        """
+        merged = self.load()
+        for key, value in self.results.items():
+            if self.update or key not in merged:
+                merged[key] = value
+        with open(self.path, 'w') as fh:
+            json.dump(merged, fh, indent=2, sort_keys=True)
+            fh.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline', help="Baseline JSON file, created on the first run.")
+    parser.add_argument('--rows', default='10,1000,10000', help="Dataset sizes (default: 10,1000,10000).")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per request; the best is kept (default: 5).")
+    parser.add_argument('--threshold', type=float, default=1.5, help="Allowed ratio over the baseline (default: 1.5).")
+    parser.add_argument('--time-slack', type=float, default=0.025,
+                        help="Seconds over the baseline ignored as noise (default: 0.025).")
+    parser.add_argument('--update', action='store_true', help="Replace existing baseline entries.")
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import connection, transaction
+    from django.test import override_settings
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from healthcare_backend.testing import seed_dataset
+    from mappings.management.commands.explain_hotpaths import HOTPATHS
+
+    baseline = PerformanceBaseline(args.baseline, args.threshold, args.time_slack, args.update)
+    problems = []
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    dummy_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    try:
+        print(f"{'request':<72}{'ms':>10}{'bytes':>12}")
+        for rows in (int(size) for size in args.rows.split(',')):
+            with override_settings(CACHES=dummy_cache, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), \
+                    transaction.atomic():
+                user = get_user_model().objects.create_user(
+                    email='bench@example.test', username='bench', name='Bench', password='Bench-Pass-123'
+                )
+                patients, doctors, _ = seed_dataset(user, rows)
+                seeded = {'patient': patients[0].pk, 'doctor': doctors[0].pk}
+                client = APIClient()
+                client.force_authenticate(user)
+                for route, url_args, params in HOTPATHS:
+                    url = reverse(route, args=[seeded.get(arg, arg) for arg in url_args])
+                    timings = []
+                    for _ in range(args.repeat):
+                        started = time.perf_counter()
+                        response = client.get(url, params)
+                        body = b''.join(response.streaming_content) if response.streaming else response.content
+                        timings.append(time.perf_counter() - started)
+                    query = '&'.join(f'{key}={value}' for key, value in params.items())
+                    key = f'GET {route}' + (f' ?{query}' if query else '') + f' [{rows}]'
+                    problems.extend(baseline.check(key, min(timings), len(body)))
+                    print(f"{key:<72}{min(timings) * 1000:>10.2f}{len(body):>12}")
+                transaction.set_rollback(True)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    baseline.save()
+    if problems:
+        raise SystemExit('\n'.join(problems))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark the orjson-backed renderer against DRF's JSONRenderer.
+
+Seeds a throwaway test database, builds the patient and mapping list payloads
+once, then times rendering them with both renderers and reports milliseconds
+per 1,000 rows. Both renderers are checked to produce identical bytes first.
+
+Usage:
+    python benchmarks/renderers.py [--rows 5000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000, help="Rows per list (default: 5000).")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per case; the best is kept (default: 5).")
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from rest_framework.renderers import JSONRenderer
+
+    from healthcare_backend import renderers
+    from healthcare_backend.testing import seed_dataset
+    from mappings.models import PatientDoctorMapping
+    from mappings.serializers import mapping_projection
+    from patients.models import Patient
+    from patients.serializers import patient_projection
+
+    if renderers.orjson is None:
+        print("orjson is not installed; FastJSONRenderer falls back to the stdlib encoder.")
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user = get_user_model().objects.create_user(
+            email='bench@example.test', username='bench', name='Bench', password='Bench-Pass-123'
+        )
+        seed_dataset(user, args.rows)
+
+        cases = [
+            ('patients', patient_projection.many(patient_projection.values(Patient.objects.all()))),
+            ('mappings', mapping_projection.many(mapping_projection.values(PatientDoctorMapping.objects.all()))),
+        ]
+        stdlib, fast = JSONRenderer(), renderers.FastJSONRenderer()
+
+        print(f"{'list':<10}{'rows':>8}{'stdlib ms/1k':>16}{'fast ms/1k':>14}{'speedup':>10}")
+        for name, data in cases:
+            if stdlib.render(data) != fast.render(data):
+                raise SystemExit(f"{name}: FastJSONRenderer output differs from JSONRenderer")
+
+            per_thousand = 1000 / len(data) * 1000
+            slow_ms = best_of(args.repeat, lambda: stdlib.render(data)) * per_thousand
+            fast_ms = best_of(args.repeat, lambda: fast.render(data)) * per_thousand
+            print(f"{name:<10}{len(data):>8}{slow_ms:>16.2f}{fast_ms:>14.2f}{slow_ms / fast_ms:>9.1f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
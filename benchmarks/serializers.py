@@ -0,0 +1,91 @@
+"""
+Benchmark the values() read path against the DRF serializers.
+
+Seeds a throwaway test database, then times fetching and rendering the
+patient, doctor and mapping lists both ways and reports milliseconds per
+1,000 rows. Both paths are checked to render identical bytes first.
+
+Usage:
+    python benchmarks/serializers.py [--rows 5000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000, help="Rows per list (default: 5000).")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per case; the best is kept (default: 5).")
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from rest_framework.renderers import JSONRenderer
+
+    from doctors.models import Doctor
+    from doctors.serializers import DoctorSerializer, doctor_projection
+    from healthcare_backend.testing import seed_dataset
+    from mappings.models import PatientDoctorMapping
+    from mappings.serializers import PatientDoctorMappingSerializer, mapping_projection
+    from patients.models import Patient
+    from patients.serializers import PatientSerializer, patient_projection
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user = get_user_model().objects.create_user(
+            email='bench@example.test', username='bench', name='Bench', password='Bench-Pass-123'
+        )
+        seed_dataset(user, args.rows)
+
+        renderer = JSONRenderer()
+        cases = [
+            ('patients', PatientSerializer, patient_projection,
+             Patient.objects.filter(created_by=user).select_related('created_by')),
+            ('doctors', DoctorSerializer, doctor_projection, Doctor.objects.all()),
+            ('mappings', PatientDoctorMappingSerializer, mapping_projection,
+             PatientDoctorMapping.objects.select_related('patient__created_by', 'doctor')),
+        ]
+
+        print(f"{'list':<10}{'rows':>8}{'serializer ms/1k':>20}{'values() ms/1k':>18}{'speedup':>10}")
+        for name, serializer_class, projection, queryset in cases:
+            def serialize():
+                return renderer.render(serializer_class(list(queryset.all()), many=True).data)
+
+            def project():
+                return renderer.render(projection.many(projection.values(queryset.all())))
+
+            if serialize() != project():
+                raise SystemExit(f"{name}: the projection output differs from the serializer")
+
+            per_thousand = 1000 / args.rows * 1000
+            slow = best_of(args.repeat, serialize) * per_thousand
+            fast = best_of(args.repeat, project) * per_thousand
+            print(f"{name:<10}{args.rows:>8}{slow:>20.2f}{fast:>18.2f}{slow / fast:>9.1f}x")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+from django.contrib import admin
+from .models import SpecializationCounter, UserCounters
+
+@admin.register(UserCounters)
+class UserCountersAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_patients', 'active_mappings', 'updated_at')
+    search_fields = ('user__email',)
+    readonly_fields = ('user', 'total_patients', 'active_mappings', 'updated_at')
+
+@admin.register(SpecializationCounter)
+class SpecializationCounterAdmin(admin.ModelAdmin):
+    list_display = ('user', 'specialization', 'patients')
+    list_filter = ('specialization',)
+    search_fields = ('user__email', 'specialization')
+    readonly_fields = ('user', 'specialization', 'patients')
@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.services import RECOUNT_BATCH_SIZE, recount
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every user's dashboard counters from the patient and mapping "
+        "tables in batches of users, rewriting the counters that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=RECOUNT_BATCH_SIZE,
+            help=f"Users recounted per transaction (default: {RECOUNT_BATCH_SIZE}).",
+        )
+
+    def handle(self, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        started = time.perf_counter()
+        users = get_user_model().objects.order_by('pk').values_list('pk', flat=True)
+        checked = repaired = 0
+        last = None
+        while True:
+            batch = list((users if last is None else users.filter(pk__gt=last))[:batch_size])
+            if not batch:
+                break
+            repaired += recount(batch)
+            checked += len(batch)
+            last = batch[-1]
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Checked {checked} users")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} users in {elapsed:.2f}s; repaired the counters of {repaired}."
+        ))
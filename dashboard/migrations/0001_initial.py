@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_patients', models.IntegerField(default=0)),
+                ('active_mappings', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'user counters',
+            },
+        ),
+        migrations.CreateModel(
+            name='SpecializationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialization', models.CharField(max_length=255)),
+                ('patients', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='specialization_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['specialization'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='specializationcounter',
+            constraint=models.UniqueConstraint(fields=('user', 'specialization'), name='specialization_counter_user_uniq'),
+        ),
+    ]
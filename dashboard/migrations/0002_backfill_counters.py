@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    """
+    Count the existing patients and active mappings of every user
+    """
+    Patient = apps.get_model('patients', 'Patient')
+    PatientDoctorMapping = apps.get_model('mappings', 'PatientDoctorMapping')
+    UserCounters = apps.get_model('dashboard', 'UserCounters')
+    SpecializationCounter = apps.get_model('dashboard', 'SpecializationCounter')
+
+    counters = {}
+    for user_id, total in Patient.objects.order_by().values_list('created_by_id').annotate(total=Count('id')):
+        counters.setdefault(user_id, UserCounters(user_id=user_id)).total_patients = total
+    active = PatientDoctorMapping.objects.filter(is_active=True).order_by()
+    for user_id, total in active.values_list('patient__created_by_id').annotate(total=Count('id')):
+        counters.setdefault(user_id, UserCounters(user_id=user_id)).active_mappings = total
+    UserCounters.objects.bulk_create(counters.values(), batch_size=2000)
+    SpecializationCounter.objects.bulk_create([
+        SpecializationCounter(user_id=user_id, specialization=specialization, patients=patients)
+        for user_id, specialization, patients in active.values_list(
+            'patient__created_by_id', 'doctor__specialization'
+        ).annotate(patients=Count('patient_id', distinct=True))
+    ], batch_size=2000)
+
+
+def clear_counters(apps, schema_editor):
+    apps.get_model('dashboard', 'SpecializationCounter').objects.all().delete()
+    apps.get_model('dashboard', 'UserCounters').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        ('doctors', '0003_doctor_created_idx'),
+        ('mappings', '0003_mapping_doctor_keyset_idx'),
+        ('patients', '0003_patient_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, clear_counters),
+    ]
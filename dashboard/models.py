@@ -0,0 +1,38 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+class UserCounters(models.Model):
+    """
+    Per-user dashboard totals, maintained incrementally by
+    ``dashboard.services`` in the same transaction as each write
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='dashboard_counters')
+    total_patients = models.IntegerField(default=0)
+    active_mappings = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'user counters'
+
+    def __str__(self):
+        return f"{self.user} - {self.total_patients} patients, {self.active_mappings} active mappings"
+
+class SpecializationCounter(models.Model):
+    """
+    Number of a user's patients with at least one active doctor of a
+    specialization
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='specialization_counters')
+    specialization = models.CharField(max_length=255)
+    patients = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['specialization']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'specialization'], name='specialization_counter_user_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.specialization}: {self.patients}"
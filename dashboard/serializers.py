@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+class DashboardSerializer(serializers.Serializer):
+    """
+    Serializer for a user's dashboard counters
+    """
+    total_patients = serializers.IntegerField()
+    active_mappings = serializers.IntegerField()
+    patients_per_specialization = serializers.DictField(child=serializers.IntegerField())
+    updated_at = serializers.DateTimeField(allow_null=True)
@@ -0,0 +1,239 @@
+"""
+Incremental maintenance of the per-user dashboard counters.
+
+Every write that changes a user's patients or active mappings adjusts
+``UserCounters`` and ``SpecializationCounter`` with ``column = column + delta``
+upserts inside the writer's transaction, so the dashboard is read from a few
+rows instead of counting and grouping over ``Patient`` and
+``PatientDoctorMapping`` on every page view.
+
+Single-instance patient saves and deletes, and mapping saves including
+``is_active`` changes, are covered by ``dashboard.signals``. Paths that
+bypass model signals must call these functions themselves, in the same
+transaction as the write:
+
+* ``patients_added`` after ``Patient.objects.bulk_create`` and
+  ``patient_removed`` before deleting patients without their signals.
+* ``care_team_assigned`` after mappings are created or reactivated through
+  ``bulk_create`` or ``QuerySet.update``.
+* ``care_team_unassigned`` *before* mappings are deactivated or deleted,
+  including single ``PatientDoctorMapping.delete()`` calls: mappings have no
+  delete receivers so that cascades keep Django's fast-delete path.
+  ``mappings_removed`` does the same for mappings of several patients, as
+  deleted from the admin.
+
+A doctor deletion or specialization change touches the counters of every
+user with a patient assigned to that doctor; those users are recounted from
+the source tables instead (``recount_for_doctors``). ``recount`` is also
+what the ``repair_dashboard_counters`` command runs.
+"""
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from mappings.models import PatientDoctorMapping
+from patients.models import Patient
+from .models import SpecializationCounter, UserCounters
+
+# Users recounted per transaction
+RECOUNT_BATCH_SIZE = 500
+
+
+def patients_added(user_id, count=1):
+    if count:
+        _apply(user_id, total_patients=count)
+
+
+def patient_removed(user_id, patient_id):
+    """
+    Uncount a patient and its active mappings. Call before the delete.
+    """
+    mappings, specializations = _care_team_delta(patient_id, None, -1)
+    _apply(user_id, total_patients=-1, active_mappings=mappings, specializations=specializations)
+
+
+def care_team_assigned(user_id, patient_id, doctor_ids):
+    """
+    Count ``doctor_ids`` as newly active doctors of the patient. Call after
+    the write, with only the mappings that were inactive or missing before.
+    """
+    if doctor_ids:
+        mappings, specializations = _care_team_delta(patient_id, doctor_ids, 1)
+        _apply(user_id, active_mappings=mappings, specializations=specializations)
+
+
+def care_team_unassigned(user_id, patient_id, doctor_ids):
+    """
+    Uncount the patient's active mappings to ``doctor_ids``. Call before the
+    write; inactive mappings are ignored.
+    """
+    if doctor_ids:
+        mappings, specializations = _care_team_delta(patient_id, doctor_ids, -1)
+        _apply(user_id, active_mappings=mappings, specializations=specializations)
+
+
+def mappings_removed(mappings):
+    """
+    Uncount ``(user_id, patient_id, doctor_id)`` mappings, active or not,
+    about to be deleted. Call before the delete.
+    """
+    care_teams = {}
+    for user_id, patient_id, doctor_id in mappings:
+        care_teams.setdefault((user_id, patient_id), []).append(doctor_id)
+    for (user_id, patient_id), doctor_ids in sorted(care_teams.items()):
+        care_team_unassigned(user_id, patient_id, doctor_ids)
+
+
+def _care_team_delta(patient_id, doctor_ids, sign):
+    """
+    Return ``(active mapping delta, {specialization: patient delta})`` for
+    the patient's active mappings to ``doctor_ids`` (all when ``None``)
+    becoming active (``sign`` 1) or inactive (``sign`` -1)
+    """
+    changed = Count('id') if doctor_ids is None else Count('id', filter=Q(doctor_id__in=list(doctor_ids)))
+    rows = PatientDoctorMapping.objects.filter(
+        patient_id=patient_id,
+        is_active=True
+    ).order_by().values('doctor__specialization').annotate(active=Count('id'), changed=changed)
+
+    mappings, specializations = 0, {}
+    for row in rows:
+        if not row['changed']:
+            continue
+        mappings += row['changed']
+        # The patient enters a specialization when all of its active doctors
+        # in it are new, and leaves it when all of them are being removed
+        if row['active'] == row['changed']:
+            specializations[row['doctor__specialization']] = sign
+    return sign * mappings, specializations
+
+
+def _apply(user_id, total_patients=0, active_mappings=0, specializations=None):
+    """
+    Add the deltas to the user's counters: at most one statement for the
+    totals and one for the specializations
+    """
+    if total_patients or active_mappings:
+        _increment(UserCounters, ['user'], [
+            {'user': user_id, 'total_patients': total_patients, 'active_mappings': active_mappings}
+        ])
+    if specializations:
+        _increment(SpecializationCounter, ['user', 'specialization'], [
+            {'user': user_id, 'specialization': specialization, 'patients': delta}
+            for specialization, delta in sorted(specializations.items())
+        ])
+
+
+def _increment(model, key_fields, rows):
+    """
+    Add each row's counter values to the row matching its ``key_fields``,
+    inserting missing rows. One ``INSERT ... ON CONFLICT DO UPDATE`` where
+    the backend supports it.
+    """
+    counters = [name for name in rows[0] if name not in key_fields]
+    touched = {'updated_at': timezone.now()} if model is UserCounters else {}
+    if not connection.features.supports_update_conflicts_with_target:
+        with transaction.atomic():
+            for row in rows:
+                key = {name: row[name] for name in key_fields}
+                updates = {name: F(name) + row[name] for name in counters}
+                if not model.objects.filter(**key).update(**updates, **touched):
+                    model.objects.create(**row, **touched)
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    fields = [model._meta.get_field(name) for name in [*rows[0], *touched]]
+    assignments = [f'{quote(name)} = {table}.{quote(name)} + EXCLUDED.{quote(name)}' for name in counters]
+    assignments += [f'{quote(name)} = EXCLUDED.{quote(name)}' for name in touched]
+    placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    params = [
+        field.get_db_prep_save({**row, **touched}[field.name], connection)
+        for row in rows for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({", ".join(quote(field.column) for field in fields)}) '
+            f'VALUES {", ".join([placeholders] * len(rows))} '
+            f'ON CONFLICT ({", ".join(quote(model._meta.get_field(name).column) for name in key_fields)}) '
+            f'DO UPDATE SET {", ".join(assignments)}',
+            params
+        )
+
+
+def users_of_doctors(doctor_ids):
+    """
+    Ids of the users with a patient actively assigned to any of ``doctor_ids``
+    """
+    return set(
+        Patient.objects.filter(
+            doctor_mappings__doctor_id__in=list(doctor_ids),
+            doctor_mappings__is_active=True
+        ).order_by().values_list('created_by_id', flat=True).distinct()
+    )
+
+
+def recount_for_doctors(doctor_ids):
+    users = sorted(users_of_doctors(doctor_ids))
+    return sum(
+        recount(users[start:start + RECOUNT_BATCH_SIZE])
+        for start in range(0, len(users), RECOUNT_BATCH_SIZE)
+    )
+
+
+def recount(user_ids):
+    """
+    Recompute the counters of ``user_ids`` from the source tables and rewrite
+    those that drifted. Returns the number of users whose counters changed.
+
+    The users' counter rows are locked first, so increments from concurrent
+    writers wait and apply on top of the recount instead of being lost.
+    """
+    user_ids = sorted(set(user_ids))
+    with transaction.atomic():
+        stored = {
+            user_id: {'total_patients': total_patients, 'active_mappings': active_mappings}
+            for user_id, total_patients, active_mappings in UserCounters.objects.select_for_update().filter(
+                user_id__in=user_ids
+            ).order_by('user_id').values_list('user_id', 'total_patients', 'active_mappings')
+        }
+        stored_specializations = {}
+        for user_id, specialization, patients in SpecializationCounter.objects.filter(
+            user_id__in=user_ids
+        ).exclude(patients=0).values_list('user_id', 'specialization', 'patients'):
+            stored_specializations.setdefault(user_id, {})[specialization] = patients
+
+        # A user without a counters row reads as all zeros
+        zero = {'total_patients': 0, 'active_mappings': 0}
+        fresh = {user_id: dict(zero) for user_id in user_ids}
+        for user_id, total in Patient.objects.filter(
+            created_by_id__in=user_ids
+        ).order_by().values_list('created_by_id').annotate(total=Count('id')):
+            fresh[user_id]['total_patients'] = total
+        active = PatientDoctorMapping.objects.filter(patient__created_by_id__in=user_ids, is_active=True).order_by()
+        for user_id, total in active.values_list('patient__created_by_id').annotate(total=Count('id')):
+            fresh[user_id]['active_mappings'] = total
+        fresh_specializations = {}
+        for user_id, specialization, patients in active.values_list(
+            'patient__created_by_id', 'doctor__specialization'
+        ).annotate(patients=Count('patient_id', distinct=True)):
+            fresh_specializations.setdefault(user_id, {})[specialization] = patients
+
+        drifted = [
+            user_id for user_id in user_ids
+            if stored.get(user_id, zero) != fresh[user_id]
+            or stored_specializations.get(user_id, {}) != fresh_specializations.get(user_id, {})
+        ]
+        if drifted:
+            UserCounters.objects.filter(user_id__in=drifted).delete()
+            SpecializationCounter.objects.filter(user_id__in=drifted).delete()
+            UserCounters.objects.bulk_create([
+                UserCounters(user_id=user_id, **fresh[user_id]) for user_id in drifted
+            ])
+            SpecializationCounter.objects.bulk_create([
+                SpecializationCounter(user_id=user_id, specialization=specialization, patients=patients)
+                for user_id in drifted
+                for specialization, patients in sorted(fresh_specializations.get(user_id, {}).items())
+            ])
+    return len(drifted)
@@ -0,0 +1,111 @@
+"""
+Signal receivers keeping the dashboard counters current for single-instance
+writes. Deletes run them inside Django's deletion transaction; saves only
+share the write's transaction when the caller wraps them in
+``transaction.atomic()``, as the API views do. See ``dashboard.services`` for
+the paths that must call the services explicitly.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from doctors.models import Doctor
+from mappings.models import PatientDoctorMapping
+from patients.models import Patient
+from . import services
+
+User = get_user_model()
+
+
+def _deleting_user(origin):
+    """
+    Whether the delete cascades from a user, whose counters go with them
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, User)
+
+
+@receiver(post_save, sender=Patient)
+def patient_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        services.patients_added(instance.created_by_id)
+
+
+@receiver(pre_delete, sender=Patient)
+def patient_deleting(sender, instance, origin=None, **kwargs):
+    """
+    Uncount the patient and its active mappings before the cascade removes
+    them; the mappings themselves have no delete receivers
+    """
+    if origin is not None and _deleting_user(origin):
+        return
+    services.patient_removed(instance.created_by_id, instance.pk)
+
+
+@receiver(pre_save, sender=PatientDoctorMapping)
+def mapping_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Uncount a mapping being deactivated while it is still active, and
+    remember a reactivation to count once it is saved
+    """
+    instance._dashboard_reactivated = False
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    was_active = next(iter(
+        PatientDoctorMapping.objects.filter(pk=instance.pk).order_by().values_list('is_active', flat=True)[:1]
+    ), None)
+    if was_active is None or was_active == instance.is_active:
+        return
+    if was_active:
+        services.care_team_unassigned(instance.owner_id, instance.patient_id, [instance.doctor_id])
+    else:
+        instance._dashboard_reactivated = True
+
+
+@receiver(post_save, sender=PatientDoctorMapping)
+def mapping_saved(sender, instance, created, raw=False, **kwargs):
+    reactivated = getattr(instance, '_dashboard_reactivated', False)
+    instance._dashboard_reactivated = False
+    if not raw and (reactivated or created and instance.is_active):
+        services.care_team_assigned(instance.owner_id, instance.patient_id, [instance.doctor_id])
+
+
+@receiver(pre_save, sender=Doctor)
+def doctor_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Remember a specialization change so the affected users can be recounted
+    once it is saved
+    """
+    instance._dashboard_recount = False
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and 'specialization' not in update_fields:
+        return
+    previous = next(iter(
+        Doctor.objects.filter(pk=instance.pk).order_by().values_list('specialization', flat=True)[:1]
+    ), None)
+    instance._dashboard_recount = previous is not None and previous != instance.specialization
+
+
+@receiver(post_save, sender=Doctor)
+def doctor_saved(sender, instance, raw=False, **kwargs):
+    if getattr(instance, '_dashboard_recount', False):
+        instance._dashboard_recount = False
+        services.recount_for_doctors([instance.pk])
+
+
+@receiver(pre_delete, sender=Doctor)
+def doctor_deleting(sender, instance, **kwargs):
+    # The mappings are gone by post_delete; find their owners now
+    instance._dashboard_users = services.users_of_doctors([instance.pk])
+
+
+@receiver(post_delete, sender=Doctor)
+def doctor_deleted(sender, instance, **kwargs):
+    users = sorted(getattr(instance, '_dashboard_users', ()))
+    for start in range(0, len(users), services.RECOUNT_BATCH_SIZE):
+        services.recount(users[start:start + services.RECOUNT_BATCH_SIZE])
@@ -0,0 +1,211 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from doctors.models import Doctor
+from mappings.models import PatientDoctorMapping
+from patients.models import Patient
+from .models import SpecializationCounter, UserCounters
+from .services import recount
+
+User = get_user_model()
+
+
+class DashboardCounterTests(APITestCase):
+    """
+    Counters follow every write path and always match a full recount
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+        cls.cardiologists = [cls.create_doctor(i, 'Cardiology') for i in range(2)]
+        cls.neurologist = cls.create_doctor(2, 'Neurology')
+
+    @staticmethod
+    def create_doctor(number, specialization):
+        return Doctor.objects.create(
+            name=f'Doctor {number}', email=f'doctor{number}@hospital.test', phone='1',
+            specialization=specialization, qualification='MD', experience_years=5,
+            license_number=f'LIC-{number}', consultation_fee='100.00'
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def create_patient(self, email='jane@example.test'):
+        response = self.client.post(reverse('patient-list-create'), {
+            'name': 'Jane', 'email': email, 'phone': '+1-555-0100', 'date_of_birth': '1990-05-15',
+            'gender': 'F', 'address': '1 Main Street',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['data']['id']
+
+    def assign(self, patient_id, doctor):
+        response = self.client.post(reverse('mapping-list-create'), {
+            'patient': patient_id, 'doctor': doctor.pk
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['data']['id']
+
+    def assertDashboard(self, total_patients, active_mappings, specializations):
+        body = self.client.get(reverse('dashboard')).json()
+        self.assertEqual(body['total_patients'], total_patients)
+        self.assertEqual(body['active_mappings'], active_mappings)
+        self.assertEqual(body['patients_per_specialization'], specializations)
+        # Nothing for a recount from the source tables to fix
+        self.assertEqual(recount([self.user.pk, self.other.pk]), 0)
+
+    def test_new_user_reads_zeros(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse('dashboard'))
+        self.assertDashboard(0, 0, {})
+
+    def test_patient_and_mapping_writes(self):
+        patient_id = self.create_patient()
+        self.assertDashboard(1, 0, {})
+
+        first = self.assign(patient_id, self.cardiologists[0])
+        self.assign(patient_id, self.cardiologists[1])
+        self.assign(patient_id, self.neurologist)
+        self.assertDashboard(1, 3, {'Cardiology': 1, 'Neurology': 1})
+
+        self.client.delete(reverse('mapping-delete', args=[first]))
+        self.assertDashboard(1, 2, {'Cardiology': 1, 'Neurology': 1})
+
+        self.client.delete(reverse('patient-detail', args=[patient_id]))
+        self.assertDashboard(0, 0, {})
+
+    def test_batch_and_bulk_paths(self):
+        response = self.client.post(reverse('patient-bulk-create'), [
+            {'name': f'Bulk {i}', 'email': f'bulk{i}@example.test', 'phone': '1',
+             'date_of_birth': '1990-01-01', 'gender': 'M', 'address': 'Street'}
+            for i in range(3)
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        patient_id = response.json()['data'][0]['id']
+        self.assertDashboard(3, 0, {})
+
+        url = reverse('patient-doctors-batch', args=[patient_id])
+        doctors = [doctor.pk for doctor in self.cardiologists] + [self.neurologist.pk]
+        self.client.post(url, {'assign': doctors}, format='json')
+        self.assertDashboard(3, 3, {'Cardiology': 1, 'Neurology': 1})
+
+        self.client.post(url, {'unassign': [self.cardiologists[0].pk, self.neurologist.pk]}, format='json')
+        self.assertDashboard(3, 1, {'Cardiology': 1})
+
+        # Reactivating an inactive mapping counts it again
+        PatientDoctorMapping.objects.filter(patient_id=patient_id).update(is_active=False)
+        recount([self.user.pk])
+        self.client.post(url, {'assign': [self.cardiologists[1].pk]}, format='json')
+        self.assertDashboard(3, 1, {'Cardiology': 1})
+
+    def test_mapping_saves_and_admin_deletes(self):
+        from django.contrib import admin
+
+        patient_id = self.create_patient()
+        first = self.assign(patient_id, self.cardiologists[0])
+        self.assign(patient_id, self.cardiologists[1])
+        self.assign(patient_id, self.neurologist)
+
+        mapping = PatientDoctorMapping.objects.get(pk=first)
+        mapping.is_active = False
+        mapping.save()
+        self.assertDashboard(1, 2, {'Cardiology': 1, 'Neurology': 1})
+        mapping.notes = 'Still inactive'
+        mapping.save()
+        self.assertDashboard(1, 2, {'Cardiology': 1, 'Neurology': 1})
+        mapping.is_active = True
+        mapping.save()
+        self.assertDashboard(1, 3, {'Cardiology': 1, 'Neurology': 1})
+
+        model_admin = admin.site._registry[PatientDoctorMapping]
+        model_admin.delete_model(None, PatientDoctorMapping.objects.get(doctor=self.neurologist))
+        self.assertDashboard(1, 2, {'Cardiology': 1})
+        model_admin.delete_queryset(None, PatientDoctorMapping.objects.filter(patient_id=patient_id))
+        self.assertDashboard(1, 0, {})
+
+    def test_doctor_changes_recount_affected_users(self):
+        patient_id = self.create_patient()
+        self.assign(patient_id, self.cardiologists[0])
+        self.assign(patient_id, self.neurologist)
+
+        doctor = Doctor.objects.get(pk=self.cardiologists[0].pk)
+        doctor.specialization = 'Oncology'
+        doctor.save()
+        self.assertDashboard(1, 2, {'Neurology': 1, 'Oncology': 1})
+
+        self.neurologist.delete()
+        self.assertDashboard(1, 1, {'Oncology': 1})
+
+    def test_import_moving_a_doctor_recounts(self):
+        patient_id = self.create_patient()
+        self.assign(patient_id, self.neurologist)
+        doctor = self.neurologist
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(
+                'name,email,phone,specialization,qualification,experience_years,license_number\n'
+                f'{doctor.name},{doctor.email},1,Pediatrics,MD,5,{doctor.license_number}\n'
+            )
+        self.addCleanup(os.unlink, handle.name)
+        call_command('import_doctors', handle.name, stdout=StringIO())
+        self.assertDashboard(1, 1, {'Pediatrics': 1})
+
+    def test_deleting_a_user_removes_their_counters(self):
+        self.create_patient()
+        self.user.delete()
+        self.assertFalse(UserCounters.objects.filter(user_id=self.user.pk).exists())
+
+
+class RepairDashboardCountersTests(APITestCase):
+    """
+    The repair command recomputes drifted counters in batches
+    """
+
+    def test_repairs_only_drifted_users(self):
+        users = [
+            User.objects.create_user(
+                email=f'user{i}@example.test', username=f'user{i}', name='User', password='User-Pass-123'
+            )
+            for i in range(3)
+        ]
+        doctor = Doctor.objects.create(
+            name='Doctor', email='doctor@hospital.test', phone='1', specialization='Cardiology',
+            qualification='MD', experience_years=5, license_number='LIC-1', consultation_fee='100.00'
+        )
+        # Written without signals, so the counters never saw them
+        patients = Patient.objects.bulk_create([
+            Patient(name='P', email=f'p{i}@example.test', phone='1', date_of_birth='1990-01-01',
+                    gender='F', address='Street', created_by=users[0])
+            for i in range(2)
+        ])
+        PatientDoctorMapping.objects.bulk_create([
+            PatientDoctorMapping(patient=patient, doctor=doctor) for patient in patients
+        ])
+        SpecializationCounter.objects.create(user=users[1], specialization='Neurology', patients=4)
+
+        out = StringIO()
+        call_command('repair_dashboard_counters', batch_size=2, stdout=out)
+        self.assertIn('Checked 3 users', out.getvalue())
+        self.assertIn('repaired the counters of 2', out.getvalue())
+
+        counters = UserCounters.objects.get(user=users[0])
+        self.assertEqual((counters.total_patients, counters.active_mappings), (2, 2))
+        self.assertEqual(
+            list(SpecializationCounter.objects.values_list('user_id', 'specialization', 'patients')),
+            [(users[0].pk, 'Cardiology', 2)]
+        )
+
+        out = StringIO()
+        call_command('repair_dashboard_counters', stdout=out)
+        self.assertIn('repaired the counters of 0', out.getvalue())
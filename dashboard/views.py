@@ -0,0 +1,23 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import SpecializationCounter, UserCounters
+from .serializers import DashboardSerializer
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard(request):
+    """
+    GET: Retrieve the authenticated user's patient and mapping totals, read
+    from the incrementally maintained counters
+    """
+    counters = next(iter(UserCounters.objects.filter(user=request.user).order_by().values(
+        'total_patients', 'active_mappings', 'updated_at'
+    )[:1]), None) or {'total_patients': 0, 'active_mappings': 0, 'updated_at': None}
+    counters['patients_per_specialization'] = dict(
+        SpecializationCounter.objects.filter(
+            user=request.user
+        ).exclude(patients=0).values_list('specialization', 'patients')
+    )
+    return Response(DashboardSerializer(counters).data, status=status.HTTP_200_OK)
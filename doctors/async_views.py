@@ -0,0 +1,50 @@
+"""
+Async GET handlers for the doctor directory, routed under ASGI (see
+``healthcare_backend.async_views``). Each one runs the same steps as the GET
+branch of its sync view in ``doctors.views`` and only issues the queries and
+cache lookups through the async APIs; other methods are served by that view.
+"""
+
+from healthcare_backend.async_views import afirst, async_read_view
+from healthcare_backend.conditional import detail_not_modified, detail_representation, is_conditional, updated_at_query
+from healthcare_backend.db.routers import use_primary
+from . import views
+from .cache import acache_response, adirectory_cache_key, aget_cached_entry, cached_response, directory_etag
+from .models import Doctor
+from .serializers import doctor_projection
+
+@async_read_view(views.doctor_list_create)
+async def doctor_list_create(request):
+    """
+    GET: Retrieve the doctor directory, filtered, sorted and cursor-paginated
+    """
+    cache_key = await adirectory_cache_key('list', request)
+    etag = directory_etag(cache_key)
+    response = cached_response(request, await aget_cached_entry(cache_key), etag)
+    if response is not None:
+        return response
+
+    with use_primary():
+        projection, paginator, rows = views.list_page(request)
+        page = await paginator.apaginate_queryset(rows, request)
+        return await acache_response(cache_key, views.list_data(projection, paginator, page), etag)
+
+@async_read_view(views.doctor_detail)
+async def doctor_detail(request, pk):
+    """
+    GET: Retrieve a specific doctor
+    """
+    cache_key = await adirectory_cache_key('detail', request)
+    response = cached_response(request, await aget_cached_entry(cache_key))
+    if response is not None:
+        return response
+
+    with use_primary():
+        doctors = Doctor.objects.filter(pk=pk)
+        if is_conditional(request):
+            response = detail_not_modified(request, pk, await afirst(updated_at_query(doctors)))
+            if response is not None:
+                return response
+        projection = doctor_projection.for_request(request)
+        row = await projection.aget(doctors, 'id', 'updated_at')
+        return await acache_response(cache_key, *detail_representation(projection, row))
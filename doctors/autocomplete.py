@@ -0,0 +1,206 @@
+"""
+In-process prefix index for doctor name and specialization type-ahead.
+
+Every word-start suffix of a doctor's name and specialization ("john smith",
+"smith") is kept, normalised, in a sorted list of ``(key, doctor_id)`` pairs,
+so a prefix lookup is one ``bisect`` plus a scan over the matches. The index
+is built lazily on the first lookup and updated from the ``Doctor`` signals
+once a write in this process commits.
+
+Writes made elsewhere (another worker, ``import_doctors``) are picked up by
+an incremental refresh that reads the doctors whose ``updated_at`` is at or
+after the newest one seen, less ``REFRESH_OVERLAP``, and drops deleted ids when the row count no longer matches. A refresh runs
+when the committed version (see ``doctors.cache``) moved without this process
+seeing the write, and at least every ``DOCTOR_AUTOCOMPLETE_REFRESH_SECONDS``
+otherwise, which bounds staleness when the cache is not shared. Queryset
+``update()`` calls must set ``updated_at`` to be seen.
+"""
+
+import datetime
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from healthcare_backend.db.routers import use_primary
+
+from .cache import get_committed_version
+from .models import Doctor
+
+NAME, SPECIALIZATION = 'name', 'specialization'
+FIELDS = ('id', 'name', 'specialization', 'is_available', 'updated_at')
+# Writes stamped this long before the newest row seen are read again, for
+# transactions that committed after a later one
+REFRESH_OVERLAP = datetime.timedelta(seconds=30)
+
+
+def normalize(text):
+    """
+    Casefold and strip accents and punctuation so "Zoë" matches "zoe"
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    letters = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(''.join(char if char.isalnum() else ' ' for char in letters.casefold()).split())
+
+
+def word_keys(text):
+    words = normalize(text).split(' ')
+    return [' '.join(words[start:]) for start in range(len(words)) if words[start]]
+
+
+class DoctorPrefixIndex:
+    """
+    Sorted-array prefix index over the doctor directory
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.version = None
+        # Newest updated_at read from the table, and when it was last read
+        self.synced_at = None
+        self.checked = None
+        self.doctors = {}
+        self.keys = {NAME: [], SPECIALIZATION: []}
+
+    def search(self, prefix, limit, is_available=None):
+        """
+        Return up to ``limit`` ``{'id', 'name', 'specialization',
+        'is_available'}`` dicts whose name or specialization has a word
+        starting with ``prefix``. Name matches come first, each group in
+        alphabetical order of the matched text.
+        """
+        prefix = normalize(prefix)
+        if not prefix or limit < 1:
+            return []
+        with self.lock:
+            self.ensure_current()
+            results, seen = [], set()
+            for field in (NAME, SPECIALIZATION):
+                keys = self.keys[field]
+                position = bisect_left(keys, (prefix,))
+                while position < len(keys) and keys[position][0].startswith(prefix):
+                    doctor_id = keys[position][1]
+                    position += 1
+                    if doctor_id in seen:
+                        continue
+                    seen.add(doctor_id)
+                    doctor = self.doctors[doctor_id]
+                    if is_available is not None and doctor['is_available'] != is_available:
+                        continue
+                    results.append(dict(doctor))
+                    if len(results) >= limit:
+                        return results
+            return results
+
+    def ensure_current(self):
+        version = get_committed_version()
+        if not self.loaded:
+            self.load(version)
+        elif version != self.version or time.monotonic() - self.checked >= settings.DOCTOR_AUTOCOMPLETE_REFRESH_SECONDS:
+            self.refresh(version)
+
+    def load(self, version):
+        # Read from the primary: a lagging replica would pin stale rows to
+        # the new version
+        with self.lock, use_primary():
+            self.doctors = {}
+            self.keys = {NAME: [], SPECIALIZATION: []}
+            self.synced_at = None
+            for row in Doctor.objects.order_by().values(*FIELDS).iterator():
+                self._add(self._synced(row))
+            for keys in self.keys.values():
+                keys.sort()
+            self.version = version
+            self.checked = time.monotonic()
+            self.loaded = True
+
+    def refresh(self, version):
+        """
+        Apply the doctors saved since the last read and drop deleted ones
+        """
+        with self.lock, use_primary():
+            changed = Doctor.objects.order_by().values(*FIELDS)
+            if self.synced_at is not None:
+                changed = changed.filter(updated_at__gte=self.synced_at - REFRESH_OVERLAP)
+            for row in changed.iterator():
+                self._remove(row['id'])
+                self._add(self._synced(row), insert=True)
+            if Doctor.objects.count() != len(self.doctors):
+                existing = set(Doctor.objects.order_by().values_list('id', flat=True).iterator())
+                for doctor_id in set(self.doctors) - existing:
+                    self._remove(doctor_id)
+            self.version = version
+            self.checked = time.monotonic()
+
+    def update(self, doctor, version):
+        """
+        Apply a committed save. ``version`` is the committed version the
+        write produced; if other writes happened in between, the next lookup
+        rebuilds the index instead.
+        """
+        with self.lock:
+            if not self.loaded:
+                return
+            self._remove(doctor.pk)
+            self._add({
+                'id': doctor.pk,
+                'name': doctor.name,
+                'specialization': doctor.specialization,
+                'is_available': doctor.is_available,
+            }, insert=True)
+            self._advance(version)
+
+    def remove(self, doctor_id, version):
+        with self.lock:
+            if not self.loaded:
+                return
+            self._remove(doctor_id)
+            self._advance(version)
+
+    def clear(self):
+        with self.lock:
+            self.loaded = False
+            self.version = None
+            self.synced_at = None
+            self.checked = None
+            self.doctors = {}
+            self.keys = {NAME: [], SPECIALIZATION: []}
+
+    def _advance(self, version):
+        if self.version is not None and self.version == version - 1:
+            self.version = version
+
+    def _synced(self, row):
+        """
+        Note the row's ``updated_at`` and return the row without it
+        """
+        updated_at = row.pop('updated_at')
+        if self.synced_at is None or updated_at > self.synced_at:
+            self.synced_at = updated_at
+        return row
+
+    def _add(self, row, insert=False):
+        self.doctors[row['id']] = row
+        for field in (NAME, SPECIALIZATION):
+            for key in word_keys(row[field]):
+                if insert:
+                    insort(self.keys[field], (key, row['id']))
+                else:
+                    self.keys[field].append((key, row['id']))
+
+    def _remove(self, doctor_id):
+        row = self.doctors.pop(doctor_id, None)
+        if row is None:
+            return
+        for field in (NAME, SPECIALIZATION):
+            keys = self.keys[field]
+            for key in word_keys(row[field]):
+                position = bisect_left(keys, (key, doctor_id))
+                if position < len(keys) and keys[position] == (key, doctor_id):
+                    del keys[position]
+
+
+doctor_index = DoctorPrefixIndex()
@@ -0,0 +1,173 @@
+"""
+Versioned response cache for the doctor directory.
+
+List and detail responses are stored as rendered JSON bytes, together with
+their ETag/Last-Modified validators, under keys that embed a directory version
+number. Any write to ``Doctor`` bumps the version (see ``doctors.signals``),
+which orphans every cached entry at once instead of invalidating keys one by
+one, and list ETags are derived from the key (``directory_etag``). The version
+is bumped when the write happens and again once it commits, so a response a
+concurrent reader rendered from the old rows in between is orphaned as well.
+A separate counter, bumped only on commit, tracks the committed writes for the
+autocomplete index. Bulk writes that bypass model signals must call
+``bump_directory_version()`` and ``bump_committed_version()`` themselves.
+
+The read helpers have ``a``-prefixed twins on Django's async cache API for
+the async views in ``doctors.async_views``.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.http import quote_etag
+from rest_framework.settings import api_settings
+
+from healthcare_backend.conditional import not_modified, set_validators
+
+VERSION_KEY = 'doctors:directory-version'
+COMMITTED_KEY = 'doctors:committed-version'
+
+
+def get_cache():
+    return caches[getattr(settings, 'DOCTOR_CACHE_ALIAS', 'default')]
+
+
+def get_directory_version():
+    """
+    Return the current directory version, initialising it on first use.
+
+    The initial value is time based so that an evicted counter never falls
+    back to a version whose entries may still be cached.
+    """
+    return _get_counter(VERSION_KEY)
+
+
+async def aget_directory_version():
+    """
+    ``get_directory_version`` through the async cache API
+    """
+    cache = get_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def bump_directory_version():
+    return _bump_counter(VERSION_KEY)
+
+
+def get_committed_version():
+    """
+    Return the counter of committed directory writes that the autocomplete
+    index follows, initialised like ``get_directory_version``
+    """
+    return _get_counter(COMMITTED_KEY)
+
+
+def bump_committed_version():
+    return _bump_counter(COMMITTED_KEY)
+
+
+def _get_counter(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_counter(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Counter was evicted; start a fresh, never-used version
+        version = int(time.time() * 1000)
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def directory_cache_key(kind, request):
+    """
+    Key for a cached response. The full URI is hashed in because pagination
+    links embed the host, path and query string.
+    """
+    return _cache_key(get_directory_version(), kind, request)
+
+
+async def adirectory_cache_key(kind, request):
+    return _cache_key(await aget_directory_version(), kind, request)
+
+
+def _cache_key(version, kind, request):
+    uri = hashlib.sha1(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    return f'doctors:v{version}:{kind}:{uri}'
+
+
+def directory_etag(key):
+    """
+    ETag of the response cached under ``key``, which embeds the directory
+    version and the full URI, so it is known without querying
+    """
+    return quote_etag(hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def get_cached_entry(key):
+    """
+    Return the cached ``(body, content_type, etag, last_modified)`` tuple,
+    or None on a miss
+    """
+    return get_cache().get(key)
+
+
+async def aget_cached_entry(key):
+    return await get_cache().aget(key)
+
+
+def entry_response(entry):
+    body, content_type, etag, last_modified = entry
+    return set_validators(HttpResponse(body, content_type=content_type), etag, last_modified)
+
+
+def cached_response(request, entry, etag=None):
+    """
+    Answer a request from its cache ``entry``, with a 304 when the client's
+    validators match, or with a 304 from ``etag`` alone on a miss. Returns
+    None when the response has to be built.
+    """
+    if entry is not None:
+        return not_modified(request, entry[2], entry[3]) or entry_response(entry)
+    if etag is not None:
+        return not_modified(request, etag, None)
+    return None
+
+
+def cache_response(key, data, etag=None, last_modified=None):
+    """
+    Render ``data`` once, store the bytes and their validators under ``key``
+    and return them as a response
+    """
+    entry = _render_entry(data, etag, last_modified)
+    get_cache().set(key, entry, getattr(settings, 'DOCTOR_CACHE_TIMEOUT', 300))
+    return entry_response(entry)
+
+
+async def acache_response(key, data, etag=None, last_modified=None):
+    entry = _render_entry(data, etag, last_modified)
+    await get_cache().aset(key, entry, getattr(settings, 'DOCTOR_CACHE_TIMEOUT', 300))
+    return entry_response(entry)
+
+
+def _render_entry(data, etag, last_modified):
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    body = renderer.render(data)
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    return (body, content_type, etag, last_modified)
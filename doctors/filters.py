@@ -0,0 +1,78 @@
+from rest_framework import serializers
+
+
+class DoctorFilterSerializer(serializers.Serializer):
+    """
+    Validates the query parameters accepted by the doctor directory
+    """
+    ORDERING_CHOICES = (
+        'name', '-name',
+        'experience_years', '-experience_years',
+        'created_at', '-created_at',
+    )
+
+    specialization = serializers.CharField(required=False, max_length=255)
+    is_available = serializers.BooleanField(required=False)
+    min_experience = serializers.IntegerField(required=False, min_value=0)
+    max_experience = serializers.IntegerField(required=False, min_value=0)
+    min_fee = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+    max_fee = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+    ordering = serializers.ChoiceField(required=False, choices=ORDERING_CHOICES, default='name')
+
+    def validate(self, attrs):
+        """
+        Reject inverted ranges instead of silently returning nothing
+        """
+        for low, high in (('min_experience', 'max_experience'), ('min_fee', 'max_fee')):
+            if low in attrs and high in attrs and attrs[low] > attrs[high]:
+                raise serializers.ValidationError({low: f"Must not be greater than {high}."})
+        return attrs
+
+
+class DoctorCaseloadFilterSerializer(DoctorFilterSerializer):
+    """
+    Directory filters plus sorting by the active caseload
+    """
+    ORDERING_CHOICES = DoctorFilterSerializer.ORDERING_CHOICES + ('active_patients', '-active_patients')
+
+    ordering = serializers.ChoiceField(required=False, choices=ORDERING_CHOICES, default='name')
+
+
+class DoctorAutocompleteSerializer(serializers.Serializer):
+    """
+    Validates the query parameters accepted by the doctor autocomplete
+    """
+    q = serializers.CharField(max_length=100)
+    limit = serializers.IntegerField(required=False, min_value=1)
+    is_available = serializers.BooleanField(required=False)
+
+
+def filter_doctors(queryset, query_params, params_class=DoctorFilterSerializer):
+    """
+    Apply the validated directory filters to ``queryset``.
+
+    Returns ``(queryset, ordering)``; raises ``ValidationError`` (HTTP 400)
+    for malformed parameters. Each filter is covered by one of the composite
+    indexes on ``Doctor`` so a page stays a bounded index range scan.
+    """
+    params = params_class(data=query_params.dict())
+    params.is_valid(raise_exception=True)
+    filters = params.validated_data
+
+    if 'specialization' in filters:
+        queryset = queryset.filter(specialization=filters['specialization'])
+    if 'is_available' in filters:
+        # ``__in`` renders as ``is_available IN (...)``, which SQLite can match
+        # against the composite indexes; an exact boolean lookup renders as a
+        # bare column that it cannot
+        queryset = queryset.filter(is_available__in=[filters['is_available']])
+    if 'min_experience' in filters:
+        queryset = queryset.filter(experience_years__gte=filters['min_experience'])
+    if 'max_experience' in filters:
+        queryset = queryset.filter(experience_years__lte=filters['max_experience'])
+    if 'min_fee' in filters:
+        queryset = queryset.filter(consultation_fee__gte=filters['min_fee'])
+    if 'max_fee' in filters:
+        queryset = queryset.filter(consultation_fee__lte=filters['max_fee'])
+
+    return queryset, filters['ordering']
@@ -0,0 +1,317 @@
+import csv
+import io
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from dashboard.services import recount_for_doctors
+from doctors.cache import bump_committed_version, bump_directory_version
+from doctors.models import Doctor
+
+IMPORT_FIELDS = (
+    'name', 'email', 'phone', 'specialization', 'qualification',
+    'experience_years', 'license_number', 'hospital_affiliation',
+    'consultation_fee', 'is_available',
+)
+REQUIRED_FIELDS = (
+    'name', 'email', 'phone', 'specialization', 'qualification',
+    'experience_years', 'license_number',
+)
+# Everything but the conflict key is overwritten when a license already exists
+UPDATE_FIELDS = [field for field in IMPORT_FIELDS if field != 'license_number'] + ['updated_at']
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+COPY_NULL = '\\N'
+
+
+class RowRejected(Exception):
+    pass
+
+
+def clean_row(raw):
+    """
+    Normalise one input row into model field values, raising RowRejected
+    with every problem found. Runs no queries.
+    """
+    if not isinstance(raw, dict):
+        raise RowRejected(['Row must be an object.'])
+
+    errors, row = [], {}
+    for name in IMPORT_FIELDS:
+        value = raw.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ('', None):
+            if name in REQUIRED_FIELDS:
+                errors.append(f'{name}: This field is required.')
+            row[name] = None
+            continue
+
+        field = Doctor._meta.get_field(name)
+        try:
+            if name == 'experience_years':
+                value = int(value)
+                if value < 0:
+                    raise ValueError
+            elif name == 'consultation_fee':
+                value = Decimal(str(value))
+                if not value.is_finite() or value.as_tuple().exponent < -field.decimal_places:
+                    raise ValueError
+                if abs(value) >= Decimal(10) ** (field.max_digits - field.decimal_places):
+                    raise ValueError
+            elif name == 'is_available':
+                if isinstance(value, bool):
+                    pass
+                elif str(value).lower() in TRUE_VALUES:
+                    value = True
+                elif str(value).lower() in FALSE_VALUES:
+                    value = False
+                else:
+                    raise ValueError
+            else:
+                value = str(value)
+                if len(value) > field.max_length:
+                    errors.append(f'{name}: Ensure this field has no more than {field.max_length} characters.')
+                    continue
+                if name == 'email':
+                    validate_email(value)
+        except (ValueError, TypeError, InvalidOperation, ValidationError):
+            errors.append(f'{name}: Invalid value {raw.get(name)!r}.')
+            continue
+        row[name] = value
+
+    if row.get('is_available') is None:
+        row['is_available'] = True
+    if errors:
+        raise RowRejected(errors)
+    return row
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert doctors by license_number from a CSV or JSONL file. Uses COPY "
+        "into a staging table plus INSERT ... ON CONFLICT on PostgreSQL and "
+        "batched bulk_create(update_conflicts=True) elsewhere."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV/JSONL file to import, or '-' for stdin.")
+        parser.add_argument(
+            '--format', choices=('csv', 'jsonl'),
+            help="Input format. Defaults to the file extension.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help="Rows written per database round trip (default: 5000).",
+        )
+        parser.add_argument(
+            '--rejects',
+            help="Write rejected rows with their errors to this JSONL file.",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Validate the input and report rejections without writing.",
+        )
+
+    def handle(self, path, **options):
+        input_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        self.dry_run = options['dry_run']
+        self.use_copy = connection.vendor == 'postgresql'
+        self.rejections = []
+        self.created = self.updated = 0
+        self.seen_emails = {}
+
+        started = time.perf_counter()
+        total = 0
+        handle = sys.stdin if path == '-' else self._open(path)
+        try:
+            batch = []
+            for line_number, raw in self._read(handle, input_format):
+                total += 1
+                try:
+                    row = clean_row(raw)
+                except RowRejected as exc:
+                    self._reject(line_number, raw, exc.args[0])
+                    continue
+                batch.append((line_number, row))
+                if len(batch) >= batch_size:
+                    self._write_batch(batch)
+                    batch = []
+            if batch:
+                self._write_batch(batch)
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+        elapsed = time.perf_counter() - started
+
+        if (self.created or self.updated) and not self.dry_run:
+            # Bulk writes bypass the model signals that invalidate the directory cache
+            bump_directory_version()
+            bump_committed_version()
+        self._report(total, elapsed, options.get('rejects'))
+
+    def _open(self, path):
+        try:
+            return open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f"Cannot open {path}: {exc}")
+
+    def _read(self, handle, input_format):
+        """
+        Yield ``(line_number, raw_row)`` pairs without loading the whole file
+        """
+        if input_format == 'csv':
+            reader = csv.DictReader(handle)
+            for raw in reader:
+                yield reader.line_num, raw
+            return
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+    def _reject(self, line_number, raw, errors):
+        license_number = raw.get('license_number') if isinstance(raw, dict) else None
+        self.rejections.append({'line': line_number, 'license_number': license_number, 'errors': errors})
+
+    def _write_batch(self, batch):
+        """
+        Resolve duplicates and email conflicts for the batch with one query,
+        then upsert the surviving rows
+        """
+        rows_by_license = {}
+        for line_number, row in batch:
+            license_number, email = row['license_number'], row['email']
+            owner = self.seen_emails.get(email)
+            if owner is not None and owner != license_number:
+                self._reject(line_number, row, [f'email: Already used by license {owner} earlier in the input.'])
+                continue
+            previous = rows_by_license.get(license_number)
+            if previous is not None:
+                # The later row for a license wins; ON CONFLICT cannot touch a row twice
+                self._reject(previous[0], previous[1], ['license_number: Superseded by a later row in the input.'])
+            self.seen_emails[email] = license_number
+            rows_by_license[license_number] = (line_number, row)
+
+        licenses = list(rows_by_license)
+        emails = [row['email'] for _, row in rows_by_license.values()]
+        existing_licenses = set()
+        email_owners = {}
+        existing = {}
+        for doctor_id, email, license_number, specialization in Doctor.objects.filter(
+            Q(license_number__in=licenses) | Q(email__in=emails)
+        ).values_list('id', 'email', 'license_number', 'specialization'):
+            email_owners[email] = license_number
+            existing_licenses.add(license_number)
+            existing[license_number] = (doctor_id, specialization)
+        existing_licenses &= set(licenses)
+
+        accepted = []
+        for license_number, (line_number, row) in rows_by_license.items():
+            owner = email_owners.get(row['email'])
+            if owner is not None and owner != license_number:
+                self._reject(line_number, row, [f'email: Already used by the doctor with license {owner}.'])
+                continue
+            accepted.append((line_number, row))
+        if not accepted or self.dry_run:
+            self._count(accepted, existing_licenses)
+            return
+
+        try:
+            with transaction.atomic():
+                if self.use_copy:
+                    self._copy_upsert([row for _, row in accepted])
+                else:
+                    Doctor.objects.bulk_create(
+                        [Doctor(**row) for _, row in accepted],
+                        update_conflicts=True,
+                        unique_fields=['license_number'],
+                        update_fields=UPDATE_FIELDS,
+                    )
+                # Moving a doctor to another specialization shifts the
+                # dashboard counters of the users whose patients they treat
+                respecialized = [
+                    existing[row['license_number']][0] for _, row in accepted
+                    if row['license_number'] in existing
+                    and existing[row['license_number']][1] != row['specialization']
+                ]
+                if respecialized:
+                    recount_for_doctors(respecialized)
+        except IntegrityError as exc:
+            for line_number, row in accepted:
+                self._reject(line_number, row, [f'database: {exc}'.strip()])
+            return
+        self._count(accepted, existing_licenses)
+
+    def _count(self, accepted, existing_licenses):
+        updated = sum(1 for _, row in accepted if row['license_number'] in existing_licenses)
+        self.updated += updated
+        self.created += len(accepted) - updated
+
+    def _copy_upsert(self, rows):
+        """
+        COPY the rows into a transaction-scoped staging table and merge them
+        into the doctor table with one INSERT ... ON CONFLICT statement
+        """
+        quote = connection.ops.quote_name
+        table = quote(Doctor._meta.db_table)
+        staging = quote('doctors_import_staging')
+        columns = ', '.join(quote(name) for name in IMPORT_FIELDS)
+        definitions = ', '.join(
+            f'{quote(name)} {Doctor._meta.get_field(name).db_type(connection)}'
+            for name in IMPORT_FIELDS
+        )
+        assignments = ', '.join(f'{quote(name)} = EXCLUDED.{quote(name)}' for name in UPDATE_FIELDS)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([COPY_NULL if row[name] is None else row[name] for name in IMPORT_FIELDS])
+        buffer.seek(0)
+
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TEMPORARY TABLE {staging} ({definitions}) ON COMMIT DROP')
+            cursor.copy_expert(
+                f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}, {quote("created_at")}, {quote("updated_at")}) '
+                f'SELECT {columns}, %s, %s FROM {staging} '
+                f'ON CONFLICT ({quote("license_number")}) DO UPDATE SET {assignments}',
+                [now, now]
+            )
+
+    def _report(self, total, elapsed, rejects_path):
+        rate = total / elapsed if elapsed > 0 else float(total)
+        action = 'Validated' if self.dry_run else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {total} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec): "
+            f"{self.created} created, {self.updated} updated, {len(self.rejections)} rejected."
+        ))
+        if rejects_path:
+            with open(rejects_path, 'w', encoding='utf-8') as fh:
+                for rejection in self.rejections:
+                    fh.write(json.dumps(rejection) + '\n')
+            self.stdout.write(f"Rejected rows written to {rejects_path}")
+        else:
+            for rejection in self.rejections[:20]:
+                self.stderr.write(f"line {rejection['line']}: {'; '.join(rejection['errors'])}")
+            if len(self.rejections) > 20:
+                self.stderr.write(f"... and {len(self.rejections) - 20} more; use --rejects to save them all.")
@@ -19,6 +19,17 @@ class Doctor(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Directory filters; the trailing (name, id) serves the default sort
+            models.Index(fields=['specialization', 'is_available', 'name', 'id'], name='doctor_spec_avail_name_idx'),
+            models.Index(fields=['is_available', 'name', 'id'], name='doctor_avail_name_idx'),
+            models.Index(fields=['name', 'id'], name='doctor_name_idx'),
+            models.Index(fields=['experience_years', 'id'], name='doctor_experience_idx'),
+            models.Index(fields=['consultation_fee'], name='doctor_fee_idx'),
+            models.Index(fields=['created_at', 'id'], name='doctor_created_idx'),
+            # Autocomplete refreshes read the recently saved rows
+            models.Index(fields=['updated_at'], name='doctor_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Dr. {self.name} - {self.specialization}"
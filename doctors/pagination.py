@@ -0,0 +1,28 @@
+from healthcare_backend.pagination import KeysetPagination
+
+
+class DoctorCursorPagination(KeysetPagination):
+    """
+    Cursor pagination for the doctor directory. The sort key is chosen by
+    the ``?ordering=`` filter and ``id`` breaks ties in the same direction.
+    """
+    ordering = ('name', 'id')
+
+    def __init__(self, sort='name'):
+        self.sort = sort
+
+    def get_ordering(self, request):
+        tie_breaker = '-id' if self.sort.startswith('-') else 'id'
+        return (self.sort, tie_breaker)
+
+
+class DoctorCaseloadPagination(DoctorCursorPagination):
+    """
+    Directory pagination that can also sort by the annotated
+    ``active_patients`` count
+    """
+
+    def cursor_to_python(self, model, name, value):
+        if name == 'active_patients':
+            return int(value)
+        return super().cursor_to_python(model, name, value)
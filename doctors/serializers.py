@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from healthcare_backend.projections import ValuesProjection
 from .models import Doctor
 
 class DoctorSerializer(serializers.ModelSerializer):
@@ -47,4 +48,18 @@ class DoctorUpdateSerializer(DoctorSerializer):
     """
     Serializer for updating doctors
     """
-    pass
\ No newline at end of file
+    pass
+
+class DoctorCaseloadSerializer(DoctorSerializer):
+    """
+    Serializer for a doctor together with the ``active_patients`` count
+    annotated by the caseload view
+    """
+    active_patients = serializers.IntegerField(read_only=True)
+
+    class Meta(DoctorSerializer.Meta):
+        fields = DoctorSerializer.Meta.fields + ['active_patients']
+
+# Read paths for GETs
+doctor_projection = ValuesProjection(DoctorSerializer)
+doctor_caseload_projection = ValuesProjection(DoctorCaseloadSerializer)
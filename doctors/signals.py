@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import doctor_index
+from .cache import bump_committed_version, bump_directory_version
+from .models import Doctor
+
+
+@receiver(post_save, sender=Doctor)
+def doctor_saved(sender, instance, **kwargs):
+    """
+    Orphan every cached directory response after a doctor changes, and again
+    once the change commits, when it is also applied to the autocomplete index
+    """
+    bump_directory_version()
+
+    def committed():
+        bump_directory_version()
+        doctor_index.update(instance, bump_committed_version())
+
+    transaction.on_commit(committed)
+
+
+@receiver(post_delete, sender=Doctor)
+def doctor_deleted(sender, instance, **kwargs):
+    """
+    Orphan every cached directory response after a doctor is deleted, and
+    again once the delete commits, when the doctor also leaves the
+    autocomplete index
+    """
+    bump_directory_version()
+    doctor_pk = instance.pk
+
+    def committed():
+        bump_directory_version()
+        doctor_index.remove(doctor_pk, bump_committed_version())
+
+    transaction.on_commit(committed)
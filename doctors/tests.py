@@ -1,3 +1,317 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from healthcare_backend.testing import seed_dataset
+
+from .autocomplete import doctor_index
+from .cache import VERSION_KEY, get_directory_version
+from .models import Doctor
+
+User = get_user_model()
+
+
+class ImportDoctorsCommandTests(TestCase):
+    """
+    Batched upsert of the doctor directory by license_number
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Doctor.objects.create(
+            name='Existing', email='existing@hospital.test', phone='1', specialization='Cardiology',
+            qualification='MD', experience_years=5, license_number='LIC-1', consultation_fee='100.00'
+        )
+        Doctor.objects.create(
+            name='Other', email='other@hospital.test', phone='2', specialization='Neurology',
+            qualification='MD', experience_years=7, license_number='LIC-2'
+        )
+
+    def write(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_doctors', path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv_import_creates_updates_and_rejects(self):
+        path = self.write('.csv', '\n'.join([
+            'name,email,phone,specialization,qualification,experience_years,license_number,'
+            'hospital_affiliation,consultation_fee,is_available',
+            'Updated,existing@hospital.test,9,Cardiology,MD PhD,6,LIC-1,City,150.50,false',
+            'New,new@hospital.test,3,Oncology,MD,1,LIC-3,,,',
+            'Bad,bad@hospital.test,4,Oncology,MD,-1,LIC-4,,,',
+            'Stolen,other@hospital.test,5,Oncology,MD,2,LIC-5,,,',
+            'First,first@hospital.test,6,Oncology,MD,2,LIC-6,,,',
+            'Second,second@hospital.test,7,Oncology,MD,3,LIC-6,,,',
+        ]) + '\n')
+        rejects = self.write('.jsonl', '')
+        version = get_directory_version()
+
+        stdout, _ = self.run_import(path, '--batch-size', '10', '--rejects', rejects)
+
+        self.assertGreater(get_directory_version(), version)
+
+        self.assertIn('2 created, 1 updated, 3 rejected', stdout)
+        updated = Doctor.objects.get(license_number='LIC-1')
+        self.assertEqual((updated.name, str(updated.consultation_fee), updated.is_available), ('Updated', '150.50', False))
+        self.assertTrue(Doctor.objects.get(license_number='LIC-3').is_available)
+        self.assertEqual(Doctor.objects.get(license_number='LIC-6').name, 'Second')
+        self.assertFalse(Doctor.objects.filter(license_number__in=['LIC-4', 'LIC-5']).exists())
+        with open(rejects) as fh:
+            lines = sorted(json.loads(line)['line'] for line in fh)
+        self.assertEqual(lines, [4, 5, 6])
+
+    def test_jsonl_dry_run_writes_nothing(self):
+        path = self.write('.jsonl', json.dumps({
+            'name': 'New', 'email': 'new@hospital.test', 'phone': '3', 'specialization': 'Oncology',
+            'qualification': 'MD', 'experience_years': 1, 'license_number': 'LIC-3', 'is_available': True,
+        }) + '\nnot json\n')
+
+        stdout, stderr = self.run_import(path, '--dry-run')
+
+        self.assertIn('Validated 2 rows', stdout)
+        self.assertIn('1 created, 0 updated, 1 rejected', stdout)
+        self.assertIn('line 2', stderr)
+        self.assertFalse(Doctor.objects.filter(license_number='LIC-3').exists())
+
+
+class DoctorDirectoryCacheTests(APITestCase):
+    """
+    Versioned caching of rendered directory responses
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.doctor = Doctor.objects.create(
+            name='Cached', email='cached@hospital.test', phone='1', specialization='Cardiology',
+            qualification='MD', experience_years=5, license_number='LIC-1', consultation_fee='100.00'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_cache_hits_skip_the_database(self):
+        for url in (reverse('doctor-list-create'), reverse('doctor-detail', args=[self.doctor.pk])):
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(second.content, first.content)
+
+    def test_query_strings_are_cached_separately(self):
+        self.client.get(reverse('doctor-list-create'))
+        response = self.client.get(reverse('doctor-list-create'), {'specialization': 'Neurology'})
+        self.assertEqual(response.json()['results'], [])
+
+    def test_writes_invalidate_cached_responses(self):
+        url = reverse('doctor-detail', args=[self.doctor.pk])
+        self.client.get(url)
+        version = get_directory_version()
+
+        Doctor.objects.filter(pk=self.doctor.pk).update(name='Stale')
+        self.assertEqual(self.client.get(url).json()['name'], 'Cached')
+
+        doctor = Doctor.objects.get(pk=self.doctor.pk)
+        doctor.name = 'Renamed'
+        doctor.save()
+        self.assertGreater(get_directory_version(), version)
+        self.assertEqual(self.client.get(url).json()['name'], 'Renamed')
+
+        doctor.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_responses_cached_before_commit_are_orphaned(self):
+        url = reverse('doctor-detail', args=[self.doctor.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor.name = 'Renamed'
+            self.doctor.save()
+            # Filled while the write is still uncommitted
+            self.client.get(url)
+
+        Doctor.objects.filter(pk=self.doctor.pk).update(name='Committed')
+        self.assertEqual(self.client.get(url).json()['name'], 'Committed')
+
+    def test_list_etag_follows_the_directory_version(self):
+        url = reverse('doctor-list-create')
+        etag = self.client.get(url)['ETag']
+        # Revalidated without a query, even once the entry is gone
+        version = get_directory_version()
+        cache.clear()
+        cache.set(VERSION_KEY, version, timeout=None)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.doctor.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_sparse_fieldsets_are_cached_per_selection(self):
+        url = reverse('doctor-detail', args=[self.doctor.pk])
+        self.assertEqual(set(self.client.get(url, {'fields': 'id,name'}).json()), {'id', 'name'})
+        self.assertIn('license_number', self.client.get(url).json())
+
+        response = self.client.get(reverse('doctor-list-create'), {'fields': 'name,specialization'})
+        self.assertEqual(response.json()['results'], [{'name': 'Cached', 'specialization': 'Cardiology'}])
+
+
+class DoctorCaseloadTests(APITestCase):
+    """
+    The directory annotated with active patient counts
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from mappings.models import PatientDoctorMapping
+
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.patients, cls.doctors, _ = seed_dataset(cls.user, 4)
+        # Doctor 0 keeps the four seeded mappings; doctor 1 gains two more, one inactive
+        PatientDoctorMapping.objects.bulk_create([
+            PatientDoctorMapping(patient=cls.patients[1], doctor=cls.doctors[1]),
+            PatientDoctorMapping(patient=cls.patients[2], doctor=cls.doctors[1], is_active=False),
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def caseload(self, **params):
+        response = self.client.get(reverse('doctor-caseload'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_active_mappings_in_one_query(self):
+        with self.assertNumQueries(1):
+            results = self.caseload(fields='name,active_patients')['results']
+        self.assertEqual([row['active_patients'] for row in results], [1, 2, 1, 1])
+        self.assertEqual(set(results[0]), {'name', 'active_patients'})
+
+    def test_ordering_by_caseload_pages_through_every_doctor(self):
+        body = self.caseload(ordering='-active_patients', page_size=3)
+        ids = [row['id'] for row in body['results']]
+        self.assertEqual(ids[0], self.doctors[1].pk)
+        ids += [row['id'] for row in self.client.get(body['next']).json()['results']]
+        self.assertEqual(sorted(ids), sorted(doctor.pk for doctor in self.doctors))
+
+    def test_directory_filters_apply(self):
+        results = self.caseload(specialization='Dermatology')['results']
+        self.assertEqual([row['id'] for row in results], [self.doctors[1].pk])
+        response = self.client.get(reverse('doctor-caseload'), {'ordering': 'fee'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DoctorAutocompleteTests(APITestCase):
+    """
+    Prefix suggestions from the in-process doctor index
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        defaults = {'phone': '1', 'qualification': 'MD', 'experience_years': 5}
+        cls.zoe = Doctor.objects.create(
+            name='Zoë Carter', email='zoe@hospital.test', specialization='Cardiology',
+            license_number='LIC-1', **defaults
+        )
+        cls.carl = Doctor.objects.create(
+            name='Carl Jones', email='carl@hospital.test', specialization='Dermatology',
+            license_number='LIC-2', is_available=False, **defaults
+        )
+        cls.amy = Doctor.objects.create(
+            name='Amy Wu', email='amy@hospital.test', specialization='Cardiac Surgery',
+            license_number='LIC-3', **defaults
+        )
+
+    def setUp(self):
+        cache.clear()
+        doctor_index.clear()
+        self.client.force_authenticate(self.user)
+
+    def suggest(self, query, **params):
+        response = self.client.get(reverse('doctor-autocomplete'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()['results']]
+
+    def test_matches_word_prefixes_of_name_and_specialization(self):
+        # Name matches first, then specialization matches, each alphabetical
+        self.assertEqual(self.suggest('car'), ['Carl Jones', 'Zoë Carter', 'Amy Wu'])
+        self.assertEqual(self.suggest('zoe car'), ['Zoë Carter'])
+        self.assertEqual(self.suggest('derm'), ['Carl Jones'])
+        self.assertEqual(self.suggest('xyz'), [])
+
+    def test_limit_and_availability(self):
+        self.assertEqual(self.suggest('car', limit=1), ['Carl Jones'])
+        self.assertEqual(self.suggest('car', is_available='true'), ['Zoë Carter', 'Amy Wu'])
+        self.assertEqual(self.suggest('car', is_available='false'), ['Carl Jones'])
+        with self.settings(DOCTOR_AUTOCOMPLETE_MAX_LIMIT=2):
+            self.assertEqual(len(self.suggest('car', limit=50)), 2)
+
+    def test_index_is_updated_incrementally(self):
+        self.suggest('car')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.amy.name = 'Amy Carmichael'
+            self.amy.save()
+            Doctor.objects.create(
+                name='Cara Lee', email='cara@hospital.test', phone='1', specialization='Neurology',
+                qualification='MD', experience_years=1, license_number='LIC-4'
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.suggest('car'),
+                ['Cara Lee', 'Carl Jones', 'Amy Carmichael', 'Zoë Carter']
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.carl.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('carl'), [])
+
+    def test_rebuilds_after_writes_that_bypass_signals(self):
+        from .cache import bump_committed_version
+
+        self.suggest('car')
+        Doctor.objects.filter(pk=self.zoe.pk).update(name='Zoe Baker')
+        bump_committed_version()
+        self.assertEqual(self.suggest('bak'), ['Zoe Baker'])
+
+    def test_refresh_reads_only_changed_rows(self):
+        from .cache import bump_committed_version
+
+        self.suggest('car')
+        # Written by another process: no signals here, only the shared version
+        Doctor.objects.filter(pk=self.zoe.pk).update(name='Zoe Baker', updated_at=timezone.now())
+        Doctor.objects.filter(pk=self.carl.pk).delete()
+        bump_committed_version()
+        with self.assertNumQueries(3):
+            self.assertEqual(self.suggest('ba'), ['Zoe Baker'])
+        self.assertEqual(self.suggest('carl'), [])
+
+    def test_refreshes_without_a_shared_version(self):
+        self.suggest('car')
+        Doctor.objects.filter(pk=self.zoe.pk).update(name='Zoe Baker', updated_at=timezone.now())
+        self.assertEqual(self.suggest('bak'), [])
+        with self.settings(DOCTOR_AUTOCOMPLETE_REFRESH_SECONDS=0):
+            self.assertEqual(self.suggest('bak'), ['Zoe Baker'])
 
-# Create your tests here.
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get(reverse('doctor-autocomplete')).status_code, 400)
@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the read endpoints are served by native async views
+reads = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.doctor_list_create, name='doctor-list-create'),
-    path('<int:pk>/', views.doctor_detail, name='doctor-detail'),
+    path('', reads.doctor_list_create, name='doctor-list-create'),
+    path('autocomplete/', views.doctor_autocomplete, name='doctor-autocomplete'),
+    path('caseload/', views.doctor_caseload, name='doctor-caseload'),
+    path('<int:pk>/', reads.doctor_detail, name='doctor-detail'),
+    path('export/<str:export_format>/', views.doctor_export, name='doctor-export'),
 ]
\ No newline at end of file
@@ -2,24 +2,67 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.db.models import Count, Q
+from healthcare_backend.conditional import (
+    detail_not_modified,
+    detail_representation,
+    is_conditional,
+    updated_at_query
+)
+from healthcare_backend.db.routers import use_primary
+from healthcare_backend.exports import stream_export
+from healthcare_backend.throttling import throttle_scope
+from .autocomplete import doctor_index
+from .cache import cache_response, cached_response, directory_cache_key, directory_etag, get_cached_entry
 from .models import Doctor
-from .serializers import DoctorSerializer, DoctorCreateSerializer, DoctorUpdateSerializer
+from .filters import DoctorAutocompleteSerializer, DoctorCaseloadFilterSerializer, filter_doctors
+from .pagination import DoctorCaseloadPagination, DoctorCursorPagination
+from .serializers import (
+    DoctorSerializer, DoctorCreateSerializer, DoctorUpdateSerializer,
+    doctor_caseload_projection, doctor_projection
+)
 
+
+# The GET steps below are shared with ``doctors.async_views``, which only
+# runs the queries and cache lookups differently
+
+def list_page(request):
+    """
+    Return the ``(projection, paginator, rows)`` of a directory page, whose
+    rows are read through the paginator
+    """
+    doctors, ordering = filter_doctors(Doctor.objects.all(), request.query_params)
+    projection = doctor_projection.for_request(request)
+    paginator = DoctorCursorPagination(sort=ordering)
+    return projection, paginator, projection.values(doctors, ordering.lstrip('-'), 'id')
+
+
+def list_data(projection, paginator, page):
+    return paginator.get_paginated_response(projection.many(page)).data
+
+@throttle_scope('list')
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def doctor_list_create(request):
     """
-    GET: Retrieve all doctors
+    GET: Retrieve the doctor directory, filtered, sorted and cursor-paginated
     POST: Create a new doctor
     """
     if request.method == 'GET':
-        doctors = Doctor.objects.all()
-        serializer = DoctorSerializer(doctors, many=True)
-        return Response({
-            'count': doctors.count(),
-            'results': serializer.data
-        }, status=status.HTTP_200_OK)
+        cache_key = directory_cache_key('list', request)
+        # Revalidation needs no query: the ETag only depends on the key
+        etag = directory_etag(cache_key)
+        response = cached_response(request, get_cached_entry(cache_key), etag)
+        if response is not None:
+            return response
+
+        # Filled from the primary: the cached entry is shared by every user
+        with use_primary():
+            projection, paginator, rows = list_page(request)
+            page = paginator.paginate_queryset(rows, request)
+            return cache_response(cache_key, list_data(projection, paginator, page), etag)
     
     elif request.method == 'POST':
         serializer = DoctorCreateSerializer(data=request.data)
@@ -31,6 +74,45 @@ def doctor_list_create(request):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def doctor_autocomplete(request):
+    """
+    GET: Suggest doctors whose name or specialization has a word starting
+    with ``q``, answered from the in-process prefix index
+    """
+    params = DoctorAutocompleteSerializer(data=request.query_params.dict())
+    params.is_valid(raise_exception=True)
+    limit = min(
+        params.validated_data.get('limit', settings.DOCTOR_AUTOCOMPLETE_LIMIT),
+        settings.DOCTOR_AUTOCOMPLETE_MAX_LIMIT
+    )
+    results = doctor_index.search(
+        params.validated_data['q'],
+        limit,
+        is_available=params.validated_data.get('is_available')
+    )
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def doctor_caseload(request):
+    """
+    GET: Retrieve the doctor directory with each doctor's number of active
+    patients, filtered, sorted and cursor-paginated like the directory
+    """
+    doctors, ordering = filter_doctors(
+        Doctor.objects.all(), request.query_params, params_class=DoctorCaseloadFilterSerializer
+    )
+    # One grouped query: the counts are aggregated in SQL, not per doctor
+    doctors = doctors.annotate(
+        active_patients=Count('patient_mappings', filter=Q(patient_mappings__is_active=True))
+    )
+    projection = doctor_caseload_projection.for_request(request)
+    paginator = DoctorCaseloadPagination(sort=ordering)
+    page = paginator.paginate_queryset(projection.values(doctors, ordering.lstrip('-'), 'id'), request)
+    return paginator.get_paginated_response(projection.many(page))
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def doctor_detail(request, pk):
@@ -39,13 +121,27 @@ def doctor_detail(request, pk):
     PUT: Update a doctor
     DELETE: Delete a doctor
     """
-    doctor = get_object_or_404(Doctor, pk=pk)
-    
     if request.method == 'GET':
-        serializer = DoctorSerializer(doctor)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        cache_key = directory_cache_key('detail', request)
+        response = cached_response(request, get_cached_entry(cache_key))
+        if response is not None:
+            return response
+
+        # Filled from the primary: the cached entry is shared by every user
+        with use_primary():
+            doctors = Doctor.objects.filter(pk=pk)
+            if is_conditional(request):
+                # Answer revalidation from the updated_at column alone
+                response = detail_not_modified(request, pk, next(iter(updated_at_query(doctors)), None))
+                if response is not None:
+                    return response
+            projection = doctor_projection.for_request(request)
+            row = projection.get(doctors, 'id', 'updated_at')
+            return cache_response(cache_key, *detail_representation(projection, row))
     
-    elif request.method == 'PUT':
+    doctor = get_object_or_404(Doctor, pk=pk)
+    
+    if request.method == 'PUT':
         serializer = DoctorUpdateSerializer(doctor, data=request.data)
         if serializer.is_valid():
             doctor = serializer.save()
@@ -60,3 +156,14 @@ def doctor_detail(request, pk):
         return Response({
             'message': 'Doctor deleted successfully'
         }, status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def doctor_export(request, export_format):
+    """
+    GET: Stream the doctor directory as NDJSON or CSV, honouring the list filters
+    """
+    doctors, ordering = filter_doctors(Doctor.objects.all(), request.query_params)
+    tie_breaker = '-id' if ordering.startswith('-') else 'id'
+    doctors = doctors.order_by(ordering, tie_breaker)
+    return stream_export(doctors, DoctorSerializer, export_format, 'doctors')
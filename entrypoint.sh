@@ -18,5 +18,27 @@ if not User.objects.filter(email='admin@healthcare.com').exists():
     User.objects.create_superuser(email='admin@healthcare.com', username='admin', password='admin123', name='Admin User')
 "
 
-echo "Starting Django server..."
-python manage.py runserver 0.0.0.0:8000
+# SERVE_MODE selects the server:
+#   wsgi - gunicorn with pre-forked sync/threaded workers (default)
+#   asgi - gunicorn with pre-forked uvicorn workers and the async read views
+#   dev  - Django's autoreloading development server, single process
+SERVE_MODE=${SERVE_MODE:-wsgi}
+case "$SERVE_MODE" in
+    wsgi)
+        echo "Starting gunicorn (WSGI)..."
+        exec gunicorn --config gunicorn.conf.py healthcare_backend.wsgi:application
+        ;;
+    asgi)
+        echo "Starting gunicorn with uvicorn workers (ASGI)..."
+        exec gunicorn --config gunicorn.conf.py --worker-class uvicorn.workers.UvicornWorker \
+            healthcare_backend.asgi:application
+        ;;
+    dev)
+        echo "Starting Django development server..."
+        exec python manage.py runserver 0.0.0.0:8000
+        ;;
+    *)
+        echo "Unknown SERVE_MODE '$SERVE_MODE': use wsgi, asgi or dev" >&2
+        exit 1
+        ;;
+esac
@@ -0,0 +1,101 @@
+"""
+Gunicorn configuration for the production serve mode (``SERVE_MODE=wsgi`` or
+``SERVE_MODE=asgi`` in ``entrypoint.sh``).
+
+The application is imported once in the master process and the workers are
+forked from it, so they share its memory copy-on-write and a broken import
+fails at startup instead of in every worker. Every setting can be overridden
+from the environment (or ``.env``):
+
+    GUNICORN_BIND              - listen address (default: 0.0.0.0:8000)
+    WEB_CONCURRENCY            - worker processes (default: 2 x CPUs + 1)
+    GUNICORN_THREADS           - threads per sync worker (default: 4)
+    GUNICORN_WORKER_CLASS      - worker class (default: gthread, or sync for
+                                 one thread; uvicorn.workers.UvicornWorker
+                                 serves the ASGI application)
+    GUNICORN_TIMEOUT           - seconds a worker may spend on one request
+                                 before it is killed and replaced (default: 30)
+    GUNICORN_GRACEFUL_TIMEOUT  - seconds workers get to finish in-flight
+                                 requests on restart or shutdown (default: 30)
+    GUNICORN_KEEPALIVE         - seconds to hold idle keep-alive connections
+                                 (default: 5)
+    GUNICORN_MAX_REQUESTS      - requests after which a worker is recycled,
+                                 0 to disable (default: 1000)
+
+The directory cache version, replica pins, throttle buckets in ``cache``
+mode and search snapshots must be seen by every worker, so the master refuses
+to start more than one worker while ``CACHE_BACKEND`` is a per-process cache.
+
+Send ``HUP`` to the master for a graceful restart: new workers are forked
+before the old ones finish their requests. Because the application is
+preloaded, code changes need a full restart (or ``USR2`` followed by
+``QUIT`` to the old master).
+"""
+
+import multiprocessing
+
+# Imported as a module: gunicorn treats every global as a setting, and
+# ``config`` is one of them
+import decouple
+
+bind = decouple.config('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = decouple.config('WEB_CONCURRENCY', default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+threads = decouple.config('GUNICORN_THREADS', default=4, cast=int)
+worker_class = decouple.config('GUNICORN_WORKER_CLASS', default='gthread' if threads > 1 else 'sync')
+
+preload_app = True
+timeout = decouple.config('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = decouple.config('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = decouple.config('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+# Recycle workers periodically, staggered so they do not restart together
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = decouple.config('GUNICORN_LOG_LEVEL', default='info')
+
+
+# Cache backends whose entries live in one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def on_starting(server):
+    """
+    Stop before forking several workers that would each keep their own cache
+    """
+    from django.conf import settings
+
+    backend = settings.CACHES['default']['BACKEND']
+    if server.cfg.workers > 1 and backend in PROCESS_LOCAL_CACHES:
+        raise RuntimeError(
+            f"{server.cfg.workers} workers cannot share the per-process cache {backend}: "
+            "set CACHE_BACKEND to a shared cache (e.g. RedisCache) or WEB_CONCURRENCY=1."
+        )
+
+
+def pre_fork(server, worker):
+    """
+    Close database connections the master opened while loading the
+    application, so no worker inherits and shares its socket
+    """
+    from django.db import connections
+
+    from healthcare_backend.db.pool import close_idle_connections
+
+    connections.close_all()
+    close_idle_connections()
+
+
+def worker_exit(server, worker):
+    """
+    Log the worker's connection pool metrics when it exits
+    """
+    from healthcare_backend.db.pool import pool_stats
+
+    for alias, stats in pool_stats().items():
+        server.log.info("Worker %s database pool '%s': %s", worker.pid, alias, stats)
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
+# Route the read endpoints to their native async views (see
+# healthcare_backend.async_views); set ASYNC_VIEWS=False to serve the sync ones
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
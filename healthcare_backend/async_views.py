@@ -0,0 +1,97 @@
+"""
+Native async read endpoints for the ASGI deployment.
+
+DRF 3.14 views are synchronous, so under ASGI Django runs every one of them
+in a worker thread and the request holds that thread while it waits on the
+database. ``async_read_view`` builds a view for an existing ``@api_view``
+route whose GET is a coroutine reading through Django's async ORM
+(``async for``, ``aaggregate``, ``acount``), while every other method is
+handed to the sync view unchanged, so writes keep a single implementation.
+
+DRF's request setup (authentication with the ``api_settings``
+authenticators, permissions, throttles and content negotiation) is
+synchronous and may query the database; it runs in one ``sync_to_async``
+call per request. The authentication, permission and throttle policies are
+copied from the sync view, so both paths enforce the same rules.
+
+The async views are routed when the ``ASYNC_VIEWS`` setting is on, which
+``healthcare_backend.asgi`` enables. Under WSGI they would need an event loop
+per request, so the sync views are routed there.
+"""
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+# ``@api_view`` attributes shared with the sync view of the same route
+POLICY_ATTRIBUTES = (
+    'authentication_classes',
+    'permission_classes',
+    'throttle_classes',
+    'throttle_scope',
+    'renderer_classes',
+    'parser_classes',
+    'content_negotiation_class',
+    'metadata_class',
+    'versioning_class',
+)
+
+
+class AsyncReadView(APIView):
+    """
+    ``APIView`` whose GET handler is a coroutine. Other methods, including
+    OPTIONS and 405 responses, are answered by ``sync_view``.
+    """
+    sync_view = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def async_read_view(sync_view):
+    """
+    Decorate an ``async def handler(request, **kwargs)`` into a view that
+    serves GET for ``sync_view``'s route and delegates the other methods to it
+    """
+    def decorator(handler):
+        async def get(self, request, *args, **kwargs):
+            return await handler(request, *args, **kwargs)
+
+        attrs = {
+            'get': get,
+            'sync_view': staticmethod(sync_view),
+            '__doc__': handler.__doc__,
+            '__module__': handler.__module__,
+        }
+        for name in POLICY_ATTRIBUTES:
+            if hasattr(sync_view.cls, name):
+                attrs[name] = getattr(sync_view.cls, name)
+        view_class = type(handler.__name__, (AsyncReadView,), attrs)
+        return view_class.as_view()
+    return decorator
+
+
+async def afirst(queryset):
+    """
+    Return the first row of ``queryset``, or ``None``, like the sync views'
+    ``next(iter(queryset), None)``; unlike ``QuerySet.afirst()`` it adds no
+    ORDER BY, so the caller limits the queryset
+    """
+    async for row in queryset:
+        return row
+    return None
@@ -0,0 +1,91 @@
+"""
+Conditional GET support for the API views.
+
+Detail responses carry an ETag derived from ``(id, updated_at)`` and list
+responses one derived from state that is cheap to read: the patient list from
+an indexed latest ``updated_at`` and the owner's dashboard counters, the
+doctor directory from its cache version. ``If-None-Match``/
+``If-Modified-Since`` requests can then be answered with 304 Not Modified
+before any row is loaded or serialized, and no list request counts its rows.
+
+The steps between the queries are shared by the sync views and their async
+twins, which differ only in how they run the queries.
+"""
+
+import hashlib
+
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def is_conditional(request):
+    """
+    True when the client sent a validator we can answer with a 304
+    """
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def detail_etag(pk, updated_at):
+    return quote_etag(f'{pk}-{updated_at.timestamp():.6f}')
+
+
+def list_etag(request, latest, count, *scope):
+    """
+    ETag for one page of a list. The full path is included because the page
+    depends on the query string; ``scope`` separates per-user lists.
+    """
+    parts = [request.get_full_path(), latest.isoformat() if latest else '', str(count)]
+    parts.extend(str(value) for value in scope)
+    return quote_etag(hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest())
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Return a 304 response when the request's validators still match, or None
+    when the full response has to be built
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def updated_at_query(queryset):
+    """
+    The one-row ``updated_at`` read that answers a detail revalidation
+    """
+    return queryset.order_by().values_list('updated_at', flat=True)[:1]
+
+
+def detail_not_modified(request, pk, updated_at):
+    """
+    Answer a detail revalidation from the row's ``updated_at`` alone: return
+    a 304 response, or None when the full response has to be built. Raises
+    Http404 when the row does not exist.
+    """
+    if updated_at is None:
+        raise Http404
+    return not_modified(request, detail_etag(pk, updated_at), updated_at)
+
+
+def detail_representation(projection, row):
+    """
+    Return ``(data, etag, last_modified)`` for a detail row read with its
+    ``id`` and ``updated_at``. Raises Http404 when the row does not exist.
+    """
+    if row is None:
+        raise Http404
+    return projection.to_representation(row), detail_etag(row['id'], row['updated_at']), row['updated_at']
@@ -0,0 +1,117 @@
+"""
+PostgreSQL backend that checks connections out of a per-process pool.
+
+Django's PostgreSQL backend opens a new connection on the first query of a
+request and closes it when the request finishes (``CONN_MAX_AGE = 0``), or
+keeps one open per thread. This backend keeps Django's per-request lifecycle
+but turns "open" into a pool checkout and "close" into a checkin, so a
+request costs no TCP or authentication handshake. Connections are shared by
+every thread in the process and bounded by the pool size (see
+``healthcare_backend.db.pool``, whose ``pool_stats()`` reports them by
+database alias).
+
+Configure it with ``CONN_MAX_AGE = 0`` and the pool options under
+``OPTIONS['pool']``, which mirror Django 5.1's built-in pool setting::
+
+    'ENGINE': 'healthcare_backend.db.backends.postgresql_pool',
+    'CONN_MAX_AGE': 0,
+    'OPTIONS': {'pool': {'max_size': 10, 'timeout': 10, 'max_idle': 300,
+                         'max_lifetime': 3600, 'check_after': 5}},
+
+An exhausted pool raises ``OperationalError`` once ``timeout`` expires.
+Returned connections are rolled back if a transaction was left open, and
+closed if they are broken.
+"""
+
+import threading
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from healthcare_backend.db.pool import ConnectionPool, PoolTimeout
+
+# libpq transaction status codes, shared by psycopg2 and psycopg 3
+TRANSACTION_IDLE = 0
+TRANSACTION_IN_TRANSACTION = 2
+TRANSACTION_IN_ERROR = 3
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def ping(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    if connection.info.transaction_status != TRANSACTION_IDLE:
+        connection.rollback()
+    return True
+
+
+def reset(connection):
+    """
+    Make a returned connection reusable: roll back an unfinished transaction,
+    and refuse connections that are closed, busy or broken
+    """
+    if connection.closed:
+        return False
+    status = connection.info.transaction_status
+    if status in (TRANSACTION_IN_TRANSACTION, TRANSACTION_IN_ERROR):
+        connection.rollback()
+        return True
+    return status == TRANSACTION_IDLE
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_pool(self, conn_params):
+        """
+        Return the pool for this alias, replacing it when the connection
+        parameters changed (e.g. when the test database is created)
+        """
+        key = sorted((name, repr(value)) for name, value in conn_params.items())
+        with _pools_lock:
+            current = _pools.get(self.alias)
+            if current is not None and current[0] == key:
+                return current[1]
+            if current is not None:
+                current[1].close()
+            options = dict(self.settings_dict['OPTIONS'].get('pool') or {})
+            pool = ConnectionPool(
+                connect=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                close=lambda connection: connection.close(),
+                check=ping,
+                reset=reset,
+                name=self.alias,
+                **options
+            )
+            _pools[self.alias] = (key, pool)
+            return pool
+
+    def get_new_connection(self, conn_params):
+        # Remembered so the connection goes back to the pool it came from
+        self.pool = self.get_pool(conn_params)
+        try:
+            connection = self.pool.checkout()
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+        # Set while connecting by the parent class; pooled connections
+        # already carry the configured isolation level
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django keeps a connection closed inside atomic() until the
+                # block exits; it must not reach another thread meanwhile
+                self.pool.discard(self.connection)
+            else:
+                self.pool.checkin(self.connection)
@@ -0,0 +1,109 @@
+"""
+Per-request replica routing (see ``healthcare_backend.db.routers``).
+
+The user is identified from the JWT access token without a database query,
+because DRF only authenticates later, inside the view. Requests without a
+valid token are routed by method alone. The bodies of streaming responses,
+such as the exports, are read after the view returns, so their iteration is
+routed the same way.
+"""
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .routers import ais_pinned, apin_to_primary, get_replicas, is_pinned, pin_to_primary, use_primary, use_replicas
+
+_authentication = JWTAuthentication()
+
+
+def route_stream(content, route):
+    """
+    Iterate ``content`` with every step inside ``route()``
+    """
+    iterator = iter(content)
+    while True:
+        with route():
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+async def aroute_stream(content, route):
+    iterator = aiter(content)
+    while True:
+        with route():
+            try:
+                chunk = await anext(iterator)
+            except StopAsyncIteration:
+                return
+        yield chunk
+
+
+def token_user_id(request):
+    """
+    Return the user id claim of a valid access token in the request, or None
+    """
+    header = _authentication.get_header(request)
+    raw_token = None if header is None else _authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        token = _authentication.get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+    return token.get(jwt_settings.USER_ID_CLAIM)
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Let safe API requests read from the replicas, unless the user is pinned
+    to the primary; pin users to the primary after an unsafe request
+    """
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.routes(request):
+            return self.get_response(request)
+        user_id = token_user_id(request)
+        if request.method in SAFE_METHODS:
+            route = use_primary if user_id is not None and is_pinned(user_id) else use_replicas
+            with route():
+                return self.route_body(self.get_response(request), route)
+        response = self.get_response(request)
+        if user_id is not None:
+            pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        if not self.routes(request):
+            return await self.get_response(request)
+        user_id = token_user_id(request)
+        if request.method in SAFE_METHODS:
+            route = use_primary if user_id is not None and await ais_pinned(user_id) else use_replicas
+            with route():
+                return self.route_body(await self.get_response(request), route)
+        response = await self.get_response(request)
+        if user_id is not None:
+            await apin_to_primary(user_id)
+        return response
+
+    def route_body(self, response, route):
+        """
+        Keep ``route`` for a streaming body, which is read after this
+        middleware returned
+        """
+        if response.streaming:
+            stream = aroute_stream if response.is_async else route_stream
+            response.streaming_content = stream(response.streaming_content, route)
+        return response
+
+    def routes(self, request):
+        return bool(get_replicas()) and request.path.startswith(tuple(settings.REPLICA_READ_PATHS))
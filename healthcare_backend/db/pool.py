@@ -0,0 +1,292 @@
+"""
+A bounded, thread-safe connection pool for one process.
+
+The pool knows nothing about a particular database driver: it is built from
+callables that open, close, health-check and reset a connection. The
+PostgreSQL backend in ``healthcare_backend.db.backends.postgresql_pool``
+wires it to psycopg.
+
+* At most ``max_size`` connections exist at once, checked out or idle.
+  ``checkout()`` waits up to ``timeout`` seconds for one to be returned and
+  then raises ``PoolTimeout``.
+* Idle connections are reused most recently used first. A connection that
+  sat idle longer than ``check_after`` seconds is health-checked before it is
+  handed out, and a failing one is replaced.
+* Connections idle for longer than ``max_idle`` seconds are closed, and so
+  are connections older than ``max_lifetime`` seconds when they are returned.
+* ``stats()`` reports gauges and counters for monitoring.
+* A forked child never uses its parent's connections: the pool forgets them
+  (without closing them, which would end the parent's sessions) on the first
+  use in a new process.
+"""
+
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+_pools = weakref.WeakSet()
+
+
+class PoolTimeout(Exception):
+    """
+    No connection became available within the pool's timeout
+    """
+
+
+class _Entry:
+    __slots__ = ('connection', 'created', 'last_used')
+
+    def __init__(self, connection, now):
+        self.connection = connection
+        self.created = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Pool of connections made by ``connect()``.
+
+    ``close(connection)`` closes one. ``check(connection)`` returns a false
+    value or raises when the connection is unusable; it is only run on
+    connections idle for longer than ``check_after``. ``reset(connection)``
+    runs when a connection is returned and may return a false value or raise
+    to have it closed instead of reused. Times are in seconds; ``None``
+    disables the corresponding limit.
+    """
+
+    def __init__(self, connect, close, check=None, reset=None, max_size=10, timeout=10.0,
+                 max_idle=300.0, max_lifetime=3600.0, check_after=5.0, name='pool'):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self.connect = connect
+        self.close_connection = close
+        self.check = check
+        self.reset = reset
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.name = name
+        self.closed = False
+        self._start()
+        _pools.add(self)
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        # Connections checked out, idle or being opened
+        self._size = 0
+        self._counters = dict.fromkeys((
+            'checkouts', 'connections_opened', 'connections_closed', 'connect_errors',
+            'waits', 'timeouts', 'health_checks', 'health_check_failures',
+            'idle_recycled', 'lifetime_expired', 'reset_failures',
+        ), 0)
+        self._wait_time = 0.0
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._start()
+
+    def checkout(self):
+        """
+        Return a connection, reusing an idle one when possible
+        """
+        self._check_pid()
+        if self.closed:
+            raise PoolTimeout(f'Pool {self.name!r} is closed')
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        self._count('checkouts')
+        while True:
+            entry = None
+            with self._condition:
+                wait_started = None
+                while not self._idle and self._size >= self.max_size:
+                    if wait_started is None:
+                        wait_started = time.monotonic()
+                        self._counters['waits'] += 1
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        self._wait_time += time.monotonic() - wait_started
+                        raise PoolTimeout(
+                            f'Pool {self.name!r}: no connection available within {self.timeout} s '
+                            f'({self.max_size} in use)'
+                        )
+                    self._condition.wait(remaining)
+                if wait_started is not None:
+                    self._wait_time += time.monotonic() - wait_started
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    # Reserve the slot, then connect outside the lock
+                    self._size += 1
+
+            if entry is None:
+                return self._open()
+            if self._usable(entry):
+                entry.last_used = time.monotonic()
+                with self._condition:
+                    self._in_use[id(entry.connection)] = entry
+                return entry.connection
+            self._discard(entry)
+
+    def checkin(self, connection):
+        """
+        Return a connection to the pool, or close it if it has to be retired
+        """
+        self._check_pid()
+        with self._condition:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            # Not ours, e.g. checked out before a fork: leave it alone
+            return
+        now = time.monotonic()
+        if self.closed:
+            self._discard(entry)
+            return
+        if self.max_lifetime is not None and now - entry.created > self.max_lifetime:
+            self._count('lifetime_expired')
+            self._discard(entry)
+            return
+        if self.reset is not None:
+            try:
+                usable = self.reset(connection)
+            except Exception:
+                usable = False
+            if not usable:
+                self._count('reset_failures')
+                self._discard(entry)
+                return
+
+        entry.last_used = now
+        expired = []
+        with self._condition:
+            self._idle.append(entry)
+            # The least recently used connections sit at the left
+            while self.max_idle is not None and self._idle and now - self._idle[0].last_used > self.max_idle:
+                expired.append(self._idle.popleft())
+            self._condition.notify()
+        for stale in expired:
+            self._count('idle_recycled')
+            self._discard(stale)
+
+    def discard(self, connection):
+        """
+        Close a checked-out connection instead of returning it
+        """
+        self._check_pid()
+        with self._condition:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is not None:
+            self._discard(entry)
+
+    def close(self):
+        """
+        Close the idle connections and stop handing out new ones. Checked-out
+        connections are closed when they are returned.
+        """
+        self.closed = True
+        self.close_idle()
+
+    def close_idle(self):
+        """
+        Close the idle connections, e.g. in a parent process before forking
+        """
+        self._check_pid()
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        """
+        Snapshot of the pool's gauges and counters for this process
+        """
+        self._check_pid()
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                **self._counters,
+                'wait_time': round(self._wait_time, 6),
+            }
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._counters['connect_errors'] += 1
+                self._condition.notify()
+            raise
+        entry = _Entry(connection, time.monotonic())
+        with self._condition:
+            self._in_use[id(connection)] = entry
+            self._counters['connections_opened'] += 1
+        return connection
+
+    def _usable(self, entry):
+        now = time.monotonic()
+        if self.max_lifetime is not None and now - entry.created > self.max_lifetime:
+            self._count('lifetime_expired')
+            return False
+        if self.max_idle is not None and now - entry.last_used > self.max_idle:
+            self._count('idle_recycled')
+            return False
+        if self.check is None or (self.check_after is not None and now - entry.last_used <= self.check_after):
+            return True
+        self._count('health_checks')
+        try:
+            healthy = self.check(entry.connection)
+        except Exception:
+            healthy = False
+        if not healthy:
+            self._count('health_check_failures')
+        return healthy
+
+    def _discard(self, entry):
+        try:
+            self.close_connection(entry.connection)
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._counters['connections_closed'] += 1
+            self._condition.notify()
+
+    def _count(self, name):
+        with self._condition:
+            self._counters[name] += 1
+
+
+def pool_stats():
+    """
+    Stats of every open pool in this process by pool name
+    """
+    return {pool.name: pool.stats() for pool in list(_pools) if not pool.closed}
+
+
+def close_idle_connections():
+    """
+    Close the idle connections of every pool in this process
+    """
+    for pool in list(_pools):
+        pool.close_idle()
+
+
+if hasattr(os, 'register_at_fork'):
+    def _forget_after_fork():
+        # Only the forking thread survives in the child, so no lock can be
+        # trusted; the PID check would also catch this on first use
+        for pool in list(_pools):
+            pool._start()
+
+    os.register_at_fork(after_in_child=_forget_after_fork)
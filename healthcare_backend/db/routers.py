@@ -0,0 +1,111 @@
+"""
+Primary/replica routing with read-your-writes stickiness.
+
+Writes always go to the primary (``default``). Reads go to one of the
+replica aliases listed in ``DATABASE_REPLICAS`` only where that was asked
+for: ``ReplicaRoutingMiddleware`` allows it for safe API requests, unless
+the user wrote within the last ``REPLICA_PIN_SECONDS`` and is pinned to the
+primary. Everything else - management commands, writes, reads inside
+``transaction.atomic()`` - reads from the primary, so code that is not
+request-driven never sees replication lag.
+
+The choice is kept in a context variable, so it follows a request through
+threads and ``sync_to_async`` calls under both WSGI and ASGI. Code that
+fills a cache shared by every user with database reads should wrap them in
+``use_primary()``: a lagging replica would otherwise cache stale data.
+"""
+
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_read_from_replicas = contextvars.ContextVar('read_from_replicas', default=False)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary inside the block
+    """
+    token = _read_from_replicas.set(False)
+    try:
+        yield
+    finally:
+        _read_from_replicas.reset(token)
+
+
+@contextmanager
+def use_replicas():
+    """
+    Let reads inside the block go to the replicas
+    """
+    token = _read_from_replicas.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replicas.reset(token)
+
+
+def get_pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE_ALIAS', 'default')]
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """
+    Send the user's reads to the primary for ``REPLICA_PIN_SECONDS``, until
+    the replicas have caught up with their write
+    """
+    if get_replicas():
+        get_pin_cache().set(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+async def apin_to_primary(user_id):
+    if get_replicas():
+        await get_pin_cache().aset(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return get_pin_cache().get(pin_key(user_id)) is not None
+
+
+async def ais_pinned(user_id):
+    return await get_pin_cache().aget(pin_key(user_id)) is not None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or not _read_from_replicas.get():
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold copies of the primary's rows
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the primary's schema through replication
+        if db in get_replicas():
+            return False
+        return None
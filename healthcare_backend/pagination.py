@@ -0,0 +1,225 @@
+"""
+Keyset (cursor) pagination shared by the function-based API views.
+
+Pages are addressed by an opaque cursor that encodes the ordering values of
+the row at the page boundary, so every page is answered by a bounded index
+range scan instead of an OFFSET that grows with the page number. The total
+row count is only computed when the client explicitly asks for it.
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique, non-nullable ordering such as
+    ``('-created_at', '-id')``.
+
+    Query parameters:
+        cursor     - opaque position returned as ``next``/``previous``
+        page_size  - rows per page, capped at ``API_MAX_PAGE_SIZE``
+        count      - set to ``true`` to include the total row count
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        position, reverse = self.start_page(request, queryset.model)
+        if self.wants_count(request):
+            self.count = queryset.count()
+        queryset = self.page_queryset(queryset, self.page_ordering(reverse), position)
+        rows = list(queryset[:self.page_size + 1])
+        return self.finish_page(rows, position, reverse)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        ``paginate_queryset`` through the async ORM, for querysets only
+        """
+        position, reverse = self.start_page(request, queryset.model)
+        if self.wants_count(request):
+            self.count = await queryset.acount()
+        queryset = self.page_queryset(queryset, self.page_ordering(reverse), position)
+        rows = [row async for row in queryset[:self.page_size + 1]]
+        return self.finish_page(rows, position, reverse)
+
+    def start_page(self, request, model):
+        """
+        Read the request's page parameters and return the decoded cursor
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(self.get_ordering(request))
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        return self.decode_cursor(request, model)
+
+    def page_ordering(self, reverse):
+        if reverse:
+            return [self._invert(field) for field in self.ordering]
+        return self.ordering
+
+    def finish_page(self, rows, position, reverse):
+        """
+        Trim the ``page_size + 1`` fetched rows to the page and record
+        whether there are pages on either side
+        """
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def page_queryset(self, queryset, ordering, position):
+        """
+        Return ``queryset`` in ``ordering``, starting after ``position``
+        (``None`` on the first page)
+        """
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, ordering))
+        return queryset
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict()
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_ordering(self, request):
+        """
+        Return the ordering for this request. Subclasses may let the client
+        choose, as long as the result stays unique and non-nullable.
+        """
+        return self.ordering
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 20
+        max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw:
+            try:
+                page_size = int(raw)
+            except ValueError:
+                pass
+        return max(1, min(page_size, max_page_size))
+
+    def wants_count(self, request):
+        value = request.query_params.get(self.count_query_param, '')
+        return value.lower() in TRUE_VALUES
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        values = [self._cursor_value(self._row_value(row, field)) for field in self.ordering]
+        payload = {'p': values, **self.cursor_state()}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        token = base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        """
+        Return ``(position, reverse)`` for the requested cursor, where
+        ``position`` is ``None`` on the first page.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.cursor_to_python(model, field.lstrip('-'), value)
+                for field, value in zip(self.ordering, values)
+            ]
+            self.load_cursor_state(payload)
+        except (TypeError, ValueError, KeyError, binascii.Error, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get('r'))
+
+    def cursor_to_python(self, model, name, value):
+        return model._meta.get_field(name).to_python(value)
+
+    def cursor_state(self):
+        """
+        Extra payload entries a subclass carries from page to page
+        """
+        return {}
+
+    def load_cursor_state(self, payload):
+        """
+        Read back ``cursor_state`` from a decoded cursor; raise ``ValueError``
+        if it is malformed
+        """
+
+    def _after(self, position, ordering):
+        """
+        Build the lexicographic "comes after ``position``" filter for
+        ``ordering``, e.g. ``a < x OR (a = x AND b < y)`` for descending keys.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _row_value(row, field):
+        # Rows are model instances or dicts from a values() projection
+        if isinstance(row, dict):
+            return row[field.lstrip('-')]
+        return getattr(row, field.lstrip('-'))
+
+    @staticmethod
+    def _cursor_value(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (bool, int, float, str)) or value is None:
+            return value
+        return str(value)
@@ -0,0 +1,237 @@
+"""
+Read-only fast path for the list and detail GETs.
+
+A ``ValuesProjection`` is compiled from an existing ``ModelSerializer``: it
+knows which columns ``QuerySet.values()`` must fetch (following relations in
+SQL) and converts each row dict into exactly the representation the
+serializer would have produced, without building model instances or walking
+DRF's per-field ``get_attribute``/``to_representation`` machinery for plain
+columns. The serializer stays the single source of truth for the output
+shape; the projection only replaces how it is computed.
+
+Sparse fieldsets (``?fields=id,name`` / ``?exclude=address``) narrow the
+projection before the query runs, so unrequested columns, and the joins
+behind unrequested nested serializers, never reach the SQL.
+"""
+
+import copy
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+FIELDS_QUERY_PARAM = 'fields'
+EXCLUDE_QUERY_PARAM = 'exclude'
+
+# DRF fields whose to_representation returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.ReadOnlyField,
+)
+
+
+class DateTimeConverter:
+    """
+    ``DateTimeField.to_representation`` with the active timezone resolved once
+    per call to ``bind()`` instead of once per value
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def __call__(self, value):
+        return self.field.to_representation(value)
+
+    def bind(self):
+        field = self.field
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            try:
+                text = value.astimezone(field_timezone).isoformat()
+            except OverflowError:
+                return field.to_representation(value)
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        return convert
+
+
+class ValuesProjection:
+    """
+    Project ``serializer_class`` onto ``values()`` rows.
+
+    ``sources`` maps fields whose value cannot be read from the model's own
+    column to a lookup path, e.g. ``{'created_by': 'created_by__email'}`` for a
+    ``StringRelatedField`` over a user whose ``__str__`` is the email.
+    ``nested`` maps nested serializer fields to the projection of their
+    serializer; their columns are fetched through the field's ``source``.
+    """
+
+    def __init__(self, serializer_class, sources=None, nested=None):
+        self.serializer_class = serializer_class
+        self.sources = sources or {}
+        self.nested = nested or {}
+
+    @cached_property
+    def plan(self):
+        return self.compile('')
+
+    @cached_property
+    def columns(self):
+        """
+        Lookups to pass to ``values()``
+        """
+        return self.column_list(self.plan)
+
+    def compile(self, prefix):
+        """
+        Return ``(name, column, convert)`` steps for rows whose columns are
+        prefixed with ``prefix``. Nested steps carry their own plan in place
+        of a converter and no column.
+        """
+        plan = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in self.nested:
+                plan.append((name, None, self.nested[name].compile(f'{prefix}{field.source}__')))
+                continue
+            if name in self.sources:
+                plan.append((name, prefix + self.sources[name], None))
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.RelatedField)) \
+                    and not isinstance(field, serializers.PrimaryKeyRelatedField):
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} needs an entry in "
+                    f"'sources' or 'nested' to be projected."
+                )
+            if '.' in field.source or field.source == '*':
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} has a dotted source; "
+                    f"map it in 'sources'."
+                )
+            if isinstance(field, PASSTHROUGH_FIELDS):
+                convert = None
+            elif isinstance(field, serializers.DateTimeField):
+                convert = DateTimeConverter(field)
+            else:
+                convert = field.to_representation
+            plan.append((name, prefix + field.source, convert))
+        return plan
+
+    @classmethod
+    def column_list(cls, plan):
+        columns = []
+        for name, column, step in plan:
+            if column is None:
+                columns.extend(cls.column_list(step))
+            else:
+                columns.append(column)
+        return columns
+
+    def values(self, queryset, *extra):
+        """
+        Select the projected columns plus ``extra`` ones the caller needs for
+        itself, such as cursor or ETag columns, which are not rendered
+        """
+        columns = list(self.columns)
+        columns.extend(column for column in extra if column not in columns)
+        return queryset.values(*columns)
+
+    def get(self, queryset, *extra):
+        """
+        Return the only row of a primary-key lookup, or ``None``. Unlike
+        ``first()`` no ORDER BY is added, which SQLite would still sort through
+        a temporary B-tree for a single row
+        """
+        return next(iter(self.values(queryset.order_by(), *extra)[:1]), None)
+
+    async def aget(self, queryset, *extra):
+        """
+        ``get()`` through the async ORM
+        """
+        async for row in self.values(queryset.order_by(), *extra)[:1]:
+            return row
+        return None
+
+    def restrict(self, fields=None, exclude=None):
+        """
+        Return a copy that only renders ``fields`` minus ``exclude``. Raises
+        ``ValidationError`` for unknown names or an empty selection.
+        """
+        if not fields and not exclude:
+            return self
+        names = [name for name, _, _ in self.plan]
+        unknown = (set(fields or ()) | set(exclude or ())) - set(names)
+        if unknown:
+            raise ValidationError({
+                FIELDS_QUERY_PARAM: [f"Unknown field(s): {', '.join(sorted(unknown))}."]
+            })
+        plan = [
+            step for step in self.plan
+            if (not fields or step[0] in fields) and step[0] not in (exclude or ())
+        ]
+        if not plan:
+            raise ValidationError({FIELDS_QUERY_PARAM: ["Select at least one field."]})
+        restricted = copy.copy(self)
+        restricted.plan = plan
+        restricted.columns = self.column_list(plan)
+        return restricted
+
+    def for_request(self, request):
+        """
+        Apply the request's ``fields``/``exclude`` query parameters
+        """
+        return self.restrict(
+            _split(request.query_params.get(FIELDS_QUERY_PARAM)),
+            _split(request.query_params.get(EXCLUDE_QUERY_PARAM))
+        )
+
+    def to_representation(self, row):
+        return self.represent(self.bind(self.plan), row)
+
+    def many(self, rows):
+        plan = self.bind(self.plan)
+        return [self.represent(plan, row) for row in rows]
+
+    @classmethod
+    def bind(cls, plan):
+        """
+        Resolve per-request state such as the active timezone for ``plan``
+        """
+        bound = []
+        for name, column, convert in plan:
+            if column is None:
+                convert = cls.bind(convert)
+            elif hasattr(convert, 'bind'):
+                convert = convert.bind()
+            bound.append((name, column, convert))
+        return bound
+
+    @classmethod
+    def represent(cls, plan, row):
+        data = {}
+        for name, column, convert in plan:
+            if column is None:
+                data[name] = cls.represent(convert, row)
+                continue
+            value = row[column]
+            if convert is not None and value is not None:
+                value = convert(value)
+            data[name] = value
+        return data
+
+
+def _split(value):
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
@@ -0,0 +1,73 @@
+"""
+JSON renderer and parser backed by orjson when it is installed.
+
+Both classes are drop-in replacements for DRF's ``JSONRenderer`` and
+``JSONParser`` and fall back to them whenever orjson is missing or cannot
+reproduce their behaviour exactly: indented or ASCII-escaped output,
+non-UTF-8 request bodies, and values orjson rejects such as integers wider
+than 64 bits. Dates, times and decimals are passed through DRF's
+``JSONEncoder`` so they render exactly as before; the serializers already
+coerce this project's ``DecimalField`` and ``DateTimeField`` values to
+strings. Floats are the one type orjson formats itself, which only differs
+from the stdlib for exponents and non-finite values.
+"""
+
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Escaped by DRF so the output stays a strict JavaScript subset
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` producing identical bytes through orjson
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    ``JSONParser`` decoding UTF-8 bodies with orjson
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Re-parse with the stdlib for its error message and wider integers
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 import dj_database_url
 
@@ -47,11 +47,13 @@ INSTALLED_APPS = [
     'patients',
     'doctors',
     'mappings',
+    'dashboard',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'healthcare_backend.db.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -114,6 +116,72 @@ else:
         }
     }
 
+# Streaming read replicas of the primary, one URL each. Safe API requests
+# read from them and everything else uses the primary (see
+# healthcare_backend/db/routers.py); a user who wrote is pinned to the
+# primary for REPLICA_PIN_SECONDS. Use a cache shared by all workers
+# (CACHE_BACKEND) so the pin holds across processes. Under test the
+# replicas mirror the test database.
+DATABASE_REPLICAS = []
+for number, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {**dj_database_url.parse(url), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['healthcare_backend.db.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+REPLICA_PIN_CACHE_ALIAS = 'default'
+REPLICA_READ_PATHS = ['/api/']
+
+# PostgreSQL connections come from a bounded pool per process (see
+# healthcare_backend/db/pool.py), so a request checks a connection out
+# instead of opening one. DB_POOL=False restores Django's own handling,
+# optionally with persistent connections (DB_CONN_MAX_AGE).
+DB_POOL = config('DB_POOL', default=True, cast=bool)
+DB_POOL_OPTIONS = {
+    'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+    'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+    'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+    'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=3600, cast=float),
+    'check_after': config('DB_POOL_CHECK_AFTER', default=5, cast=float),
+}
+
+for database in DATABASES.values():
+    if database['ENGINE'] != 'django.db.backends.postgresql':
+        continue
+    if DB_POOL:
+        database['ENGINE'] = 'healthcare_backend.db.backends.postgresql_pool'
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = DB_POOL_OPTIONS
+    else:
+        database['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=0, cast=int)
+        database['CONN_HEALTH_CHECKS'] = True
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default, which suits a single process; several workers
+# need a shared backend such as Redis (gunicorn.conf.py refuses to start them
+# on local memory).
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='healthcare-backend'),
+    }
+}
+
+# Doctor directory response cache (see doctors/cache.py)
+DOCTOR_CACHE_ALIAS = 'default'
+DOCTOR_CACHE_TIMEOUT = config('DOCTOR_CACHE_TIMEOUT', default=300, cast=int)
+
+# Doctor autocomplete: default and largest number of suggestions per request
+DOCTOR_AUTOCOMPLETE_LIMIT = config('DOCTOR_AUTOCOMPLETE_LIMIT', default=10, cast=int)
+DOCTOR_AUTOCOMPLETE_MAX_LIMIT = config('DOCTOR_AUTOCOMPLETE_MAX_LIMIT', default=50, cast=int)
+# Longest a worker's autocomplete index goes without reading other workers'
+# writes from the doctor table (see doctors/autocomplete.py)
+DOCTOR_AUTOCOMPLETE_REFRESH_SECONDS = config('DOCTOR_AUTOCOMPLETE_REFRESH_SECONDS', default=5, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -159,18 +227,76 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed when installed, otherwise identical to DRF's JSON classes
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'healthcare_backend.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'healthcare_backend.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20,
+    'PAGE_SIZE': config('API_PAGE_SIZE', default=20, cast=int),
+    # Token buckets for the views marked with @throttle_scope
+    'DEFAULT_THROTTLE_CLASSES': [
+        'healthcare_backend.throttling.ScopedTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'register': config('THROTTLE_REGISTER_RATE', default='20/hour'),
+        'login': config('THROTTLE_LOGIN_RATE', default='10/min'),
+        'list': config('THROTTLE_LIST_RATE', default='300/min'),
+    },
+    # Reverse proxies in front of the app whose X-Forwarded-For entries are
+    # trusted to name anonymous clients; with 0 the header, which any client
+    # can forge, is ignored and REMOTE_ADDR is used
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
+# Where the throttle buckets live (see healthcare_backend/throttling.py):
+# 'local' keeps them in each process, 'cache' shares them through
+# THROTTLE_CACHE_ALIAS, which must then be a cache every process can reach
+THROTTLE_STORE = config('THROTTLE_STORE', default='local')
+THROTTLE_CACHE_ALIAS = 'default'
+
+# JWT authentication keeps the request user's id, email, name and
+# is_active in an in-process cache for JWT_USER_CACHE_TTL seconds (0
+# disables it). JWT_STATELESS_AUTH trusts those fields from the signed token
+# instead; see authentication/authentication.py for the trade-offs.
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=60, cast=int)
+JWT_USER_CACHE_SIZE = config('JWT_USER_CACHE_SIZE', default=10000, cast=int)
+JWT_STATELESS_AUTH = config('JWT_STATELESS_AUTH', default=False, cast=bool)
+
+# Refresh-token blacklist (see authentication/blacklist.py): the in-memory
+# filter's size and false positive rate, and how often a process deletes a
+# batch of expired rows
+TOKEN_BLACKLIST_CAPACITY = config('TOKEN_BLACKLIST_CAPACITY', default=100000, cast=int)
+TOKEN_BLACKLIST_ERROR_RATE = config('TOKEN_BLACKLIST_ERROR_RATE', default=0.01, cast=float)
+TOKEN_BLACKLIST_PURGE_EVERY = config('TOKEN_BLACKLIST_PURGE_EVERY', default=1000, cast=int)
+TOKEN_BLACKLIST_PURGE_BATCH_SIZE = config('TOKEN_BLACKLIST_PURGE_BATCH_SIZE', default=1000, cast=int)
+
+# Serve the list and detail GETs with native async views. The ASGI entry
+# point turns this on; under WSGI the sync views are faster
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Upper bound for the ?page_size= query parameter on cursor-paginated lists
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=100, cast=int)
+
+# Bulk patient creation: largest accepted request and rows per INSERT statement
+PATIENT_BULK_MAX_ITEMS = config('PATIENT_BULK_MAX_ITEMS', default=5000, cast=int)
+PATIENT_BULK_BATCH_SIZE = config('PATIENT_BULK_BATCH_SIZE', default=500, cast=int)
+
+# Seconds a SQLite patient search ranking is kept for its following pages
+PATIENT_SEARCH_SNAPSHOT_TIMEOUT = config('PATIENT_SEARCH_SNAPSHOT_TIMEOUT', default=600, cast=int)
+
+# Rows fetched per database round trip by the streaming NDJSON/CSV exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=10),
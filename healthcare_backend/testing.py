@@ -0,0 +1,62 @@
+"""
+Shared helpers for the API test suites and benchmarks: dataset seeding.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+SPECIALIZATIONS = ('Cardiology', 'Dermatology', 'Neurology', 'Oncology', 'Pediatrics')
+
+
+def seed_dataset(user, size, batch_size=2000):
+    """
+    Bulk insert ``size`` doctors and ``size`` patients owned by ``user``, and
+    assign every doctor to the first patient so both the mapping list and the
+    patient's care team return ``size`` rows.
+
+    Returns ``(patients, doctors, mappings)`` as lists of saved instances.
+    """
+    from doctors.models import Doctor
+    from mappings.models import PatientDoctorMapping
+    from patients.models import Patient
+
+    doctors = Doctor.objects.bulk_create([
+        Doctor(
+            name=f'Doctor {i:05d}',
+            email=f'doctor{i}@hospital.test',
+            phone=f'+1-555-{i:06d}',
+            specialization=SPECIALIZATIONS[i % len(SPECIALIZATIONS)],
+            qualification='MD',
+            experience_years=i % 40,
+            license_number=f'LIC{i:08d}',
+            hospital_affiliation='General Hospital' if i % 2 else None,
+            consultation_fee=Decimal(100 + i % 400) if i % 3 else None,
+            is_available=bool(i % 4),
+        )
+        for i in range(size)
+    ], batch_size=batch_size)
+
+    patients = Patient.objects.bulk_create([
+        Patient(
+            name=f'Patient {i:05d}',
+            email=f'patient{i}@example.test',
+            phone=f'+1-444-{i:06d}',
+            date_of_birth=datetime.date(1950 + i % 50, 1 + i % 12, 1 + i % 28),
+            gender='MFO'[i % 3],
+            address=f'{i} Main Street',
+            medical_history='No known allergies.' if i % 2 else None,
+            created_by=user,
+        )
+        for i in range(size)
+    ], batch_size=batch_size)
+
+    mappings = PatientDoctorMapping.objects.bulk_create([
+        PatientDoctorMapping(patient=patients[0], doctor=doctor, notes='Seeded')
+        for doctor in doctors
+    ], batch_size=batch_size)
+
+    return patients, doctors, mappings
@@ -0,0 +1,1208 @@
+"""
+Query-budget regression tests for every API route.
+
+Each endpoint is exercised against datasets of 10, 1,000 and 10,000 rows and
+must stay within the same fixed number of SQL queries at every size. Timings
+are left to ``benchmarks/endpoints.py``.
+"""
+
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.authentication import user_cache
+from authentication.blacklist import token_blacklist
+from doctors.autocomplete import doctor_index
+from doctors.cache import VERSION_KEY
+from mappings.management.commands.explain_hotpaths import HOTPATHS
+from .testing import seed_dataset
+from .throttling import clear_buckets
+
+User = get_user_model()
+
+# Maximum queries per (route name, method). Budgets include the JWT user lookup
+# on a cold user cache, the token blacklist filter load and, for writes, the
+# dashboard counter upserts and their savepoints.
+QUERY_BUDGETS = {
+    ('register', 'POST'): 3,
+    ('login', 'POST'): 1,
+    ('token-refresh', 'POST'): 6,
+    ('logout', 'POST'): 5,
+    ('patient-list-create', 'GET'): 3,
+    ('patient-list-create', 'POST'): 6,
+    ('patient-detail', 'GET'): 2,
+    ('patient-detail', 'PUT'): 5,
+    ('patient-detail', 'DELETE'): 7,
+    ('patient-export', 'GET'): 2,
+    ('patient-bulk-create', 'POST'): 6,
+    ('patient-search', 'GET'): 3,
+    ('doctor-list-create', 'GET'): 2,
+    ('doctor-list-create', 'POST'): 6,
+    ('doctor-detail', 'GET'): 2,
+    ('doctor-autocomplete', 'GET'): 2,
+    ('doctor-caseload', 'GET'): 2,
+    ('doctor-detail', 'PUT'): 8,
+    ('doctor-detail', 'DELETE'): 16,
+    ('doctor-export', 'GET'): 2,
+    ('mapping-list-create', 'GET'): 2,
+    ('mapping-list-create', 'POST'): 11,
+    ('patient-doctors', 'GET'): 3,
+    ('patient-doctors-batch', 'POST'): 13,
+    ('doctor-patients', 'GET'): 3,
+    ('mapping-delete', 'DELETE'): 7,
+    ('mapping-export', 'GET'): 2,
+    ('dashboard', 'GET'): 3,
+}
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def clear_cached_responses():
+    """
+    Empty the cache but keep the doctor directory version, which the list
+    ETags are derived from
+    """
+    version = cache.get(VERSION_KEY)
+    cache.clear()
+    if version is not None:
+        cache.set(VERSION_KEY, version, timeout=None)
+
+
+def api_route_names(resolver=None, prefix=''):
+    """
+    Yield the names of every named route mounted under /api/
+    """
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from api_route_names(pattern, route)
+        elif isinstance(pattern, URLPattern) and route.startswith('api/') and pattern.name:
+            yield pattern.name
+
+
+class RouteCoverageTests(APITestCase):
+    """
+    Every API route must have a query budget
+    """
+
+    def test_every_api_route_has_a_budget(self):
+        budgeted = {name for name, _ in QUERY_BUDGETS}
+        missing = sorted(set(api_route_names()) - budgeted)
+        self.assertEqual(missing, [], f"Routes without a query budget: {missing}")
+
+    def test_every_read_route_is_explained(self):
+        audited = {route for route, _, _ in HOTPATHS}
+        missing = sorted({name for name, method in QUERY_BUDGETS if method == 'GET'} - audited)
+        self.assertEqual(missing, [], f"GET routes missing from explain_hotpaths: {missing}")
+
+
+class QueryBudgetTestMixin:
+    """
+    Seeds ``dataset_size`` rows and checks every endpoint against its budget
+    """
+    dataset_size = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='budget@example.test', username='budget', name='Budget User', password='Budget-Pass-123'
+        )
+        cls.patients, cls.doctors, cls.mappings = seed_dataset(cls.user, cls.dataset_size)
+        cls.patient = cls.patients[0]
+        cls.doctor = cls.doctors[0]
+        cls.mapping = cls.mappings[0]
+
+    def setUp(self):
+        cache.clear()
+        doctor_index.clear()
+        user_cache.clear()
+        token_blacklist.reset()
+        clear_buckets()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def request_within_budget(self, route, method, url, data=None, headers=None):
+        """
+        Issue the request and assert its query budget. ``headers`` are
+        passed as extra WSGI environ keys.
+        """
+        budget = QUERY_BUDGETS[(route, method)]
+        call = getattr(self.client, method.lower())
+        extra = headers or {}
+        with CaptureQueriesContext(connection) as queries:
+            if data is not None:
+                response = call(url, data, format='json', **extra)
+            else:
+                response = call(url, **extra)
+            if response.streaming:
+                # Streamed bodies run their queries while they are read
+                b''.join(response.streaming_content)
+
+        executed = len(queries.captured_queries)
+        self.assertLessEqual(
+            executed, budget,
+            f"{method} {route} ran {executed} queries (budget {budget}) at "
+            f"{self.dataset_size} rows:\n" + '\n'.join(q['sql'] for q in queries.captured_queries)
+        )
+        return response
+
+    def patient_payload(self, **overrides):
+        payload = {
+            'name': 'Budget Patient',
+            'email': 'budget.patient@example.test',
+            'phone': '+1-555-0100',
+            'date_of_birth': '1990-05-15',
+            'gender': 'F',
+            'address': '1 Budget Street',
+            'medical_history': 'None',
+        }
+        payload.update(overrides)
+        return payload
+
+    def doctor_payload(self, **overrides):
+        payload = {
+            'name': 'Budget Doctor',
+            'email': 'budget.doctor@hospital.test',
+            'phone': '+1-555-0200',
+            'specialization': 'Cardiology',
+            'qualification': 'MD',
+            'experience_years': 10,
+            'license_number': 'BUDGET-0001',
+            'hospital_affiliation': 'Budget Hospital',
+            'consultation_fee': '150.00',
+            'is_available': True,
+        }
+        payload.update(overrides)
+        return payload
+
+    def test_register(self):
+        self.client.credentials()
+        response = self.request_within_budget('register', 'POST', reverse('register'), {
+            'name': 'New User',
+            'email': 'new.user@example.test',
+            'username': 'newuser',
+            'password': 'Str0ng-Pass-123',
+            'password_confirm': 'Str0ng-Pass-123',
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        self.client.credentials()
+        response = self.request_within_budget('login', 'POST', reverse('login'), {
+            'email': 'budget@example.test',
+            'password': 'Budget-Pass-123',
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_refresh(self):
+        self.client.credentials()
+        response = self.request_within_budget('token-refresh', 'POST', reverse('token-refresh'), {
+            'refresh': str(RefreshToken.for_user(self.user)),
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout(self):
+        self.client.credentials()
+        response = self.request_within_budget('logout', 'POST', reverse('logout'), {
+            'refresh': str(RefreshToken.for_user(self.user)),
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_patient_list(self):
+        response = self.request_within_budget('patient-list-create', 'GET', reverse('patient-list-create'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_patient_list_not_modified(self):
+        url = reverse('patient-list-create')
+        etag = self.client.get(url)['ETag']
+        response = self.request_within_budget(
+            'patient-list-create', 'GET', url, headers={'HTTP_IF_NONE_MATCH': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_patient_create(self):
+        response = self.request_within_budget(
+            'patient-list-create', 'POST', reverse('patient-list-create'), self.patient_payload()
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_patient_bulk_create(self):
+        payload = [
+            self.patient_payload(email=f'bulk{i}@example.test') for i in range(10)
+        ] + [self.patient_payload(email=self.patients[-1].email)]
+        response = self.request_within_budget(
+            'patient-bulk-create', 'POST', reverse('patient-bulk-create'), payload
+        )
+        self.assertEqual(response.status_code, 207)
+
+    def test_patient_detail(self):
+        url = reverse('patient-detail', args=[self.patient.pk])
+        response = self.request_within_budget('patient-detail', 'GET', url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_patient_detail_not_modified(self):
+        url = reverse('patient-detail', args=[self.patient.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.request_within_budget(
+            'patient-detail', 'GET', url, headers={'HTTP_IF_NONE_MATCH': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_patient_update(self):
+        url = reverse('patient-detail', args=[self.patient.pk])
+        response = self.request_within_budget(
+            'patient-detail', 'PUT', url, self.patient_payload(email=self.patient.email)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_patient_delete(self):
+        url = reverse('patient-detail', args=[self.patient.pk])
+        response = self.request_within_budget('patient-detail', 'DELETE', url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_patient_export(self):
+        for export_format in ('ndjson', 'csv'):
+            url = reverse('patient-export', args=[export_format])
+            response = self.request_within_budget('patient-export', 'GET', url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_patient_search(self):
+        url = reverse('patient-search') + '?q=patient+00001'
+        response = self.request_within_budget('patient-search', 'GET', url)
+        self.assertEqual(response.status_code, 200)
+        # Terms are prefixes, so Patient 00010-00019 match too but rank lower
+        self.assertEqual(response.json()['results'][0]['name'], 'Patient 00001')
+
+    def test_doctor_list(self):
+        response = self.request_within_budget('doctor-list-create', 'GET', reverse('doctor-list-create'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_doctor_list_not_modified(self):
+        url = reverse('doctor-list-create')
+        etag = self.client.get(url)['ETag']
+        clear_cached_responses()
+        response = self.request_within_budget(
+            'doctor-list-create', 'GET', url, headers={'HTTP_IF_NONE_MATCH': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_doctor_autocomplete(self):
+        url = reverse('doctor-autocomplete') + '?q=doctor+0000'
+        # Builds the index, then answers from it
+        for _ in range(2):
+            response = self.request_within_budget('doctor-autocomplete', 'GET', url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), min(self.dataset_size, 10))
+
+    def test_doctor_caseload(self):
+        for ordering in ('name', '-active_patients'):
+            url = reverse('doctor-caseload') + f'?ordering={ordering}'
+            response = self.request_within_budget('doctor-caseload', 'GET', url)
+            self.assertEqual(response.status_code, 200)
+        # seed_dataset assigns every doctor to one patient
+        self.assertEqual(response.json()['results'][0]['active_patients'], 1)
+
+    def test_doctor_create(self):
+        response = self.request_within_budget(
+            'doctor-list-create', 'POST', reverse('doctor-list-create'), self.doctor_payload()
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_doctor_detail(self):
+        url = reverse('doctor-detail', args=[self.doctor.pk])
+        response = self.request_within_budget('doctor-detail', 'GET', url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_doctor_detail_not_modified(self):
+        url = reverse('doctor-detail', args=[self.doctor.pk])
+        etag = self.client.get(url)['ETag']
+        cache.clear()
+        response = self.request_within_budget(
+            'doctor-detail', 'GET', url, headers={'HTTP_IF_NONE_MATCH': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_doctor_update(self):
+        url = reverse('doctor-detail', args=[self.doctor.pk])
+        response = self.request_within_budget('doctor-detail', 'PUT', url, self.doctor_payload(
+            email=self.doctor.email, license_number=self.doctor.license_number
+        ))
+        self.assertEqual(response.status_code, 200)
+
+    def test_doctor_delete(self):
+        url = reverse('doctor-detail', args=[self.doctor.pk])
+        response = self.request_within_budget('doctor-detail', 'DELETE', url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_doctor_export(self):
+        for export_format in ('ndjson', 'csv'):
+            url = reverse('doctor-export', args=[export_format])
+            response = self.request_within_budget('doctor-export', 'GET', url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_mapping_list(self):
+        response = self.request_within_budget('mapping-list-create', 'GET', reverse('mapping-list-create'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_mapping_create(self):
+        response = self.request_within_budget('mapping-list-create', 'POST', reverse('mapping-list-create'), {
+            'patient': self.patients[-1].pk,
+            'doctor': self.doctor.pk,
+            'notes': 'Budget check',
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def test_mapping_export(self):
+        for export_format in ('ndjson', 'csv'):
+            url = reverse('mapping-export', args=[export_format])
+            response = self.request_within_budget('mapping-export', 'GET', url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_patient_doctors(self):
+        url = reverse('patient-doctors', args=[self.patient.pk])
+        response = self.request_within_budget('patient-doctors', 'GET', url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_doctor_patients(self):
+        url = reverse('doctor-patients', args=[self.doctor.pk])
+        response = self.request_within_budget('doctor-patients', 'GET', url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_patient_doctors_batch(self):
+        url = reverse('patient-doctors-batch', args=[self.patients[-1].pk])
+        response = self.request_within_budget('patient-doctors-batch', 'POST', url, {
+            'assign': [doctor.pk for doctor in self.doctors[:5]],
+            'unassign': [doctor.pk for doctor in self.doctors[5:7]],
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_mapping_delete(self):
+        url = reverse('mapping-delete', args=[self.mapping.pk])
+        response = self.request_within_budget('mapping-delete', 'DELETE', url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_dashboard(self):
+        from dashboard.services import recount
+
+        # seed_dataset bulk-inserts without maintaining the counters
+        recount([self.user.pk])
+        response = self.request_within_budget('dashboard', 'GET', reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_patients'], self.dataset_size)
+        self.assertEqual(response.json()['active_mappings'], self.dataset_size)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SmallDatasetQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    dataset_size = 10
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class MediumDatasetQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    dataset_size = 1000
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LargeDatasetQueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    dataset_size = 10000
+
+
+class ValuesProjectionTests(APITestCase):
+    """
+    The values() read path must render byte-for-byte what the serializers do
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from doctors.models import Doctor
+
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.patients, cls.doctors, cls.mappings = seed_dataset(cls.user, 12)
+        # Unicode, fractional fees and an unrounded value exercise the converters
+        Doctor.objects.filter(pk=cls.doctors[1].pk).update(name='Dr. Zoë Ångström', consultation_fee='99.50')
+        Doctor.objects.filter(pk=cls.doctors[2].pk).update(consultation_fee='7')
+
+    def assertRendersIdentically(self, serializer_class, projection, queryset):
+        from rest_framework.renderers import JSONRenderer
+
+        renderer = JSONRenderer()
+        expected = renderer.render(serializer_class(list(queryset), many=True).data)
+        rows = projection.values(queryset)
+        self.assertEqual(renderer.render(projection.many(rows)), expected)
+        self.assertEqual(
+            renderer.render(projection.to_representation(rows[0])),
+            renderer.render(serializer_class(queryset[0]).data)
+        )
+
+    def test_patient_projection(self):
+        from patients.models import Patient
+        from patients.serializers import PatientSerializer, patient_projection
+
+        self.assertRendersIdentically(
+            PatientSerializer, patient_projection, Patient.objects.select_related('created_by')
+        )
+
+    def test_doctor_projection(self):
+        from doctors.models import Doctor
+        from doctors.serializers import DoctorSerializer, doctor_projection
+
+        self.assertRendersIdentically(DoctorSerializer, doctor_projection, Doctor.objects.all())
+
+    def test_mapping_projections(self):
+        from mappings.models import PatientDoctorMapping
+        from mappings.serializers import (
+            PatientDoctorMappingDoctorOnlySerializer,
+            PatientDoctorMappingPatientOnlySerializer,
+            PatientDoctorMappingSerializer,
+            mapping_doctor_only_projection,
+            mapping_patient_only_projection,
+            mapping_projection
+        )
+
+        queryset = PatientDoctorMapping.objects.select_related('patient__created_by', 'doctor')
+        self.assertRendersIdentically(PatientDoctorMappingSerializer, mapping_projection, queryset)
+        self.assertRendersIdentically(
+            PatientDoctorMappingDoctorOnlySerializer, mapping_doctor_only_projection, queryset
+        )
+        self.assertRendersIdentically(
+            PatientDoctorMappingPatientOnlySerializer, mapping_patient_only_projection, queryset
+        )
+        self.assertIn('patient__created_by__email', mapping_projection.columns)
+
+    def test_active_timezone_is_honoured(self):
+        from django.utils import timezone
+        from patients.models import Patient
+        from patients.serializers import PatientSerializer, patient_projection
+
+        with timezone.override('America/New_York'):
+            self.assertRendersIdentically(
+                PatientSerializer, patient_projection, Patient.objects.select_related('created_by')
+            )
+
+    def test_unmapped_relation_is_rejected(self):
+        from django.core.exceptions import ImproperlyConfigured
+        from healthcare_backend.projections import ValuesProjection
+        from patients.serializers import PatientSerializer
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesProjection(PatientSerializer).columns
+
+
+class FastJSONTests(APITestCase):
+    """
+    The orjson-backed renderer and parser must match DRF's JSON classes
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.patients, cls.doctors, cls.mappings = seed_dataset(cls.user, 6)
+
+    def assertRendersLikeDRF(self, data, accepted_media_type=None):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type)
+        )
+
+    def test_serializer_output(self):
+        from mappings.models import PatientDoctorMapping
+        from mappings.serializers import mapping_projection
+        from patients.models import Patient
+        from patients.serializers import patient_projection
+
+        self.assertRendersLikeDRF(patient_projection.many(patient_projection.values(Patient.objects.all())))
+        self.assertRendersLikeDRF(mapping_projection.many(mapping_projection.values(PatientDoctorMapping.objects.all())))
+
+    def test_python_values(self):
+        import datetime
+        import uuid
+        from collections import OrderedDict
+        from decimal import Decimal
+
+        from django.utils import timezone
+        from django.utils.translation import gettext_lazy
+        from rest_framework.exceptions import ErrorDetail
+
+        self.assertRendersLikeDRF(OrderedDict([
+            ('fee', Decimal('150.50')),
+            ('created_at', timezone.now()),
+            ('naive', datetime.datetime(2024, 1, 2, 3, 4, 5, 678901)),
+            ('date', datetime.date(1990, 5, 17)),
+            ('time', datetime.time(8, 30)),
+            ('duration', datetime.timedelta(minutes=90)),
+            ('uuid', uuid.UUID(int=42)),
+            ('lazy', gettext_lazy('This field is required.')),
+            ('error', [ErrorDetail('Invalid value.', code='invalid')]),
+            ('text', 'Zoë Ångström  "quoted" \\ \n'),
+            ('numbers', [0, -1, 2 ** 63 - 1, True, False, None]),
+            (1, 'integer key'),
+        ]))
+
+    def test_falls_back_for_indent_and_wide_integers(self):
+        data = {'big': 2 ** 70, 'nested': {'a': [1, 2]}}
+        self.assertRendersLikeDRF(data)
+        self.assertRendersLikeDRF({'nested': {'a': [1, 2]}}, 'application/json; indent=4')
+
+    def test_falls_back_without_orjson(self):
+        from unittest import mock
+
+        from . import renderers
+
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertRendersLikeDRF({'name': 'Zoë '})
+
+    def test_parser(self):
+        import io
+
+        from rest_framework.exceptions import ParseError
+        from rest_framework.parsers import JSONParser
+        from .renderers import FastJSONParser
+
+        for body in (b'{"name": "Zo\\u00eb", "ids": [1, 2], "fee": 1.5}', '{"n": "Zoë"}'.encode(),
+                     b'[' + str(2 ** 70).encode() + b']'):
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+        for body in (b'{"a": NaN}', b'{"a": '):
+            with self.assertRaises(ParseError) as fast:
+                FastJSONParser().parse(io.BytesIO(body))
+            with self.assertRaises(ParseError) as stdlib:
+                JSONParser().parse(io.BytesIO(body))
+            self.assertEqual(str(fast.exception), str(stdlib.exception))
+
+    def test_api_uses_the_fast_classes(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('patient-bulk-create'), [{
+            'name': 'Zoë', 'email': 'zoe@example.test', 'phone': '1', 'date_of_birth': '1990-01-01',
+            'gender': 'F', 'address': 'Somewhere'
+        }], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['data'][0]['name'], 'Zoë')
+
+
+class AsyncReadViewTests(APITestCase):
+    """
+    The async read views served under ASGI must answer exactly like the sync
+    views, with the same queries
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+        cls.patients, cls.doctors, cls.mappings = seed_dataset(cls.user, 8)
+        cls.auth = f'Bearer {RefreshToken.for_user(cls.user).access_token}'
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameAnswer(self, async_view, path, headers=None, **kwargs):
+        """
+        GET ``path`` through the URLconf (sync views) and through
+        ``async_view``, and compare status, body, validators and query count
+        """
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncRequestFactory
+
+        headers = {'Authorization': self.auth, **(headers or {})}
+        # Both paths load the user, so the query counts compare
+        user_cache.clear()
+        with CaptureQueriesContext(connection) as sync_queries:
+            expected = self.client.get(path, headers=headers)
+        clear_cached_responses()
+        user_cache.clear()
+
+        request = AsyncRequestFactory().get(path, headers=headers)
+        with CaptureQueriesContext(connection) as async_queries:
+            response = async_to_sync(async_view)(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+
+        self.assertEqual(response.status_code, expected.status_code, path)
+        self.assertEqual(response.content, expected.content, path)
+        for header in ('ETag', 'Last-Modified', 'Content-Type', 'WWW-Authenticate'):
+            self.assertEqual(response.get(header), expected.get(header), f'{path} {header}')
+        self.assertEqual(len(async_queries), len(sync_queries), path)
+        return response
+
+    def test_patient_reads(self):
+        from patients import async_views
+
+        listed = self.assertSameAnswer(
+            async_views.patient_list_create, reverse('patient-list-create') + '?page_size=3&count=true'
+        )
+        next_page = json.loads(listed.content)['next']
+        self.assertSameAnswer(async_views.patient_list_create, next_page)
+        self.assertSameAnswer(
+            async_views.patient_list_create, reverse('patient-list-create'), {'If-None-Match': listed['ETag']}
+        )
+
+        patient = self.patients[0]
+        path = reverse('patient-detail', args=[patient.pk])
+        detail = self.assertSameAnswer(async_views.patient_detail, path + '?fields=id,name', pk=patient.pk)
+        not_modified = self.assertSameAnswer(
+            async_views.patient_detail, path, {'If-None-Match': detail['ETag']}, pk=patient.pk
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_doctor_reads(self):
+        from doctors import async_views
+
+        self.assertSameAnswer(
+            async_views.doctor_list_create, reverse('doctor-list-create') + '?ordering=-experience_years&page_size=2'
+        )
+        doctor = self.doctors[0]
+        self.assertSameAnswer(
+            async_views.doctor_detail, reverse('doctor-detail', args=[doctor.pk]), pk=doctor.pk
+        )
+
+    def test_doctor_reads_are_cached(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncRequestFactory
+        from doctors import async_views
+
+        path = reverse('doctor-list-create')
+        view = async_to_sync(async_views.doctor_list_create)
+        first = view(AsyncRequestFactory().get(path, headers={'Authorization': self.auth}))
+        # A cache hit with the user cached runs no query at all
+        with self.assertNumQueries(0):
+            second = view(AsyncRequestFactory().get(path, headers={'Authorization': self.auth}))
+        self.assertEqual(second.content, first.content)
+
+    def test_care_team(self):
+        from mappings import async_views
+
+        patient = self.patients[0]
+        self.assertSameAnswer(
+            async_views.patient_doctors,
+            reverse('patient-doctors', args=[patient.pk]) + '?exclude=notes',
+            patient_id=patient.pk
+        )
+
+    def test_errors(self):
+        from patients import async_views
+        from patients.models import Patient
+
+        foreign = Patient.objects.create(
+            name='Foreign', email='foreign@example.test', phone='1', date_of_birth='1990-01-01',
+            gender='F', address='Street', created_by=self.other
+        )
+        path = reverse('patient-detail', args=[foreign.pk])
+        self.assertEqual(self.assertSameAnswer(async_views.patient_detail, path, pk=foreign.pk).status_code, 404)
+        unauthenticated = self.assertSameAnswer(
+            async_views.patient_list_create, reverse('patient-list-create'), {'Authorization': ''}
+        )
+        self.assertEqual(unauthenticated.status_code, 401)
+        invalid = self.assertSameAnswer(async_views.patient_list_create, reverse('patient-list-create') + '?fields=nope')
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_other_methods_use_the_sync_view(self):
+        from asgiref.sync import async_to_sync, iscoroutinefunction
+        from django.test import AsyncRequestFactory
+        from patients import async_views
+        from patients.models import Patient
+
+        self.assertTrue(iscoroutinefunction(async_views.patient_list_create))
+        request = AsyncRequestFactory().post(
+            reverse('patient-list-create'),
+            {'name': 'Jane', 'email': 'jane@example.test', 'phone': '1', 'date_of_birth': '1990-05-15',
+             'gender': 'F', 'address': 'Street'},
+            content_type='application/json',
+            headers={'Authorization': self.auth}
+        )
+        response = async_to_sync(async_views.patient_list_create)(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Patient.objects.filter(email='jane@example.test', created_by=self.user).exists())
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.healthy = True
+        self.reusable = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """
+    The per-process connection pool behind the PostgreSQL backend, driven
+    with fake connections and a fake clock
+    """
+
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch('healthcare_backend.db.pool.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.opened = []
+
+    def connect(self):
+        connection = FakeConnection(len(self.opened))
+        self.opened.append(connection)
+        return connection
+
+    def close(self, connection):
+        connection.closed = True
+
+    def make_pool(self, **options):
+        from healthcare_backend.db.pool import ConnectionPool
+
+        options = {'max_size': 2, 'timeout': 0, 'max_idle': 60, 'max_lifetime': 600, 'check_after': 5, **options}
+        return ConnectionPool(
+            self.connect, self.close,
+            check=lambda connection: connection.healthy,
+            reset=lambda connection: connection.reusable,
+            **options
+        )
+
+    def test_reuses_the_most_recent_connection(self):
+        pool = self.make_pool()
+        first, second = pool.checkout(), pool.checkout()
+        pool.checkin(first)
+        pool.checkin(second)
+        self.assertIs(pool.checkout(), second)
+        self.assertIs(pool.checkout(), first)
+        self.assertEqual(len(self.opened), 2)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['in_use'], stats['idle']), (2, 2, 0))
+        self.assertEqual((stats['checkouts'], stats['connections_opened']), (4, 2))
+
+    def test_bounded(self):
+        from healthcare_backend.db.pool import PoolTimeout
+
+        pool = self.make_pool()
+        connections = [pool.checkout(), pool.checkout()]
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+        self.assertEqual((pool.stats()['waits'], pool.stats()['timeouts']), (1, 1))
+        pool.checkin(connections[0])
+        self.assertIs(pool.checkout(), connections[0])
+
+    def test_waits_for_a_returned_connection(self):
+        import threading
+
+        pool = self.make_pool(max_size=1, timeout=None)
+        connection = pool.checkout()
+        waiter = []
+        thread = threading.Thread(target=lambda: waiter.append(pool.checkout()))
+        thread.start()
+        pool.checkin(connection)
+        thread.join(5)
+        self.assertEqual(waiter, [connection])
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = self.make_pool(max_size=1)
+        with mock.patch.object(pool, 'connect', side_effect=OSError('refused')):
+            with self.assertRaises(OSError):
+                pool.checkout()
+        self.assertIsNotNone(pool.checkout())
+        self.assertEqual(pool.stats()['connect_errors'], 1)
+
+    def test_health_check_after_idle(self):
+        pool = self.make_pool()
+        connection = pool.checkout()
+        pool.checkin(connection)
+        # Recently used connections are trusted
+        connection.healthy = False
+        self.assertIs(pool.checkout(), connection)
+        pool.checkin(connection)
+
+        self.now += 10
+        replacement = pool.checkout()
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['health_checks'], stats['health_check_failures']), (1, 1))
+        self.assertEqual(stats['size'], 1)
+
+    def test_idle_connections_are_recycled(self):
+        pool = self.make_pool()
+        first, second = pool.checkout(), pool.checkout()
+        pool.checkin(first)
+        self.now += 61
+        # Returning another connection prunes the stale one
+        pool.checkin(second)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['idle_recycled'], 1)
+        self.now += 61
+        self.assertIsNot(pool.checkout(), second)
+        self.assertTrue(second.closed)
+        self.assertEqual(pool.stats()['idle_recycled'], 2)
+
+    def test_max_lifetime(self):
+        pool = self.make_pool(max_idle=None)
+        connection = pool.checkout()
+        self.now += 601
+        pool.checkin(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual((pool.stats()['lifetime_expired'], pool.stats()['size']), (1, 0))
+
+    def test_connections_that_cannot_be_reset_are_closed(self):
+        pool = self.make_pool()
+        connection = pool.checkout()
+        connection.reusable = False
+        pool.checkin(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['reset_failures'], 1)
+
+    def test_discard_and_unknown_connections(self):
+        pool = self.make_pool()
+        connection = pool.checkout()
+        pool.discard(connection)
+        self.assertTrue(connection.closed)
+        stranger = FakeConnection(-1)
+        pool.checkin(stranger)
+        self.assertFalse(stranger.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_forked_child_forgets_the_parents_connections(self):
+        pool = self.make_pool()
+        parent = pool.checkout()
+        pool.checkin(parent)
+        pool._pid = -1
+        child = pool.checkout()
+        self.assertIsNot(child, parent)
+        self.assertFalse(parent.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_close(self):
+        from healthcare_backend.db.pool import PoolTimeout, pool_stats
+
+        pool = self.make_pool()
+        idle, busy = pool.checkout(), pool.checkout()
+        pool.checkin(idle)
+        self.assertIn(pool.name, pool_stats())
+        pool.close()
+        self.assertTrue(idle.closed)
+        pool.checkin(busy)
+        self.assertTrue(busy.closed)
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+        self.assertNotIn(pool.name, pool_stats())
+
+    def test_postgresql_reset(self):
+        from healthcare_backend.db.backends.postgresql_pool.base import reset
+
+        connection = mock.Mock(closed=False)
+        for status, reusable, rolled_back in ((0, True, False), (1, False, False), (2, True, True), (3, True, True)):
+            connection.reset_mock()
+            connection.info.transaction_status = status
+            self.assertEqual(reset(connection), reusable, status)
+            self.assertEqual(connection.rollback.called, rolled_back, status)
+        connection.closed = True
+        self.assertFalse(reset(connection))
+
+
+class GunicornConfigTests(SimpleTestCase):
+    """
+    Several workers are only started on a cache they all share
+    """
+
+    def test_multiple_workers_need_a_shared_cache(self):
+        import runpy
+        from types import SimpleNamespace
+
+        from django.conf import settings
+
+        on_starting = runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))['on_starting']
+
+        def server(workers):
+            return SimpleNamespace(cfg=SimpleNamespace(workers=workers))
+
+        with self.assertRaisesMessage(RuntimeError, 'LocMemCache'):
+            on_starting(server(2))
+        on_starting(server(1))
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://x'}}
+        with override_settings(CACHES=redis):
+            on_starting(server(4))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(SimpleTestCase):
+    """
+    Safe API requests read from a replica, writes and pinned users from the
+    primary. Routing decisions are checked without querying the replica.
+    """
+
+    def setUp(self):
+        from healthcare_backend.db.routers import get_pin_cache
+
+        get_pin_cache().clear()
+
+    def read_alias(self):
+        from django.db import router
+        from patients.models import Patient
+
+        return router.db_for_read(Patient)
+
+    def bearer(self, user_id):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        token = AccessToken()
+        token['user_id'] = user_id
+        return {'Authorization': f'Bearer {token}'}
+
+    def middleware(self):
+        """
+        Return a callable answering with the alias the view read from
+        """
+        from django.http import HttpResponse
+        from healthcare_backend.db.middleware import ReplicaRoutingMiddleware
+
+        middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse(self.read_alias()))
+        return lambda request: middleware(request).content.decode()
+
+    def test_router(self):
+        from django.db import connections, router
+        from healthcare_backend.db.routers import use_primary, use_replicas
+        from patients.models import Patient
+
+        self.assertEqual(self.read_alias(), 'default')
+        with use_replicas():
+            self.assertEqual(self.read_alias(), 'replica_1')
+            with use_primary():
+                self.assertEqual(self.read_alias(), 'default')
+            with mock.patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(self.read_alias(), 'default')
+            self.assertEqual(router.db_for_write(Patient), 'default')
+        self.assertFalse(router.allow_migrate('replica_1', 'patients'))
+        self.assertTrue(router.allow_migrate('default', 'patients'))
+        with override_settings(DATABASE_REPLICAS=[]), use_replicas():
+            self.assertEqual(self.read_alias(), 'default')
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        from django.test import RequestFactory
+        from healthcare_backend.db.routers import get_pin_cache
+
+        factory, middleware = RequestFactory(), self.middleware()
+        path = reverse('patient-list-create')
+        self.assertEqual(middleware(factory.get(path, headers=self.bearer(7))), 'replica_1')
+        self.assertEqual(middleware(factory.post(path, headers=self.bearer(7))), 'default')
+        self.assertEqual(middleware(factory.get(path, headers=self.bearer(7))), 'default')
+        # Other users, and anonymous or invalid tokens, still read from the replica
+        self.assertEqual(middleware(factory.get(path, headers=self.bearer(8))), 'replica_1')
+        self.assertEqual(middleware(factory.get(path)), 'replica_1')
+        self.assertEqual(middleware(factory.get(path, headers={'Authorization': 'Bearer nope'})), 'replica_1')
+        # Until the pin expires
+        get_pin_cache().clear()
+        self.assertEqual(middleware(factory.get(path, headers=self.bearer(7))), 'replica_1')
+        # Only API routes are routed to the replicas
+        self.assertEqual(middleware(factory.get('/admin/', headers=self.bearer(9))), 'default')
+
+    def test_async_middleware(self):
+        from asgiref.sync import async_to_sync, sync_to_async
+        from django.http import HttpResponse
+        from django.test import AsyncRequestFactory
+        from healthcare_backend.db.middleware import ReplicaRoutingMiddleware
+
+        async def view(request):
+            # ORM calls read the context through sync_to_async
+            return HttpResponse(await sync_to_async(self.read_alias)())
+
+        factory, middleware = AsyncRequestFactory(), async_to_sync(ReplicaRoutingMiddleware(view))
+        path = reverse('doctor-list-create')
+        self.assertEqual(middleware(factory.get(path, headers=self.bearer(7))).content, b'replica_1')
+        self.assertEqual(middleware(factory.delete(path, headers=self.bearer(7))).content, b'default')
+        self.assertEqual(middleware(factory.get(path, headers=self.bearer(7))).content, b'default')
+
+    def test_streaming_bodies_keep_the_route(self):
+        from asgiref.sync import async_to_sync
+        from django.http import StreamingHttpResponse
+        from django.test import AsyncRequestFactory, RequestFactory
+        from healthcare_backend.db.middleware import ReplicaRoutingMiddleware
+        from healthcare_backend.db.routers import pin_to_primary
+
+        def body():
+            yield self.read_alias().encode()
+
+        async def abody():
+            yield self.read_alias().encode()
+
+        async def aread(response):
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        path = reverse('patient-export', args=['ndjson'])
+        middleware = ReplicaRoutingMiddleware(lambda request: StreamingHttpResponse(body()))
+        response = middleware(RequestFactory().get(path, headers=self.bearer(7)))
+        # Read after the middleware returned, like the WSGI server does
+        self.assertEqual(b''.join(response.streaming_content), b'replica_1')
+
+        async def view(request):
+            return StreamingHttpResponse(abody())
+
+        amiddleware = async_to_sync(ReplicaRoutingMiddleware(view))
+        response = amiddleware(AsyncRequestFactory().get(path, headers=self.bearer(7)))
+        self.assertEqual(async_to_sync(aread)(response), b'replica_1')
+
+        pin_to_primary(7)
+        response = middleware(RequestFactory().get(path, headers=self.bearer(7)))
+        self.assertEqual(b''.join(response.streaming_content), b'default')
+
+
+@override_settings(THROTTLE_STORE='local')
+class ThrottlingTests(APITestCase):
+    """
+    Token-bucket throttling of the auth and list endpoints, with a fake clock
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+
+    def setUp(self):
+        cache.clear()
+        clear_buckets()
+        self.now = 1000.0
+        for name in ('monotonic', 'time'):
+            clock = mock.patch(f'healthcare_backend.throttling.time.{name}', side_effect=lambda: self.now)
+            clock.start()
+            self.addCleanup(clock.stop)
+        rates = mock.patch.dict(
+            'rest_framework.settings.api_settings.DEFAULT_THROTTLE_RATES',
+            {'login': '2/min', 'list': '3/min'}
+        )
+        rates.start()
+        self.addCleanup(rates.stop)
+
+    def login(self, **extra):
+        return self.client.post(reverse('login'), {
+            'email': 'owner@example.test', 'password': 'Owner-Pass-123'
+        }, format='json', **extra)
+
+    def list_patients(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get(reverse('patient-list-create'))
+
+    def test_bucket_refills_over_time(self):
+        self.assertEqual([self.login().status_code for _ in range(3)], [200, 200, 429])
+        response = self.login()
+        self.assertEqual(response['Retry-After'], '30')
+        self.now += 30
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login().status_code, 429)
+
+    def test_buckets_are_per_client(self):
+        self.login()
+        self.login()
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login(REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_forwarded_for_is_only_trusted_from_proxies(self):
+        from rest_framework.settings import api_settings
+
+        statuses = [self.login(HTTP_X_FORWARDED_FOR=f'203.0.113.{n}').status_code for n in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        with mock.patch.object(api_settings, 'NUM_PROXIES', 1):
+            self.assertEqual(self.login(HTTP_X_FORWARDED_FOR='203.0.113.9').status_code, 200)
+
+    def test_buckets_are_per_user_and_endpoint(self):
+        statuses = [self.list_patients(self.user).status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(self.list_patients(self.other).status_code, 200)
+        # Same scope, different view
+        self.assertEqual(self.client.get(reverse('doctor-list-create')).status_code, 200)
+        # Writes share the list view's bucket
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(reverse('patient-list-create'), {}, format='json').status_code, 429)
+
+    def test_unscoped_views_are_not_throttled(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+
+    def test_async_view_shares_the_bucket(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncRequestFactory
+        from patients import async_views
+
+        self.list_patients(self.user)
+        self.list_patients(self.user)
+        token = RefreshToken.for_user(self.user).access_token
+        request = AsyncRequestFactory().get(reverse('patient-list-create'), headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(async_to_sync(async_views.patient_list_create)(request).status_code, 200)
+        self.assertEqual(self.list_patients(self.user).status_code, 429)
+
+    @override_settings(THROTTLE_STORE='cache')
+    def test_shared_store_leases_requests(self):
+        from . import throttling
+
+        store = throttling.STORES['cache']
+        with mock.patch.object(throttling.caches['default'], 'get', wraps=throttling.caches['default'].get) as get:
+            waits = [store.consume('key', 100, 100 / 60) for _ in range(5)]
+        self.assertEqual(waits, [0] * 5)
+        # One round trip leases five requests
+        self.assertEqual(get.call_count, 1)
+        tokens, _ = cache.get('key')
+        self.assertEqual(tokens, 95)
+
+        # Another process sees the shared bucket drained
+        cache.set('key', (0, self.now))
+        store.clear()
+        self.assertAlmostEqual(store.consume('key', 100, 100 / 60), 0.6)
+        self.now += 0.6
+        self.assertEqual(store.consume('key', 100, 100 / 60), 0)
+
+    @override_settings(THROTTLE_STORE='cache')
+    def test_shared_store_throttles_requests(self):
+        self.assertEqual([self.login().status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(self.login(REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_local_store_drops_idle_buckets(self):
+        from . import throttling
+
+        store = throttling.LocalBucketStore()
+        with mock.patch.object(throttling, 'MAX_LOCAL_BUCKETS', 2):
+            store.consume('a', 2, 1)
+            store.consume('b', 2, 1)
+            self.now += 5
+            store.consume('c', 2, 1)
+        self.assertEqual(list(store.buckets), ['c'])
+
+    def test_local_store_keeps_each_buckets_own_window(self):
+        from . import throttling
+
+        store = throttling.LocalBucketStore()
+        hourly = (2, 2 / 3600)
+        store.consume('login', *hourly)
+        store.consume('login', *hourly)
+        # Requests on a short window do not reset the hourly bucket
+        self.now += 120
+        store.consume('list', 300, 5)
+        self.assertGreater(store.consume('login', *hourly), 0)
+
+        # Beyond the cap, the least recently used bucket goes
+        with mock.patch.object(throttling, 'MAX_LOCAL_BUCKETS', 2):
+            store.consume('register', *hourly)
+        self.assertEqual(list(store.buckets), ['login', 'register'])
+
+    def test_parse_rate(self):
+        from .throttling import parse_rate
+
+        self.assertEqual(parse_rate('300/min'), (300, 60))
+        self.assertEqual(parse_rate('20/hour'), (20, 3600))
+        self.assertEqual(parse_rate('5/s'), (5, 1))
@@ -0,0 +1,171 @@
+"""
+Token-bucket request throttling.
+
+A view opts in with ``@throttle_scope(name)`` above ``@api_view``; the
+scope's rate comes from ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`` (e.g.
+``'300/min'``) and views without a scope are not throttled. Each user - or
+client address, for anonymous requests, read from ``X-Forwarded-For`` only
+behind ``NUM_PROXIES`` trusted proxies - gets one bucket per view that holds
+up to the rate's number of requests and refills continuously, so short
+bursts pass and a sustained flood is held to the rate. Rejected requests get
+429 with a ``Retry-After`` header.
+
+Buckets live in one of two stores, picked by the ``THROTTLE_STORE`` setting:
+
+* ``local`` (default): a dict in this process. A check is a dict lookup and
+  some arithmetic under a lock, with no I/O. With several worker processes
+  each enforces the rate on its own.
+* ``cache``: the bucket is shared through the ``THROTTLE_CACHE_ALIAS``
+  cache, so the rate holds across processes and hosts. To avoid a cache round
+  trip per request, a process takes ``LEASE_FRACTION`` of the bucket at once
+  and spends it locally for up to ``LEASE_SECONDS``; unused leased requests
+  are dropped, so the rate is never exceeded by leasing. Concurrent leases
+  from different processes are not atomic and may overshoot slightly.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Share of a shared bucket a process leases in one cache round trip
+LEASE_FRACTION = 0.05
+LEASE_SECONDS = 1.0
+# Buckets a local store keeps, dropping the least recently used beyond it
+MAX_LOCAL_BUCKETS = 10000
+
+
+def parse_rate(rate):
+    """
+    Return ``(requests, seconds)`` for a rate such as ``'100/min'``
+    """
+    requests, period = rate.split('/')
+    return int(requests), DURATIONS[period[0]]
+
+
+def throttle_scope(scope):
+    """
+    Throttle an ``@api_view`` function view with the rate of ``scope``
+    """
+    def decorator(view):
+        view.cls.throttle_scope = scope
+        return view
+    return decorator
+
+
+class LocalBucketStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (tokens, updated, full_at), least recently used first
+        self.buckets = OrderedDict()
+
+    def consume(self, key, capacity, refill_rate):
+        """
+        Take one request from the bucket; return 0 on success, or the seconds
+        until one is available
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated, _ = self.buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / refill_rate
+            self.buckets[key] = (tokens, now, now + (capacity - tokens) / refill_rate)
+            self.buckets.move_to_end(key)
+            self.prune(now)
+        return wait
+
+    def prune(self, now):
+        """
+        Drop least recently used buckets that have refilled since, which
+        behave like missing ones, and any beyond ``MAX_LOCAL_BUCKETS``
+        """
+        while self.buckets:
+            full_at = next(iter(self.buckets.values()))[2]
+            if full_at > now and len(self.buckets) <= MAX_LOCAL_BUCKETS:
+                break
+            self.buckets.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBucketStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Requests leased from the shared bucket: key -> (count, expires)
+        self.leases = {}
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.monotonic()
+        with self.lock:
+            leased, expires = self.leases.get(key, (0, now))
+            if leased >= 1 and expires > now:
+                self.leases[key] = (leased - 1, expires)
+                return 0.0
+            self.leases.pop(key, None)
+
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        # Shared across machines, so the bucket uses wall-clock time
+        wall = time.time()
+        tokens, updated = cache.get(key) or (capacity, wall)
+        tokens = min(capacity, tokens + max(0.0, wall - updated) * refill_rate)
+        taken = min(math.floor(tokens), max(1, int(capacity * LEASE_FRACTION)))
+        cache.set(key, (tokens - taken, wall), math.ceil(capacity / refill_rate) + 1)
+        if taken < 1:
+            return (1 - tokens) / refill_rate
+        if taken > 1:
+            with self.lock:
+                self.leases[key] = (taken - 1, now + LEASE_SECONDS)
+        return 0.0
+
+    def clear(self):
+        with self.lock:
+            self.leases.clear()
+
+
+STORES = {'local': LocalBucketStore(), 'cache': CacheBucketStore()}
+
+
+def get_store():
+    return STORES[settings.THROTTLE_STORE]
+
+
+def clear_buckets():
+    for store in STORES.values():
+        store.clear()
+
+
+class ScopedTokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per scope, view and user (or client address)
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if rate is None:
+            return True
+        requests, seconds = parse_rate(rate)
+        user = request.user
+        ident = f'user:{user.pk}' if user and user.is_authenticated else f'addr:{self.get_ident(request)}'
+        # Named after the view function, so the sync and async views share it
+        key = f'throttle:{scope}:{type(view).__name__}:{ident}'
+        self.wait_seconds = get_store().consume(key, requests, requests / seconds)
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
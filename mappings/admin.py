@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db import transaction
+from dashboard import services as dashboard_services
 from .models import PatientDoctorMapping
 
 @admin.register(PatientDoctorMapping)
@@ -8,3 +10,20 @@ class PatientDoctorMappingAdmin(admin.ModelAdmin):
     search_fields = ('patient__name', 'doctor__name', 'patient__email', 'doctor__email')
     ordering = ('-assigned_date',)
     readonly_fields = ('assigned_date',)
+
+    def get_readonly_fields(self, request, obj=None):
+        # Another patient or doctor is a new mapping, not an edit
+        if obj is not None:
+            return self.readonly_fields + ('patient', 'doctor')
+        return self.readonly_fields
+
+    def delete_model(self, request, obj):
+        # Mappings have no delete signals, see dashboard.services. The
+        # delete view already runs in a transaction; the bulk action does not.
+        dashboard_services.mappings_removed([(obj.owner_id, obj.patient_id, obj.doctor_id)])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            dashboard_services.mappings_removed(queryset.values_list('owner_id', 'patient_id', 'doctor_id'))
+            super().delete_queryset(request, queryset)
@@ -0,0 +1,25 @@
+"""
+Async GET handler for a patient's care team, routed under ASGI (see
+``healthcare_backend.async_views``). It runs the same steps as
+``mappings.views.patient_doctors`` and only issues the queries through the
+async ORM.
+"""
+
+from rest_framework import status
+from rest_framework.response import Response
+from healthcare_backend.async_views import async_read_view
+from patients.serializers import patient_projection
+from . import views
+from .serializers import mapping_doctor_only_projection
+
+@async_read_view(views.patient_doctors)
+async def patient_doctors(request, patient_id):
+    """
+    GET: Retrieve all doctors assigned to a specific patient
+    """
+    row = await patient_projection.aget(views.owned_patient(request, patient_id))
+    patient_details = views.care_team_details(row)
+
+    projection = mapping_doctor_only_projection.for_request(request)
+    mappings = [mapping async for mapping in views.care_team_rows(row['id'], projection)]
+    return Response(views.care_team(patient_details, mappings, projection), status=status.HTTP_200_OK)
@@ -0,0 +1,227 @@
+import datetime
+import json
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from healthcare_backend.testing import seed_dataset
+from patients.models import Patient
+
+# GET requests whose queries are audited: (route name, url args, query params).
+# Args naming a seeded object ('patient', 'doctor') are replaced by its id.
+HOTPATHS = (
+    ('patient-list-create', (), {}),
+    ('patient-list-create', (), {'fields': 'id,name', 'count': 'true'}),
+    ('patient-detail', ('patient',), {}),
+    ('patient-search', (), {'q': 'patient 0001'}),
+    ('patient-export', ('ndjson',), {}),
+    ('doctor-list-create', (), {}),
+    ('doctor-list-create', (), {'specialization': 'Cardiology', 'is_available': 'true'}),
+    ('doctor-list-create', (), {'is_available': 'false', 'ordering': '-name'}),
+    ('doctor-list-create', (), {'min_experience': '10', 'ordering': '-experience_years'}),
+    ('doctor-list-create', (), {'ordering': '-created_at'}),
+    ('doctor-list-create', (), {'min_fee': '150', 'max_fee': '200'}),
+    ('doctor-detail', ('doctor',), {}),
+    ('doctor-autocomplete', (), {'q': 'doc'}),
+    ('doctor-export', ('csv',), {}),
+    ('doctor-caseload', (), {}),
+    ('doctor-caseload', (), {'ordering': 'active_patients', 'is_available': 'true'}),
+    ('mapping-list-create', (), {}),
+    ('mapping-list-create', (), {'exclude': 'patient_details'}),
+    ('patient-doctors', ('patient',), {}),
+    ('doctor-patients', ('doctor',), {}),
+    ('mapping-export', ('ndjson',), {}),
+    ('dashboard', (), {}),
+)
+
+# Scans and sorts that are inherent to a query rather than a missing index:
+# route name -> ((SQL pattern, reason), ...); the first matching pattern wins
+EXPECTED = {
+    'patient-search': (
+        (r'\b(bm25|ts_rank)\(', 'matches are ordered by relevance, which no index holds'),
+    ),
+    'doctor-list-create': (
+        (r'"consultation_fee" >=', 'a fee range is read from doctor_fee_idx and the matches sorted'),
+    ),
+    'doctor-autocomplete': (
+        (r'"updated_at" FROM "doctors_doctor"$', 'the first lookup loads every doctor into the in-process index'),
+    ),
+    'doctor-caseload': (
+        (r'\bCOUNT\(', 'caseloads are counted in one grouped query whose groups are then sorted'),
+    ),
+}
+
+# Other owners seeded alongside the audited user so per-owner indexes are as
+# selective for the planner as they are in production
+NEIGHBOURS = 9
+
+SQLITE_SCAN = re.compile(r'^SCAN (?!.*\bUSING\b)(?!.*\bVIRTUAL TABLE\b)')
+SQLITE_SORT = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')
+POSTGRESQL_SCAN = re.compile(r'\bSeq Scan on\b')
+POSTGRESQL_SORT = re.compile(r'^\s*(->\s*)?(Incremental )?Sort\b')
+
+
+def expected_reason(route, sql):
+    for pattern, reason in EXPECTED.get(route, ()):
+        if re.search(pattern, sql, re.IGNORECASE):
+            return reason
+    return None
+
+
+def plan_problems(vendor, plan):
+    """
+    Return the kinds of problems ('sequential scan', 'sort') in an EXPLAIN
+    plan given as a list of lines
+    """
+    if vendor == 'postgresql':
+        scan, sort = POSTGRESQL_SCAN, POSTGRESQL_SORT
+    else:
+        scan, sort = SQLITE_SCAN, SQLITE_SORT
+    problems = []
+    if any(scan.search(line) for line in plan):
+        problems.append('sequential scan')
+    if any(sort.search(line) for line in plan):
+        problems.append('sort')
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a dataset inside a transaction that is rolled back, issue every "
+        "audited GET endpoint, EXPLAIN each SELECT it runs and flag sequential "
+        "scans and sorts. Exits with an error when an unexpected one is found."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=5000,
+            help="Patients, doctors and mappings to seed (default: 5000).",
+        )
+        parser.add_argument(
+            '--report-only', action='store_true',
+            help="Print the findings without failing.",
+        )
+
+    def handle(self, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f"EXPLAIN parsing is not implemented for {connection.vendor}.")
+        if options['rows'] < 1:
+            raise CommandError("--rows must be positive.")
+
+        self.verbosity = options['verbosity']
+        # Bypass the response cache so every request reaches the database
+        dummy_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(CACHES=dummy_cache, ALLOWED_HOSTS=hosts), transaction.atomic():
+            findings = self.audit(options['rows'])
+            transaction.set_rollback(True)
+
+        unexpected = [finding for finding in findings if not finding['expected']]
+        self.stdout.write(
+            f"Explained {self.explained} queries for {len(HOTPATHS)} requests: "
+            f"{len(unexpected)} unexpected and {len(findings) - len(unexpected)} expected findings."
+        )
+        if unexpected and not options['report_only']:
+            raise CommandError(
+                f"{len(unexpected)} queries use sequential scans or sorts; "
+                "add an index or list the query in EXPECTED."
+            )
+
+    def audit(self, rows):
+        user = get_user_model().objects.create_user(
+            email='explain-hotpaths@example.test', username='explain-hotpaths',
+            name='Explain Hotpaths', password=None
+        )
+        patients, doctors, _ = seed_dataset(user, rows)
+        self.seed_neighbours(rows)
+        seeded = {'patient': patients[0].pk, 'doctor': doctors[0].pk}
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        client = APIClient()
+        client.force_authenticate(user)
+        self.explained = 0
+        findings = []
+        for route, args, params in HOTPATHS:
+            url = reverse(route, args=[seeded.get(arg, arg) for arg in args])
+            label = f"GET {route}" + (f" ?{'&'.join(f'{k}={v}' for k, v in params.items())}" if params else '')
+            findings.extend(self.explain_request(client, route, label, url, params))
+        return findings
+
+    def seed_neighbours(self, rows):
+        User = get_user_model()
+        for number in range(NEIGHBOURS):
+            owner = User.objects.create_user(
+                email=f'explain-hotpaths-{number}@example.test', username=f'explain-hotpaths-{number}',
+                name='Explain Hotpaths', password=None
+            )
+            Patient.objects.bulk_create([
+                Patient(
+                    name=f'Neighbour {number}-{i:05d}', email=f'neighbour{number}-{i}@example.test',
+                    phone='+1-333-000000', date_of_birth=datetime.date(1980, 1, 1), gender='O',
+                    created_by=owner,
+                )
+                for i in range(rows)
+            ], batch_size=2000)
+
+    def explain_request(self, client, route, label, url, params, follow=True):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        if response.status_code != 200:
+            raise CommandError(f"{label} returned {response.status_code}: {body[:200]!r}")
+
+        findings = []
+        statements = [query['sql'] for query in queries.captured_queries]
+        for sql in statements:
+            if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                continue
+            plan = self.explain(sql)
+            self.explained += 1
+            problems = plan_problems(connection.vendor, plan)
+            reason = expected_reason(route, sql)
+            if problems:
+                findings.append({'route': route, 'expected': reason is not None})
+            if problems or self.verbosity > 1:
+                self.report(label, sql, plan, problems, reason)
+
+        # Follow the next cursor once so keyset continuation queries are audited too
+        if follow and not response.streaming:
+            try:
+                next_url = json.loads(body).get('next')
+            except (ValueError, AttributeError):
+                next_url = None
+            if next_url:
+                findings.extend(
+                    self.explain_request(client, route, f'{label} (next page)', next_url, {}, follow=False)
+                )
+        return findings
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def report(self, label, sql, plan, problems, reason):
+        expected = reason is not None
+        if not problems:
+            status = self.style.SUCCESS('ok')
+        elif expected:
+            status = self.style.WARNING(f"expected {', '.join(problems)}: {reason}")
+        else:
+            status = self.style.ERROR(', '.join(problems).upper())
+        self.stdout.write(f"{label} [{status}]")
+        if self.verbosity > 1 or (problems and not expected):
+            self.stdout.write(f"  {sql}")
+            for line in plan:
+                self.stdout.write(f"    {line}")
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mappings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patientdoctormapping',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['patient', '-assigned_date'], name='mapping_patient_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientdoctormapping',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['doctor', '-assigned_date'], name='mapping_doctor_active_idx'),
+        ),
+    ]
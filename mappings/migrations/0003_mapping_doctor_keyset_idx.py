@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mappings', '0002_mapping_hotpath_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='patientdoctormapping',
+            name='mapping_doctor_active_idx',
+        ),
+        migrations.AddIndex(
+            model_name='patientdoctormapping',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['doctor', '-assigned_date', '-id'], name='mapping_doctor_active_idx'),
+        ),
+    ]
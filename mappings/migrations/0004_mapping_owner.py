@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_owners(apps, schema_editor):
+    """
+    Copy each mapping's patient owner in one UPDATE
+    """
+    Patient = apps.get_model('patients', 'Patient')
+    PatientDoctorMapping = apps.get_model('mappings', 'PatientDoctorMapping')
+    PatientDoctorMapping.objects.update(
+        owner_id=Subquery(Patient.objects.filter(pk=OuterRef('patient_id')).values('created_by_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mappings', '0003_mapping_doctor_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientdoctormapping',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(copy_owners, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='patientdoctormapping',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='patientdoctormapping',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['owner', '-assigned_date', '-id'], name='mapping_owner_active_idx'),
+        ),
+    ]
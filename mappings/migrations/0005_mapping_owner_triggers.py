@@ -0,0 +1,93 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:55
+
+from django.db import migrations
+
+# The mapping owner is a copy of its patient's created_by; these triggers
+# keep it so for every write path, including queryset updates that send no
+# signals. (forward statements, reverse statements) per database vendor.
+_POSTGRESQL_SQL = ((
+    """
+    CREATE FUNCTION mappings_mapping_set_owner() RETURNS trigger AS $$
+    BEGIN
+        SELECT created_by_id INTO NEW.owner_id FROM patients_patient WHERE id = NEW.patient_id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "CREATE TRIGGER mappings_mapping_owner_trigger "
+    "BEFORE INSERT OR UPDATE OF patient_id, owner_id ON mappings_patientdoctormapping "
+    "FOR EACH ROW EXECUTE PROCEDURE mappings_mapping_set_owner()",
+    """
+    CREATE FUNCTION mappings_patient_move_mappings() RETURNS trigger AS $$
+    BEGIN
+        UPDATE mappings_patientdoctormapping SET owner_id = NEW.created_by_id WHERE patient_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "CREATE TRIGGER mappings_patient_owner_trigger "
+    "AFTER UPDATE OF created_by_id ON patients_patient "
+    "FOR EACH ROW WHEN (OLD.created_by_id IS DISTINCT FROM NEW.created_by_id) "
+    "EXECUTE PROCEDURE mappings_patient_move_mappings()",
+), (
+    "DROP TRIGGER IF EXISTS mappings_patient_owner_trigger ON patients_patient",
+    "DROP FUNCTION IF EXISTS mappings_patient_move_mappings()",
+    "DROP TRIGGER IF EXISTS mappings_mapping_owner_trigger ON mappings_patientdoctormapping",
+    "DROP FUNCTION IF EXISTS mappings_mapping_set_owner()",
+))
+
+# SQLite triggers cannot assign NEW, so the row is corrected after the write
+_SQLITE_OWNER = "(SELECT created_by_id FROM patients_patient WHERE id = new.patient_id)"
+_SQLITE_SET_OWNER = (
+    f"WHEN new.owner_id IS NOT {_SQLITE_OWNER} BEGIN "
+    f"UPDATE mappings_patientdoctormapping SET owner_id = {_SQLITE_OWNER} WHERE id = new.id; END"
+)
+_SQLITE_SQL = ((
+    "CREATE TRIGGER mappings_mapping_owner_insert AFTER INSERT ON mappings_patientdoctormapping "
+    + _SQLITE_SET_OWNER,
+    "CREATE TRIGGER mappings_mapping_owner_update "
+    "AFTER UPDATE OF patient_id, owner_id ON mappings_patientdoctormapping " + _SQLITE_SET_OWNER,
+    "CREATE TRIGGER mappings_patient_owner_update AFTER UPDATE OF created_by_id ON patients_patient "
+    "WHEN new.created_by_id IS NOT old.created_by_id BEGIN "
+    "UPDATE mappings_patientdoctormapping SET owner_id = new.created_by_id WHERE patient_id = new.id; END",
+), (
+    "DROP TRIGGER IF EXISTS mappings_patient_owner_update",
+    "DROP TRIGGER IF EXISTS mappings_mapping_owner_update",
+    "DROP TRIGGER IF EXISTS mappings_mapping_owner_insert",
+))
+
+OWNER_TRIGGER_SQL = {
+    'postgresql': _POSTGRESQL_SQL,
+    'sqlite': _SQLITE_SQL,
+}
+
+
+def create_owner_triggers(apps, schema_editor):
+    """
+    Install the owner triggers.
+
+    On SQLite, migrations that rebuild ``mappings_patientdoctormapping`` or
+    ``patients_patient`` (most AlterField operations) drop their triggers;
+    such migrations must drop and recreate them around the rebuild.
+    """
+    forward, _ = OWNER_TRIGGER_SQL.get(schema_editor.connection.vendor, ((), ()))
+    for statement in forward:
+        schema_editor.execute(statement)
+
+
+def drop_owner_triggers(apps, schema_editor):
+    _, reverse = OWNER_TRIGGER_SQL.get(schema_editor.connection.vendor, ((), ()))
+    for statement in reverse:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0004_patient_owner_updated_idx'),
+        ('mappings', '0004_mapping_owner'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_owner_triggers, drop_owner_triggers),
+    ]
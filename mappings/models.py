@@ -1,18 +1,64 @@
+from django.conf import settings
 from django.db import models
 
+
+class PatientDoctorMappingQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for mapping in objs:
+            mapping.set_owner()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class PatientDoctorMapping(models.Model):
     """
     Model to manage patient-doctor relationships
     """
     patient = models.ForeignKey('patients.Patient', on_delete=models.CASCADE, related_name='doctor_mappings')
+    # Copy of patient.created_by, so a user's mappings are read from one
+    # index in assignment order. Database triggers keep it in step on every
+    # write (migration 0005); save() and bulk_create() also set it, since
+    # the column is NOT NULL. Deleted with the patient, hence DO_NOTHING.
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='+', db_index=False, editable=False
+    )
     doctor = models.ForeignKey('doctors.Doctor', on_delete=models.CASCADE, related_name='patient_mappings')
     assigned_date = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+
+    objects = PatientDoctorMappingQuerySet.as_manager()
     
     class Meta:
         unique_together = ('patient', 'doctor')
         ordering = ['-assigned_date']
+        indexes = [
+            # Partial so a bare ``WHERE is_active`` can use them: SQLite only
+            # matches a boolean column against an index key on ``= 1``.
+            # A patient's active care team, newest first
+            models.Index(
+                fields=['patient', '-assigned_date'], condition=models.Q(is_active=True),
+                name='mapping_patient_active_idx'
+            ),
+            # The reverse lookup: a doctor's active patients, keyset-paginated
+            models.Index(
+                fields=['doctor', '-assigned_date', '-id'], condition=models.Q(is_active=True),
+                name='mapping_doctor_active_idx'
+            ),
+            # A user's active mappings across all their patients, newest first
+            models.Index(
+                fields=['owner', '-assigned_date', '-id'], condition=models.Q(is_active=True),
+                name='mapping_owner_active_idx'
+            ),
+        ]
+
+    def set_owner(self):
+        if self.owner_id is None:
+            self.owner_id = self.patient.created_by_id
+
+    def save(self, *args, **kwargs):
+        self.set_owner()
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.patient.name} -> Dr. {self.doctor.name}"
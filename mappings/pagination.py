@@ -0,0 +1,9 @@
+from healthcare_backend.pagination import KeysetPagination
+
+
+class CaseloadCursorPagination(KeysetPagination):
+    """
+    Cursor pagination over a doctor's active mappings, newest assignment
+    first, matching the ``mapping_doctor_active_idx`` index
+    """
+    ordering = ('-assigned_date', '-id')
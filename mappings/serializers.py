@@ -1,12 +1,19 @@
 from rest_framework import serializers
+from doctors.serializers import DoctorSerializer, doctor_projection
+from healthcare_backend.projections import ValuesProjection
+from patients.models import Patient
+from patients.serializers import PatientSerializer, patient_projection
 from .models import PatientDoctorMapping
 
 class PatientDoctorMappingSerializer(serializers.ModelSerializer):
     """
     Serializer for PatientDoctorMapping model
+
+    The nested details read the already-loaded relations, so querysets should
+    use select_related('patient__created_by', 'doctor') to avoid N+1 queries.
     """
-    patient_details = serializers.SerializerMethodField()
-    doctor_details = serializers.SerializerMethodField()
+    patient_details = PatientSerializer(source='patient', read_only=True)
+    doctor_details = DoctorSerializer(source='doctor', read_only=True)
     
     class Meta:
         model = PatientDoctorMapping
@@ -16,16 +23,6 @@ class PatientDoctorMappingSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('id', 'assigned_date')
     
-    def get_patient_details(self, obj):
-        """Get patient details"""
-        from patients.serializers import PatientSerializer
-        return PatientSerializer(obj.patient).data
-    
-    def get_doctor_details(self, obj):
-        """Get doctor details"""
-        from doctors.serializers import DoctorSerializer
-        return DoctorSerializer(obj.doctor).data
-    
     def validate(self, attrs):
         """
         Validate that the patient belongs to the current user
@@ -33,7 +30,7 @@ class PatientDoctorMappingSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
             patient = attrs.get('patient')
-            if patient and patient.created_by != request.user:
+            if patient and patient.created_by_id != request.user.pk:
                 raise serializers.ValidationError(
                     "You can only assign doctors to your own patients."
                 )
@@ -43,6 +40,9 @@ class PatientDoctorMappingCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating patient-doctor mappings
     """
+    # Load the owner with the patient so the created mapping renders without extra queries
+    patient = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.select_related('created_by'))
+
     class Meta:
         model = PatientDoctorMapping
         fields = ['patient', 'doctor', 'notes']
@@ -56,7 +56,7 @@ class PatientDoctorMappingCreateSerializer(serializers.ModelSerializer):
             patient = attrs.get('patient')
             doctor = attrs.get('doctor')
             
-            if patient and patient.created_by != request.user:
+            if patient and patient.created_by_id != request.user.pk:
                 raise serializers.ValidationError(
                     "You can only assign doctors to your own patients."
                 )
@@ -78,7 +78,7 @@ class PatientDoctorMappingDoctorOnlySerializer(serializers.ModelSerializer):
     Serializer for PatientDoctorMapping that only includes doctor details
     Used when patient details are already provided at response level
     """
-    doctor_details = serializers.SerializerMethodField()
+    doctor_details = DoctorSerializer(source='doctor', read_only=True)
     
     class Meta:
         model = PatientDoctorMapping
@@ -87,8 +87,76 @@ class PatientDoctorMappingDoctorOnlySerializer(serializers.ModelSerializer):
             'assigned_date', 'notes', 'is_active'
         ]
         read_only_fields = ('id', 'assigned_date')
-    
-    def get_doctor_details(self, obj):
-        """Get doctor details"""
-        from doctors.serializers import DoctorSerializer
-        return DoctorSerializer(obj.doctor).data
\ No newline at end of file
+
+class PatientDoctorMappingPatientOnlySerializer(serializers.ModelSerializer):
+    """
+    Serializer for PatientDoctorMapping that only includes patient details
+    Used when doctor details are already provided at response level
+    """
+    patient_details = PatientSerializer(source='patient', read_only=True)
+
+    class Meta:
+        model = PatientDoctorMapping
+        fields = [
+            'id', 'patient', 'patient_details',
+            'assigned_date', 'notes', 'is_active'
+        ]
+        read_only_fields = ('id', 'assigned_date')
+
+# Read paths for GETs; the nested details are joined in the same values() query
+mapping_projection = ValuesProjection(
+    PatientDoctorMappingSerializer,
+    nested={'patient_details': patient_projection, 'doctor_details': doctor_projection}
+)
+mapping_doctor_only_projection = ValuesProjection(
+    PatientDoctorMappingDoctorOnlySerializer,
+    nested={'doctor_details': doctor_projection}
+)
+mapping_patient_only_projection = ValuesProjection(
+    PatientDoctorMappingPatientOnlySerializer,
+    nested={'patient_details': patient_projection}
+)
+
+class PatientDoctorMappingExportSerializer(serializers.ModelSerializer):
+    """
+    Flat, read-only representation of a mapping used by the NDJSON/CSV export
+    """
+    patient_name = serializers.CharField(source='patient.name', read_only=True)
+    patient_email = serializers.EmailField(source='patient.email', read_only=True)
+    doctor_name = serializers.CharField(source='doctor.name', read_only=True)
+    doctor_specialization = serializers.CharField(source='doctor.specialization', read_only=True)
+
+    class Meta:
+        model = PatientDoctorMapping
+        fields = [
+            'id', 'patient', 'patient_name', 'patient_email',
+            'doctor', 'doctor_name', 'doctor_specialization',
+            'assigned_date', 'notes', 'is_active'
+        ]
+        read_only_fields = fields
+
+class PatientDoctorBatchSerializer(serializers.Serializer):
+    """
+    Serializer for assigning and unassigning many doctors of one patient
+    """
+    assign = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list, max_length=500
+    )
+    unassign = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list, max_length=500
+    )
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, attrs):
+        """
+        Validate that there is something to do and that no doctor is both
+        assigned and unassigned
+        """
+        if not attrs['assign'] and not attrs['unassign']:
+            raise serializers.ValidationError("Provide at least one doctor to assign or unassign.")
+        overlap = set(attrs['assign']) & set(attrs['unassign'])
+        if overlap:
+            raise serializers.ValidationError(
+                f"Doctors cannot be assigned and unassigned at once: {sorted(overlap)}"
+            )
+        return attrs
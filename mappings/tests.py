@@ -1,3 +1,292 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from healthcare_backend.testing import seed_dataset
+from .management.commands.explain_hotpaths import plan_problems
+from .models import PatientDoctorMapping
+
+User = get_user_model()
+
+
+class PatientDoctorsBatchTests(APITestCase):
+    """
+    Batch assignment and unassignment of a patient's doctors
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+        cls.patients, cls.doctors, _ = seed_dataset(cls.user, 10)
+        cls.patient = cls.patients[1]
+        cls.url = reverse('patient-doctors-batch', args=[cls.patient.pk])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def active_doctor_ids(self):
+        return set(
+            PatientDoctorMapping.objects.filter(patient=self.patient, is_active=True)
+            .values_list('doctor_id', flat=True)
+        )
+
+    def test_assign_and_unassign_in_one_request(self):
+        PatientDoctorMapping.objects.create(patient=self.patient, doctor=self.doctors[0])
+        PatientDoctorMapping.objects.create(patient=self.patient, doctor=self.doctors[1], is_active=False)
+
+        response = self.client.post(self.url, {
+            'assign': [self.doctors[1].pk, self.doctors[2].pk, self.doctors[3].pk],
+            'unassign': [self.doctors[0].pk, self.doctors[9].pk],
+            'notes': 'Care team review',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['assigned'], 3)
+        self.assertEqual(response.data['unassigned'], 1)
+        expected = {self.doctors[1].pk, self.doctors[2].pk, self.doctors[3].pk}
+        self.assertEqual(self.active_doctor_ids(), expected)
+        self.assertEqual({row['doctor'] for row in response.data['doctors']}, expected)
+        self.assertEqual(response.data['patient_details']['id'], self.patient.pk)
+
+    def test_unknown_doctors_reject_the_whole_batch(self):
+        response = self.client.post(self.url, {
+            'assign': [self.doctors[2].pk, 999999],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.active_doctor_ids(), set())
+
+    def test_overlapping_and_empty_requests_are_rejected(self):
+        doctor_id = self.doctors[2].pk
+        response = self.client.post(self.url, {'assign': [doctor_id], 'unassign': [doctor_id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_concurrent_assignment_fails_without_counting(self):
+        from unittest import mock
+
+        from dashboard.services import recount
+
+        recount([self.user.pk])
+        patient = self.patients[1]
+        bulk_create = PatientDoctorMapping.objects.bulk_create
+
+        def assigned_concurrently(mappings, *args, **kwargs):
+            # Another request inserts one of the pairs first
+            PatientDoctorMapping.objects.create(patient=patient, doctor=self.doctors[1])
+            return bulk_create(mappings, *args, **kwargs)
+
+        url = reverse('patient-doctors-batch', args=[patient.pk])
+        with mock.patch.object(PatientDoctorMapping.objects, 'bulk_create', assigned_concurrently):
+            response = self.client.post(url, {'assign': [self.doctors[1].pk, self.doctors[2].pk]}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(PatientDoctorMapping.objects.filter(patient=patient).exists())
+        # Nothing was counted for the rolled back batch
+        self.assertEqual(recount([self.user.pk]), 0)
+
+    def test_other_users_patients_are_not_found(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.post(self.url, {'assign': [self.doctors[2].pk]}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class MappingSparseFieldsetTests(APITestCase):
+    """
+    Sparse fieldsets decide whether nested details are joined at all
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.patients, cls.doctors, _ = seed_dataset(cls.user, 3)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_list_without_nested_details_skips_their_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('mapping-list-create'), {'exclude': 'patient_details,doctor_details'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.json()['results'][0]),
+            {'id', 'patient', 'doctor', 'assigned_date', 'notes', 'is_active'}
+        )
+        sql = queries[-1]['sql']
+        self.assertNotIn('doctors_doctor', sql)
+        self.assertNotIn('medical_history', sql)
+
+    def test_list_with_doctor_details_only(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('mapping-list-create'), {'fields': 'id,doctor_details'})
+        row = response.json()['results'][0]
+        self.assertEqual(set(row), {'id', 'doctor_details'})
+        self.assertIn('license_number', row['doctor_details'])
+        self.assertNotIn('medical_history', queries[-1]['sql'])
+
+    def test_care_team_fields_apply_to_doctor_entries(self):
+        url = reverse('patient-doctors', args=[self.patients[0].pk])
+        response = self.client.get(url, {'fields': 'doctor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(response.json()['doctors'], key=lambda row: row['doctor']),
+            [{'doctor': doctor.pk} for doctor in self.doctors]
+        )
+        self.assertEqual(response.json()['patient_details']['id'], self.patients[0].pk)
+
+
+class DoctorPatientsTests(APITestCase):
+    """
+    A doctor's active patients, scoped to the authenticated user
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+        cls.patients, cls.doctors, _ = seed_dataset(cls.user, 5)
+        cls.doctor = cls.doctors[0]
+        PatientDoctorMapping.objects.bulk_create([
+            PatientDoctorMapping(patient=patient, doctor=cls.doctor) for patient in cls.patients[1:]
+        ])
+        PatientDoctorMapping.objects.filter(patient=cls.patients[4], doctor=cls.doctor).update(is_active=False)
+        cls.url = reverse('doctor-patients', args=[cls.doctor.pk])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_pages_through_active_patients(self):
+        response = self.client.get(self.url, {'page_size': 2, 'count': 'true'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['doctor_details']['id'], self.doctor.pk)
+        self.assertEqual(body['count'], 4)
+        self.assertEqual(len(body['results']), 2)
+
+        seen = [row['patient'] for row in body['results']]
+        seen += [row['patient'] for row in self.client.get(body['next']).json()['results']]
+        self.assertEqual(sorted(seen), sorted(patient.pk for patient in self.patients[:4]))
+
+    def test_fields_apply_to_patient_entries(self):
+        response = self.client.get(self.url, {'fields': 'patient_details'})
+        row = response.json()['results'][0]
+        self.assertEqual(set(row), {'patient_details'})
+        self.assertIn('email', row['patient_details'])
+
+    def test_other_users_patients_are_hidden(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_unknown_doctor_is_not_found(self):
+        response = self.client.get(reverse('doctor-patients', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class MappingOwnerTests(APITestCase):
+    """
+    Mappings carry their patient's owner for the per-user index
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+        cls.patients, cls.doctors, cls.mappings = seed_dataset(cls.user, 3)
+
+    def test_owner_is_set_on_every_create_path(self):
+        created = PatientDoctorMapping.objects.create(patient_id=self.patients[1].pk, doctor=self.doctors[0])
+        self.assertEqual(created.owner_id, self.user.pk)
+        self.assertEqual({mapping.owner_id for mapping in self.mappings}, {self.user.pk})
+
+    def test_owner_follows_the_patient(self):
+        from patients.models import Patient
+
+        # Queryset updates send no signals; the database keeps the copy
+        Patient.objects.filter(pk=self.patients[0].pk).update(created_by=self.other)
+        owners = set(PatientDoctorMapping.objects.filter(patient=self.patients[0]).values_list('owner_id', flat=True))
+        self.assertEqual(owners, {self.other.pk})
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(reverse('mapping-list-create')).json()['count'], len(self.mappings))
+
+    def test_owner_follows_a_moved_mapping(self):
+        from patients.models import Patient
+
+        moved = self.mappings[0]
+        other_patient = Patient.objects.create(
+            name='Moved', email='moved@example.test', phone='+1-555-000000', date_of_birth='1990-01-01',
+            gender='O', address='1 Test Street', created_by=self.other,
+        )
+        PatientDoctorMapping.objects.filter(pk=moved.pk).update(patient=other_patient)
+        moved.refresh_from_db()
+        self.assertEqual(moved.owner_id, self.other.pk)
+
+        self.client.force_authenticate(self.other)
+        listed = [row['id'] for row in self.client.get(reverse('mapping-list-create')).json()['results']]
+        self.assertIn(moved.pk, listed)
+
+    def test_owner_cannot_be_set_apart_from_the_patient(self):
+        PatientDoctorMapping.objects.filter(pk=self.mappings[0].pk).update(owner=self.other)
+        self.mappings[0].refresh_from_db()
+        self.assertEqual(self.mappings[0].owner_id, self.user.pk)
+
+
+class ExplainHotpathsTests(APITestCase):
+    """
+    The query-plan audit over the read endpoints
+    """
+
+    def test_sqlite_plan_parsing(self):
+        self.assertEqual(plan_problems('sqlite', ['SCAN doctors_doctor']), ['sequential scan'])
+        self.assertEqual(plan_problems('sqlite', [
+            'SEARCH patients_patient USING INDEX patient_owner_created_idx (created_by_id=?)',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]), ['sort'])
+        self.assertEqual(plan_problems('sqlite', [
+            'SCAN doctors_doctor USING INDEX doctor_name_idx',
+            'SCAN patients_patient_fts VIRTUAL TABLE INDEX 0:M5',
+        ]), [])
+
+    def test_postgresql_plan_parsing(self):
+        self.assertEqual(plan_problems('postgresql', [
+            'Limit  (cost=0.29..1.53 rows=21 width=8)',
+            '  ->  Sort  (cost=0.29..0.30 rows=21 width=8)',
+            '        ->  Seq Scan on doctors_doctor  (cost=0.00..1.20 rows=20 width=8)',
+        ]), ['sequential scan', 'sort'])
+        self.assertEqual(plan_problems('postgresql', [
+            'Index Scan using doctor_name_idx on doctors_doctor  (cost=0.28..8.29 rows=1 width=8)',
+        ]), [])
+
+    def test_expected_findings_are_narrow(self):
+        from .management.commands.explain_hotpaths import EXPECTED, expected_reason
+
+        self.assertFalse([route for route, patterns in EXPECTED.items() for pattern, _ in patterns if not pattern])
+        self.assertIsNone(expected_reason('mapping-list-create', 'SELECT 1 FROM "mappings_patientdoctormapping"'))
+
+    def test_hot_paths_use_indexes(self):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            self.skipTest(f"EXPLAIN parsing is not implemented for {connection.vendor}")
+        out = StringIO()
+        call_command('explain_hotpaths', rows=200, stdout=out)
+        self.assertIn('0 unexpected', out.getvalue())
@@ -1,8 +1,15 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the read endpoints are served by native async views
+reads = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.mapping_list_create, name='mapping-list-create'),
-    path('<int:patient_id>/', views.patient_doctors, name='patient-doctors'),
+    path('<int:patient_id>/', reads.patient_doctors, name='patient-doctors'),
+    path('<int:patient_id>/batch/', views.patient_doctors_batch, name='patient-doctors-batch'),
+    path('doctor/<int:doctor_id>/', views.doctor_patients, name='doctor-patients'),
     path('delete/<int:pk>/', views.mapping_delete, name='mapping-delete'),
+    path('export/<str:export_format>/', views.mapping_export, name='mapping-export'),
 ]
\ No newline at end of file
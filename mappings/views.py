@@ -2,14 +2,25 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db import IntegrityError, transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from dashboard import services as dashboard_services
+from healthcare_backend.exports import stream_export
+from healthcare_backend.throttling import throttle_scope
 from .models import PatientDoctorMapping
+from .pagination import CaseloadCursorPagination
 from .serializers import (
     PatientDoctorMappingSerializer, 
     PatientDoctorMappingCreateSerializer,
-    PatientDoctorMappingDoctorOnlySerializer
+    PatientDoctorMappingExportSerializer,
+    PatientDoctorBatchSerializer,
+    mapping_projection,
+    mapping_doctor_only_projection,
+    mapping_patient_only_projection
 )
 
+@throttle_scope('list')
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def mapping_list_create(request):
@@ -18,17 +29,20 @@ def mapping_list_create(request):
     POST: Create a new patient-doctor mapping
     """
     if request.method == 'GET':
-        # Get mappings for patients created by the authenticated user
-        from patients.models import Patient
-        user_patients = Patient.objects.filter(created_by=request.user)
-        mappings = PatientDoctorMapping.objects.filter(
-            patient__in=user_patients,
-            is_active=True
-        )
-        serializer = PatientDoctorMappingSerializer(mappings, many=True)
+        # Get mappings for patients created by the authenticated user, read
+        # from mapping_owner_active_idx, joining the nested patient, owner and
+        # doctor columns in the same query unless the requested fields leave
+        # them out
+        projection = mapping_projection.for_request(request)
+        mappings = list(projection.values(
+            PatientDoctorMapping.objects.filter(
+                owner=request.user,
+                is_active=True
+            ).order_by('-assigned_date', '-id')
+        ))
         return Response({
-            'count': mappings.count(),
-            'results': serializer.data
+            'count': len(mappings),
+            'results': projection.many(mappings)
         }, status=status.HTTP_200_OK)
     
     elif request.method == 'POST':
@@ -37,7 +51,9 @@ def mapping_list_create(request):
             context={'request': request}
         )
         if serializer.is_valid():
-            mapping = serializer.save()
+            # The dashboard counters are updated in the same transaction
+            with transaction.atomic():
+                mapping = serializer.save()
             return Response({
                 'message': 'Patient-doctor mapping created successfully',
                 'data': PatientDoctorMappingSerializer(mapping).data
@@ -51,24 +67,180 @@ def patient_doctors(request, patient_id):
     GET: Retrieve all doctors assigned to a specific patient
     """
     # Ensure the patient belongs to the authenticated user
-    from patients.models import Patient
-    from patients.serializers import PatientSerializer
-    
-    patient = get_object_or_404(Patient, pk=patient_id, created_by=request.user)
-    
-    mappings = PatientDoctorMapping.objects.filter(
-        patient=patient,
-        is_active=True
+    from patients.serializers import patient_projection
+
+    row = patient_projection.get(owned_patient(request, patient_id))
+    patient_details = care_team_details(row)
+
+    # Sparse fieldsets apply to the doctor entries
+    projection = mapping_doctor_only_projection.for_request(request)
+    mappings = care_team_rows(row['id'], projection)
+    return Response(care_team(patient_details, mappings, projection), status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def doctor_patients(request, doctor_id):
+    """
+    GET: Retrieve the authenticated user's patients actively assigned to a
+    doctor, newest assignment first and cursor-paginated
+    """
+    from doctors.models import Doctor
+    from doctors.serializers import doctor_projection
+
+    row = doctor_projection.get(Doctor.objects.filter(pk=doctor_id))
+    if row is None:
+        raise Http404
+
+    # Sparse fieldsets apply to the patient entries
+    projection = mapping_patient_only_projection.for_request(request)
+    mappings = projection.values(
+        PatientDoctorMapping.objects.filter(
+            doctor_id=doctor_id,
+            is_active=True,
+            patient__created_by=request.user
+        ),
+        'assigned_date',
+        'id'
     )
-    
-    # Use the doctor-only serializer to avoid repeating patient details
-    serializer = PatientDoctorMappingDoctorOnlySerializer(mappings, many=True)
-    
+    paginator = CaseloadCursorPagination()
+    page = paginator.paginate_queryset(mappings, request)
+    data = paginator.get_paginated_response(projection.many(page)).data
     return Response({
-        'patient_details': PatientSerializer(patient).data,
-        'doctors': serializer.data
+        'doctor_details': doctor_projection.to_representation(row),
+        **data
     }, status=status.HTTP_200_OK)
 
+# The care team steps below are shared with ``mappings.async_views``, which
+# only runs the queries differently
+
+def owned_patient(request, patient_id):
+    from patients.models import Patient
+
+    return Patient.objects.filter(pk=patient_id, created_by=request.user)
+
+def care_team_details(row):
+    """
+    Represent the patient row of a care team, raising Http404 when the
+    patient does not exist or belongs to another user
+    """
+    from patients.serializers import patient_projection
+
+    if row is None:
+        raise Http404
+    return patient_projection.to_representation(row)
+
+def care_team_rows(patient_id, projection=mapping_doctor_only_projection):
+    """
+    The patient's active mappings, read through ``projection``
+    """
+    return projection.values(
+        PatientDoctorMapping.objects.filter(
+            patient_id=patient_id,
+            is_active=True
+        )
+    )
+
+def care_team(patient_details, mappings, projection=mapping_doctor_only_projection):
+    """
+    Build the patient details plus active doctors payload
+    """
+    # Use the doctor-only projection to avoid repeating patient details
+    return {
+        'patient_details': patient_details,
+        'doctors': projection.many(mappings)
+    }
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def patient_doctors_batch(request, patient_id):
+    """
+    POST: Assign and unassign a list of doctors for a patient in one transaction
+    and return the resulting care team
+    """
+    from doctors.models import Doctor
+    from patients.models import Patient
+
+    patient = get_object_or_404(
+        Patient.objects.select_related('created_by'),
+        pk=patient_id,
+        created_by=request.user
+    )
+    serializer = PatientDoctorBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    assign = set(serializer.validated_data['assign'])
+    unassign = set(serializer.validated_data['unassign'])
+    notes = serializer.validated_data.get('notes')
+
+    missing = assign - set(Doctor.objects.filter(pk__in=assign).values_list('pk', flat=True))
+    if missing:
+        return Response({
+            'assign': [f"Invalid doctor ids: {sorted(missing)}"]
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            assigned, unassigned = _update_care_team(request.user, patient, assign, unassign, notes)
+    except IntegrityError:
+        # A concurrent request created one of the mappings first; nothing
+        # of this one was written or counted
+        return Response({
+            'assign': ["The care team was changed by another request, please retry."]
+        }, status=status.HTTP_409_CONFLICT)
+
+    from patients.serializers import PatientSerializer
+
+    payload = care_team(PatientSerializer(patient).data, care_team_rows(patient.pk))
+    payload.update({
+        'message': 'Care team updated successfully',
+        'assigned': assigned,
+        'unassigned': unassigned
+    })
+    return Response(payload, status=status.HTTP_200_OK)
+
+def _update_care_team(user, patient, assign, unassign, notes):
+    """
+    Apply a batch inside the caller's transaction and return the numbers of
+    doctors assigned and mappings removed
+    """
+    # Locking the existing rows keeps a concurrent batch from counting the
+    # same reactivation or removal; new pairs are guarded by the unique
+    # constraint, so no insert is skipped without failing the transaction
+    existing = dict(
+        PatientDoctorMapping.objects.select_for_update().filter(
+            patient=patient,
+            doctor_id__in=assign | unassign
+        ).order_by('doctor_id').values_list('doctor_id', 'is_active')
+    )
+    new_mappings = [
+        PatientDoctorMapping(patient=patient, doctor_id=doctor_id, notes=notes)
+        for doctor_id in sorted(assign - existing.keys())
+    ]
+    PatientDoctorMapping.objects.bulk_create(new_mappings)
+
+    inactive = [doctor_id for doctor_id in sorted(assign & existing.keys()) if not existing[doctor_id]]
+    if inactive:
+        PatientDoctorMapping.objects.filter(
+            patient=patient,
+            doctor_id__in=inactive
+        ).update(is_active=True)
+    # The bulk writes send no signals; count the newly active doctors
+    # after the write and the removed ones before it
+    dashboard_services.care_team_assigned(
+        user.pk,
+        patient.pk,
+        [mapping.doctor_id for mapping in new_mappings] + inactive
+    )
+
+    unassigned = 0
+    if unassign & existing.keys():
+        dashboard_services.care_team_unassigned(user.pk, patient.pk, unassign)
+        unassigned, _ = PatientDoctorMapping.objects.filter(
+            patient=patient,
+            doctor_id__in=unassign
+        ).delete()
+    return len(new_mappings) + len(inactive), unassigned
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def mapping_delete(request, pk):
@@ -81,7 +253,23 @@ def mapping_delete(request, pk):
         patient__created_by=request.user
     )
     
-    mapping.delete()
+    with transaction.atomic():
+        # Mappings have no delete signals, see dashboard.services
+        if mapping.is_active:
+            dashboard_services.care_team_unassigned(request.user.pk, mapping.patient_id, [mapping.doctor_id])
+        mapping.delete()
     return Response({
         'message': 'Patient-doctor mapping removed successfully'
     }, status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def mapping_export(request, export_format):
+    """
+    GET: Stream the authenticated user's active mappings as NDJSON or CSV
+    """
+    mappings = PatientDoctorMapping.objects.filter(
+        owner=request.user,
+        is_active=True
+    ).select_related('patient', 'doctor').order_by('-assigned_date', '-id')
+    return stream_export(mappings, PatientDoctorMappingExportSerializer, export_format, 'mappings')
@@ -0,0 +1,43 @@
+"""
+Async GET handlers for the patient read endpoints, routed under ASGI (see
+``healthcare_backend.async_views``). Each one runs the same steps as the GET
+branch of its sync view in ``patients.views`` and only issues the queries
+through the async ORM; other methods are served by that view.
+"""
+
+from healthcare_backend.async_views import afirst, async_read_view
+from healthcare_backend.conditional import (
+    detail_not_modified,
+    is_conditional,
+    not_modified,
+    updated_at_query
+)
+from . import views
+from .serializers import patient_projection
+
+@async_read_view(views.patient_list_create)
+async def patient_list_create(request):
+    """
+    GET: Retrieve the authenticated user's patients, one cursor page at a time
+    """
+    etag, last_modified = views.list_validators(request, await views.list_state(request.user.pk).aget())
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    projection, paginator, rows = views.list_page(request)
+    page = await paginator.apaginate_queryset(rows, request)
+    return views.list_response(projection, paginator, page, etag, last_modified)
+
+@async_read_view(views.patient_detail)
+async def patient_detail(request, pk):
+    """
+    GET: Retrieve a specific patient
+    """
+    patients = views.detail_queryset(request, pk)
+    if is_conditional(request):
+        response = detail_not_modified(request, pk, await afirst(updated_at_query(patients)))
+        if response is not None:
+            return response
+    projection = patient_projection.for_request(request)
+    return views.detail_response(projection, await projection.aget(patients, 'id', 'updated_at'))
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:04
+
+from django.db import migrations
+
+FTS_TABLE = 'patients_patient_fts'
+
+# (forward statements, reverse statements) per database vendor
+_POSTGRESQL_SQL = ((
+    "ALTER TABLE patients_patient ADD COLUMN search_vector tsvector",
+    r"""
+    CREATE FUNCTION patients_patient_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', translate(coalesce(NEW.email, ''), '@.', '  ')), 'B') ||
+            setweight(to_tsvector('simple',
+                translate(coalesce(NEW.phone, ''), '+-().', '     ') || ' ' ||
+                regexp_replace(coalesce(NEW.phone, ''), '\D', '', 'g')
+            ), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.medical_history, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "CREATE TRIGGER patients_patient_search_vector_trigger "
+    "BEFORE INSERT OR UPDATE OF name, email, phone, medical_history ON patients_patient "
+    "FOR EACH ROW EXECUTE PROCEDURE patients_patient_search_vector_update()",
+    # Touching an indexed column fires the trigger for existing rows
+    "UPDATE patients_patient SET name = name",
+    "CREATE INDEX patient_search_vector_idx ON patients_patient USING GIN (search_vector)",
+), (
+    "DROP TRIGGER IF EXISTS patients_patient_search_vector_trigger ON patients_patient",
+    "DROP FUNCTION IF EXISTS patients_patient_search_vector_update()",
+    "ALTER TABLE patients_patient DROP COLUMN IF EXISTS search_vector",
+))
+
+_SQLITE_DIGITS = "replace(replace(replace(replace(replace({0}.phone, '+', ''), '-', ''), ' ', ''), '(', ''), ')', '')"
+_SQLITE_INSERT = (
+    f"INSERT INTO {FTS_TABLE}(rowid, name, email, phone, phone_digits, medical_history) "
+    "VALUES (new.id, new.name, new.email, new.phone, " + _SQLITE_DIGITS.format('new') + ", new.medical_history);"
+)
+_SQLITE_SQL = ((
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "name, email, phone, phone_digits, medical_history, tokenize = 'unicode61')",
+    f"CREATE TRIGGER patients_patient_fts_insert AFTER INSERT ON patients_patient BEGIN {_SQLITE_INSERT} END",
+    "CREATE TRIGGER patients_patient_fts_update "
+    "AFTER UPDATE OF name, email, phone, medical_history ON patients_patient BEGIN "
+    f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; {_SQLITE_INSERT} END",
+    "CREATE TRIGGER patients_patient_fts_delete AFTER DELETE ON patients_patient BEGIN "
+    f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END",
+    f"INSERT INTO {FTS_TABLE}(rowid, name, email, phone, phone_digits, medical_history) "
+    "SELECT id, name, email, phone, " + _SQLITE_DIGITS.format('patients_patient') + ", medical_history "
+    "FROM patients_patient",
+), (
+    "DROP TRIGGER IF EXISTS patients_patient_fts_insert",
+    "DROP TRIGGER IF EXISTS patients_patient_fts_update",
+    "DROP TRIGGER IF EXISTS patients_patient_fts_delete",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+))
+
+SEARCH_INDEX_SQL = {
+    'postgresql': _POSTGRESQL_SQL,
+    'sqlite': _SQLITE_SQL,
+}
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Install the text index and its triggers.
+
+    On SQLite, migrations that rebuild ``patients_patient`` (most AlterField
+    operations) drop its triggers; such migrations must drop and recreate
+    the index around the rebuild with these statements.
+    """
+    forward, _ = SEARCH_INDEX_SQL.get(schema_editor.connection.vendor, ((), ()))
+    for statement in forward:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    _, reverse = SEARCH_INDEX_SQL.get(schema_editor.connection.vendor, ((), ()))
+    for statement in reverse:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0002_patient_owner_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0003_patient_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_by', '-updated_at'], name='patient_owner_updated_idx'),
+        ),
+    ]
@@ -26,6 +26,12 @@ class Patient(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves the per-user listing and its keyset pagination
+            models.Index(fields=['created_by', '-created_at', '-id'], name='patient_owner_created_idx'),
+            # Latest change to a user's patients, for the list validators
+            models.Index(fields=['created_by', '-updated_at'], name='patient_owner_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.email}"
@@ -0,0 +1,42 @@
+from healthcare_backend.pagination import KeysetPagination
+
+
+class PatientCursorPagination(KeysetPagination):
+    """
+    Cursor pagination matching Patient.Meta.ordering, with ``id`` as the
+    tie-breaker so the ordering is unique.
+    """
+    ordering = ('-created_at', '-id')
+
+
+class PatientSearchPagination(KeysetPagination):
+    """
+    Cursor pagination over ranked search results, best match first. Pages
+    are read through ``patients.search.PatientSearch`` instead of a queryset,
+    and the cursor carries the search's ranking snapshot, if it took one.
+    """
+    ordering = ('-score', '-id')
+
+    def paginate_queryset(self, search, request, view=None):
+        self.snapshot = None
+        position, reverse = self.start_page(request, search.model)
+        search.snapshot = self.snapshot
+        if self.wants_count(request):
+            self.count = search.count()
+        rows = search.fetch(self.page_ordering(reverse), position, self.page_size + 1, self._after)
+        self.snapshot = search.snapshot
+        return self.finish_page(rows, position, reverse)
+
+    def cursor_to_python(self, model, name, value):
+        if name == 'score':
+            return float(value)
+        return super().cursor_to_python(model, name, value)
+
+    def cursor_state(self):
+        return {'s': self.snapshot} if self.snapshot else {}
+
+    def load_cursor_state(self, payload):
+        snapshot = payload.get('s')
+        if snapshot is not None and not isinstance(snapshot, str):
+            raise ValueError
+        self.snapshot = snapshot
@@ -0,0 +1,187 @@
+"""
+Full-text search over a user's patients.
+
+The text index lives outside the ORM and is maintained by database triggers,
+so every write path (including ``bulk_create`` and raw updates) keeps it
+current. It is installed by ``patients/migrations/0003_patient_search_index.py``:
+
+* PostgreSQL: a ``search_vector`` tsvector column on ``patients_patient``
+  with a GIN index, filled by a ``BEFORE INSERT OR UPDATE`` trigger.
+* SQLite: an FTS5 table, ``patients_patient_fts``, keyed by the patient id
+  and filled by ``AFTER INSERT/UPDATE/DELETE`` triggers.
+
+Other backends fall back to case-insensitive substring matching without
+ranking. Name, email, phone (both as digit groups and as a single run of
+digits) and medical history are indexed; every search term must match, as a
+word prefix, in at least one of them.
+
+``ts_rank`` depends only on the row and the query, so PostgreSQL results are
+paged by a keyset over the score. ``bm25()`` also depends on corpus-wide
+statistics that shift with every write, so on SQLite the first page ranks all
+matches once and stores the ids and scores in the cache as a snapshot that the
+following pages read (``PATIENT_SEARCH_SNAPSHOT_TIMEOUT``).
+"""
+
+import re
+import secrets
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+
+from .models import Patient
+
+FTS_TABLE = 'patients_patient_fts'
+MAX_TERMS = 8
+SNAPSHOT_KEY = 'patients:search:{user}:{token}'
+
+# Backends with a text index (see patients/migrations/0003_patient_search_index.py)
+INDEXED_VENDORS = ('postgresql', 'sqlite')
+
+
+def search_terms(query):
+    """
+    Split a search string into at most ``MAX_TERMS`` lowercase word terms.
+    Only letters and digits survive, so terms are safe to embed in tsquery
+    and FTS5 match expressions.
+    """
+    return [term.lower() for term in re.findall(r'[^\W_]+', query or '')][:MAX_TERMS]
+
+
+class PatientSearch:
+    """
+    Ranked search over the patients of ``user``. Rows are dicts with the
+    patient ``id`` and a ``score`` where higher is more relevant; pages are
+    read by ``patients.pagination.PatientSearchPagination`` with keyset
+    semantics over the ``('-score', '-id')`` ordering. ``snapshot`` names the
+    SQLite ranking to page through; a new one is taken when it is missing or
+    expired, and ``self.snapshot`` then names that.
+    """
+    model = Patient
+
+    def __init__(self, user, terms, snapshot=None):
+        self.user = user
+        self.terms = terms
+        self.snapshot = snapshot
+        self.vendor = connection.vendor
+        self._ranked = None
+
+    def count(self):
+        if self.vendor == 'sqlite':
+            return len(self.ranked())
+        if self.vendor not in INDEXED_VENDORS:
+            return self._fallback().count()
+        sql, params = self._matches()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM ({sql}) AS matches', params)
+            return cursor.fetchone()[0]
+
+    def fetch(self, ordering, position, limit, after):
+        """
+        Return up to ``limit`` ``{'id', 'score'}`` rows in ``ordering`` after
+        ``position``; ``after`` builds the ORM filter for the fallback.
+        """
+        if self.vendor not in INDEXED_VENDORS:
+            queryset = self._fallback().order_by(*ordering)
+            if position is not None:
+                queryset = queryset.filter(after(position, ordering))
+            return list(queryset.values('id', 'score')[:limit])
+        if self.vendor == 'sqlite':
+            return self._page(self.ranked(), ordering, position, limit)
+
+        sql, params = self._matches()
+        where, where_params = '', []
+        if position is not None:
+            clauses, equal = [], []
+            for field, value in zip(ordering, position):
+                name = field.lstrip('-')
+                operator = '<' if field.startswith('-') else '>'
+                clauses.append('(' + ' AND '.join(equal + [f'{name} {operator} %s']) + ')')
+                where_params.extend([item for _, item in zip(equal, position)] + [value])
+                equal.append(f'{name} = %s')
+            where = 'WHERE ' + ' OR '.join(clauses)
+        order_by = ', '.join(
+            f"{field.lstrip('-')} {'DESC' if field.startswith('-') else 'ASC'}" for field in ordering
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id, score FROM ({sql}) AS matches {where} ORDER BY {order_by} LIMIT %s',
+                params + where_params + [limit]
+            )
+            return [{'id': pk, 'score': score} for pk, score in cursor.fetchall()]
+
+    def ranked(self):
+        """
+        Return every match as an ``(id, score)`` pair, best first, from the
+        snapshot, taking one if needed
+        """
+        if self._ranked is None:
+            entry = None
+            if self.snapshot:
+                entry = cache.get(SNAPSHOT_KEY.format(user=self.user.pk, token=self.snapshot))
+            if entry is not None and entry[0] == self.terms:
+                self._ranked = entry[1]
+            else:
+                sql, params = self._matches()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'SELECT id, score FROM ({sql}) AS matches ORDER BY score DESC, id DESC', params)
+                    self._ranked = cursor.fetchall()
+                self.snapshot = secrets.token_urlsafe(12)
+                cache.set(
+                    SNAPSHOT_KEY.format(user=self.user.pk, token=self.snapshot),
+                    (self.terms, self._ranked),
+                    settings.PATIENT_SEARCH_SNAPSHOT_TIMEOUT
+                )
+        return self._ranked
+
+    @staticmethod
+    def _page(ranked, ordering, position, limit):
+        """
+        Page through best-first ``ranked`` pairs with keyset semantics
+        """
+        def key(row):
+            # Ascending along the best-first order
+            return (-row[1], -row[0])
+
+        if position is not None:
+            # ``position`` is ``(score, id)`` in either direction
+            bound = (-position[0], -position[1])
+        if ordering[0].startswith('-'):
+            start = 0 if position is None else bisect_right(ranked, bound, key=key)
+            rows = ranked[start:start + limit]
+        else:
+            end = len(ranked) if position is None else bisect_left(ranked, bound, key=key)
+            rows = ranked[max(0, end - limit):end][::-1]
+        return [{'id': pk, 'score': score} for pk, score in rows]
+
+    def _matches(self):
+        """
+        SQL selecting ``id`` and ``score`` for every match
+        """
+        if self.vendor == 'postgresql':
+            # ts_rank() is float4; as float8 the score survives the cursor's
+            # round trip exactly
+            return (
+                "SELECT p.id AS id, ts_rank(p.search_vector, q.query)::float8 AS score "
+                "FROM patients_patient p CROSS JOIN to_tsquery('simple', %s) AS q(query) "
+                "WHERE p.created_by_id = %s AND p.search_vector @@ q.query",
+                [' & '.join(f'{term}:*' for term in self.terms), self.user.pk]
+            )
+        # bm25() is lower for better matches; negate it so both backends sort descending
+        return (
+            f"SELECT p.id AS id, -bm25({FTS_TABLE}, 10.0, 4.0, 4.0, 4.0, 1.0) AS score "
+            f"FROM {FTS_TABLE} JOIN patients_patient p ON p.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND p.created_by_id = %s",
+            [' '.join(f'"{term}"*' for term in self.terms), self.user.pk]
+        )
+
+    def _fallback(self):
+        queryset = Patient.objects.filter(created_by=self.user)
+        for term in self.terms:
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(email__icontains=term) |
+                Q(phone__icontains=term) | Q(medical_history__icontains=term)
+            )
+        return queryset.annotate(score=Value(0.0, output_field=FloatField()))
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from healthcare_backend.projections import ValuesProjection
 from .models import Patient
 
 class PatientSerializer(serializers.ModelSerializer):
@@ -42,4 +43,15 @@ class PatientUpdateSerializer(PatientSerializer):
     """
     Serializer for updating patients
     """
-    pass
\ No newline at end of file
+    pass
+
+class PatientBulkItemSerializer(PatientSerializer):
+    """
+    Serializer for one row of a bulk create. Email uniqueness is checked
+    once for the whole batch by the view instead of per row.
+    """
+    def validate_email(self, value):
+        return value
+
+# Read path for GETs: the owner's __str__ is its email, fetched with a join
+patient_projection = ValuesProjection(PatientSerializer, sources={'created_by': 'created_by__email'})
@@ -1,3 +1,359 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from healthcare_backend.testing import seed_dataset
+from .models import Patient
+from .serializers import PatientSerializer
+
+User = get_user_model()
+
+
+class PatientExportTests(APITestCase):
+    """
+    Streaming NDJSON/CSV export of the authenticated user's patients
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+        cls.patients, _, _ = seed_dataset(cls.user, 25)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def export(self, export_format):
+        response = self.client.get(reverse('patient-export', args=[export_format]))
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson_rows_match_the_api_representation(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(len(rows), 25)
+        expected = PatientSerializer(Patient.objects.get(pk=rows[0]['id'])).data
+        self.assertEqual(rows[0], json.loads(json.dumps(expected)))
+
+    def test_csv_has_a_header_and_one_line_per_patient(self):
+        rows = list(csv.reader(io.StringIO(self.export('csv'))))
+        self.assertEqual(rows[0], list(PatientSerializer().fields))
+        self.assertEqual(len(rows), 26)
+
+    def test_export_is_scoped_to_the_owner(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.export('ndjson'), '')
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('patient-export', args=['xml']))
+        self.assertEqual(response.status_code, 404)
+
+
+class PatientBulkCreateTests(APITestCase):
+    """
+    Bulk creation with set-based email validation
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.existing = Patient.objects.create(
+            name='Existing', email='existing@example.test', phone='+1-555-0100',
+            date_of_birth='1980-01-01', gender='M', address='1 Street', created_by=cls.user
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def payload(self, email, **overrides):
+        payload = {
+            'name': 'Bulk Patient', 'email': email, 'phone': '+1-555-0101',
+            'date_of_birth': '1990-05-15', 'gender': 'F', 'address': '2 Street',
+        }
+        payload.update(overrides)
+        return payload
+
+    def test_all_valid_rows_are_created(self):
+        items = [self.payload(f'new{i}@example.test') for i in range(5)]
+        with self.settings(PATIENT_BULK_BATCH_SIZE=2):
+            response = self.client.post(reverse('patient-bulk-create'), items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(Patient.objects.filter(created_by=self.user).count(), 6)
+        self.assertEqual(response.data['data'][0]['created_by'], self.user.email)
+
+    def test_invalid_rows_are_reported_without_aborting_the_batch(self):
+        items = [
+            self.payload('ok@example.test'),
+            self.payload('existing@example.test'),
+            self.payload('ok@example.test'),
+            self.payload('bad@example.test', gender='X'),
+            'not an object',
+        ]
+        response = self.client.post(reverse('patient-bulk-create'), items, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3, 4])
+        self.assertIn('email', response.data['errors'][0]['errors'])
+        self.assertIn('gender', response.data['errors'][2]['errors'])
+
+    def test_batch_with_no_valid_rows_is_rejected(self):
+        response = self.client.post(
+            reverse('patient-bulk-create'), [self.payload('existing@example.test')], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_request_body_must_be_a_list(self):
+        response = self.client.post(reverse('patient-bulk-create'), self.payload('x@example.test'), format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_oversized_batches_are_rejected(self):
+        with self.settings(PATIENT_BULK_MAX_ITEMS=1):
+            response = self.client.post(
+                reverse('patient-bulk-create'),
+                [self.payload('a@example.test'), self.payload('b@example.test')],
+                format='json'
+            )
+        self.assertEqual(response.status_code, 400)
+
+
+class PatientConditionalGetTests(APITestCase):
+    """
+    ETag/Last-Modified validators and 304 responses on patient reads
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+        cls.patients, _, _ = seed_dataset(cls.user, 3)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_detail_revalidation_runs_one_column_query(self):
+        url = reverse('patient-detail', args=[self.patients[0].pk])
+        first = self.client.get(url)
+        self.assertIn('Last-Modified', first)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_changes_after_an_update(self):
+        patient = self.patients[0]
+        url = reverse('patient-detail', args=[patient.pk])
+        etag = self.client.get(url)['ETag']
+        patient.name = 'Renamed'
+        patient.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_conditional_detail_of_another_users_patient_is_not_found(self):
+        url = reverse('patient-detail', args=[self.patients[0].pk])
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+    def test_list_etag_tracks_row_count_and_query_string(self):
+        url = reverse('patient-list-create')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.patients[-1].delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_validators_do_not_count_rows(self):
+        url = reverse('patient-list-create')
+        with CaptureQueriesContext(connection) as queries:
+            etag = self.client.get(url)['ETag']
+        self.assertFalse([query['sql'] for query in queries if 'COUNT(' in query['sql'].upper()])
+
+        patient = self.patients[0]
+        patient.name = 'Renamed'
+        patient.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PatientSparseFieldsetTests(APITestCase):
+    """
+    ``fields``/``exclude`` trim both the response and the selected columns
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.patients, _, _ = seed_dataset(cls.user, 5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_list_selects_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('patient-list-create'), {'fields': 'id,name', 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([set(row) for row in response.json()['results']], [{'id', 'name'}] * 2)
+        page_sql = queries[-1]['sql']
+        self.assertNotIn('medical_history', page_sql)
+        self.assertNotIn('address', page_sql)
+
+        # Cursor columns are fetched even when they are not rendered
+        response = self.client.get(response.json()['next'])
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_detail_exclude(self):
+        url = reverse('patient-detail', args=[self.patients[0].pk])
+        response = self.client.get(url, {'exclude': 'address,medical_history,created_by'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('address', response.json())
+        self.assertNotIn('created_by', response.json())
+        self.assertIn('ETag', response)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse('patient-list-create'), {'fields': 'id,ssn'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ssn', response.json()['fields'][0])
+
+
+class PatientSearchTests(APITestCase):
+    """
+    Ranked full-text search over the user's patients
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='owner@example.test', username='owner', name='Owner', password='Owner-Pass-123'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.test', username='other', name='Other', password='Other-Pass-123'
+        )
+        cls.patients, _, _ = seed_dataset(cls.user, 5)
+        base = {'phone': '+1 (555) 010-2030', 'date_of_birth': '1980-01-01', 'gender': 'F', 'address': 'x'}
+        cls.asthma_name = Patient.objects.create(
+            name='Asthma Clinic Referral', email='referral@example.test', created_by=cls.user, **base
+        )
+        cls.asthma_history = Patient.objects.create(
+            name='Jane Roe', email='jane.roe@mail.test', medical_history='Childhood asthma, mild.',
+            created_by=cls.user, **base
+        )
+        Patient.objects.create(
+            name='Asthma Elsewhere', email='elsewhere@example.test', created_by=cls.other, **base
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('patient-search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def names(self, query, **params):
+        return [row['name'] for row in self.search(query, **params)['results']]
+
+    def test_ranked_and_scoped_to_the_user(self):
+        self.assertEqual(self.names('asthma'), ['Asthma Clinic Referral', 'Jane Roe'])
+
+    def test_prefix_terms_must_all_match(self):
+        self.assertEqual(self.names('asth child'), ['Jane Roe'])
+        self.assertEqual(self.names('asthma nothing'), [])
+
+    def test_email_and_phone(self):
+        self.assertEqual(self.names('jane.roe'), ['Jane Roe'])
+        self.assertEqual(len(self.names('15550102030')), 2)
+        self.assertEqual(len(self.names('555 2030')), 2)
+
+    def test_index_follows_writes(self):
+        patient = self.asthma_history
+        patient.medical_history = 'Seasonal allergies.'
+        patient.save()
+        self.assertEqual(self.names('asthma'), ['Asthma Clinic Referral'])
+
+        Patient.objects.filter(pk=patient.pk).update(name='Jane Wheezy')
+        self.assertEqual(self.names('wheezy'), ['Jane Wheezy'])
+
+        patient.delete()
+        self.assertEqual(self.names('wheezy'), [])
+
+    def test_cursor_pagination(self):
+        first = self.search('patient', page_size=2, count='true')
+        self.assertEqual(first['count'], 5)
+        names = [row['name'] for row in first['results']]
+        second = self.client.get(first['next']).json()
+        names += [row['name'] for row in second['results']]
+        third = self.client.get(second['next']).json()
+        names += [row['name'] for row in third['results']]
+        self.assertIsNone(third['next'])
+        self.assertEqual(sorted(names), sorted(patient.name for patient in self.patients))
+
+        previous = self.client.get(second['previous']).json()
+        self.assertEqual(previous['results'], first['results'])
+
+    def test_pages_follow_the_first_pages_ranking(self):
+        first = self.search('patient', page_size=2)
+        names = [row['name'] for row in first['results']]
+        # A new, weak match and a rewritten row would move the cursor on a live ranking
+        Patient.objects.create(
+            name='Late Arrival', email='late@example.test', phone='1', date_of_birth='1990-01-01',
+            gender='M', address='x', medical_history='Transferred patient.', created_by=self.user
+        )
+        Patient.objects.filter(pk=self.patients[0].pk).update(medical_history='patient ' * 20)
+        second = self.client.get(first['next'] + '&count=true').json()
+        self.assertEqual(second['count'], 5)
+        names += [row['name'] for row in second['results']]
+        third = self.client.get(second['next']).json()
+        names += [row['name'] for row in third['results']]
+        self.assertIsNone(third['next'])
+        self.assertEqual(sorted(names), sorted(patient.name for patient in self.patients))
+
+    @skipUnless(connection.vendor == 'postgresql', 'the keyset over ts_rank scores is PostgreSQL only')
+    def test_scores_round_trip_through_the_cursor(self):
+        page, ids = self.search('patient', page_size=1), []
+        while True:
+            ids += [row['id'] for row in page['results']]
+            if not page['next']:
+                break
+            self.assertLessEqual(len(ids), 5)
+            page = self.client.get(page['next']).json()
+        self.assertEqual(sorted(ids), sorted(patient.pk for patient in self.patients))
+
+    def test_unknown_snapshot_starts_a_new_ranking(self):
+        first = self.search('patient', page_size=2)
+        cache.clear()
+        second = self.client.get(first['next'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.json()['results']), 2)
+
+    def test_sparse_fields(self):
+        self.assertEqual(self.search('jane', fields='id')['results'], [{'id': self.asthma_history.pk}])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get(reverse('patient-search'), {'q': ' -- '}).status_code, 400)
@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the read endpoints are served by native async views
+reads = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.patient_list_create, name='patient-list-create'),
-    path('<int:pk>/', views.patient_detail, name='patient-detail'),
+    path('', reads.patient_list_create, name='patient-list-create'),
+    path('bulk/', views.patient_bulk_create, name='patient-bulk-create'),
+    path('search/', views.patient_search, name='patient-search'),
+    path('<int:pk>/', reads.patient_detail, name='patient-detail'),
+    path('export/<str:export_format>/', views.patient_export, name='patient-export'),
 ]
\ No newline at end of file
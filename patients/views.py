@@ -2,35 +2,206 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models import OuterRef, Subquery
 from django.shortcuts import get_object_or_404
+from healthcare_backend.conditional import (
+    detail_not_modified,
+    detail_representation,
+    is_conditional,
+    list_etag,
+    not_modified,
+    set_validators,
+    updated_at_query
+)
+from dashboard import services as dashboard_services
+from dashboard.models import UserCounters
+from healthcare_backend.exports import stream_export
+from healthcare_backend.throttling import throttle_scope
 from .models import Patient
-from .serializers import PatientSerializer, PatientCreateSerializer, PatientUpdateSerializer
+from .pagination import PatientCursorPagination, PatientSearchPagination
+from .search import PatientSearch, search_terms
+from .serializers import (
+    PatientSerializer,
+    PatientCreateSerializer,
+    PatientUpdateSerializer,
+    PatientBulkItemSerializer,
+    patient_projection
+)
 
+User = get_user_model()
+
+
+def list_state(user_id):
+    """
+    One-row query for the patient list validators: the user's latest patient
+    update, read from ``patient_owner_updated_idx``, and their dashboard
+    counters, whose ``updated_at`` moves with every create and delete
+    """
+    counters = UserCounters.objects.filter(user_id=OuterRef('pk'))
+    return User.objects.filter(pk=user_id).values(
+        latest=Subquery(
+            Patient.objects.filter(created_by_id=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+        ),
+        total=Subquery(counters.values('total_patients')),
+        counted=Subquery(counters.values('updated_at'))
+    )
+
+
+def list_validators(request, state):
+    """
+    Return the ``(etag, last_modified)`` of a patient list page
+    """
+    last_modified = max((state[name] for name in ('latest', 'counted') if state[name]), default=None)
+    return list_etag(request, last_modified, state['total'], request.user.pk), last_modified
+
+
+# The GET steps below are shared with ``patients.async_views``, which only
+# runs the queries differently
+
+def list_page(request):
+    """
+    Return the ``(projection, paginator, rows)`` of a patient list page, whose
+    rows are read through the paginator
+    """
+    projection = patient_projection.for_request(request)
+    patients = Patient.objects.filter(created_by=request.user)
+    return projection, PatientCursorPagination(), projection.values(patients, 'created_at', 'id')
+
+
+def list_response(projection, paginator, page, etag, last_modified):
+    return set_validators(paginator.get_paginated_response(projection.many(page)), etag, last_modified)
+
+
+def detail_queryset(request, pk):
+    return Patient.objects.filter(pk=pk, created_by=request.user)
+
+
+def detail_response(projection, row):
+    data, etag, last_modified = detail_representation(projection, row)
+    return set_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified)
+
+@throttle_scope('list')
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def patient_list_create(request):
     """
-    GET: Retrieve all patients for the authenticated user
+    GET: Retrieve the authenticated user's patients, one cursor page at a time
     POST: Create a new patient
     """
     if request.method == 'GET':
-        patients = Patient.objects.filter(created_by=request.user)
-        serializer = PatientSerializer(patients, many=True)
-        return Response({
-            'count': patients.count(),
-            'results': serializer.data
-        }, status=status.HTTP_200_OK)
+        etag, last_modified = list_validators(request, list_state(request.user.pk).get())
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        projection, paginator, rows = list_page(request)
+        page = paginator.paginate_queryset(rows, request)
+        return list_response(projection, paginator, page, etag, last_modified)
     
     elif request.method == 'POST':
         serializer = PatientCreateSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            patient = serializer.save(created_by=request.user)
+            # The dashboard counters are updated in the same transaction
+            with transaction.atomic():
+                patient = serializer.save(created_by=request.user)
             return Response({
                 'message': 'Patient created successfully',
                 'data': PatientSerializer(patient).data
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def patient_search(request):
+    """
+    GET: Full-text search over the authenticated user's patients by name,
+    email, phone and medical history, ranked and cursor-paginated
+    """
+    terms = search_terms(request.query_params.get('q'))
+    if not terms:
+        return Response({
+            'q': ['Provide at least one letter or digit to search for.']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    projection = patient_projection.for_request(request)
+    paginator = PatientSearchPagination()
+    matches = paginator.paginate_queryset(PatientSearch(request.user, terms), request)
+    rows = {
+        row['id']: row
+        for row in projection.values(Patient.objects.filter(pk__in=[match['id'] for match in matches]).order_by(), 'id')
+    }
+    # Rows deleted between the two queries are skipped
+    data = projection.many(rows[match['id']] for match in matches if match['id'] in rows)
+    return paginator.get_paginated_response(data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def patient_bulk_create(request):
+    """
+    POST: Create many patients from a JSON array.
+
+    Rows are validated individually, email uniqueness is checked for the whole
+    batch (including duplicates inside it) in one query, and the valid rows are
+    inserted with bulk_create. Invalid rows are reported by index without
+    aborting the rest of the batch.
+    """
+    items = request.data
+    if not isinstance(items, list):
+        return Response({
+            'detail': 'Expected a list of patients.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.PATIENT_BULK_MAX_ITEMS:
+        return Response({
+            'detail': f'A bulk request may contain at most {settings.PATIENT_BULK_MAX_ITEMS} patients.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        serializer = PatientBulkItemSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    existing = set(
+        Patient.objects.filter(
+            created_by=request.user,
+            email__in={data['email'] for _, data in valid}
+        ).values_list('email', flat=True)
+    )
+    duplicate_error = ["A patient with this email already exists in your records."]
+    patients, seen = [], set()
+    for index, data in valid:
+        if data['email'] in existing or data['email'] in seen:
+            errors.append({'index': index, 'errors': {'email': duplicate_error}})
+            continue
+        seen.add(data['email'])
+        patients.append(Patient(created_by=request.user, **data))
+
+    if patients:
+        with transaction.atomic():
+            Patient.objects.bulk_create(patients, batch_size=settings.PATIENT_BULK_BATCH_SIZE)
+            # bulk_create sends no post_save signals
+            dashboard_services.patients_added(request.user.pk, len(patients))
+
+    errors.sort(key=lambda error: error['index'])
+    if not errors:
+        response_status = status.HTTP_201_CREATED
+    elif patients:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_400_BAD_REQUEST
+    return Response({
+        'message': f'{len(patients)} patients created successfully',
+        'created': len(patients),
+        'failed': len(errors),
+        'data': PatientSerializer(patients, many=True).data,
+        'errors': errors
+    }, status=response_status)
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def patient_detail(request, pk):
@@ -39,13 +210,19 @@ def patient_detail(request, pk):
     PUT: Update a patient
     DELETE: Delete a patient
     """
-    patient = get_object_or_404(Patient, pk=pk, created_by=request.user)
-    
     if request.method == 'GET':
-        serializer = PatientSerializer(patient)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        patients = detail_queryset(request, pk)
+        if is_conditional(request):
+            # Answer revalidation from the updated_at column alone
+            response = detail_not_modified(request, pk, next(iter(updated_at_query(patients)), None))
+            if response is not None:
+                return response
+        projection = patient_projection.for_request(request)
+        return detail_response(projection, projection.get(patients, 'id', 'updated_at'))
     
-    elif request.method == 'PUT':
+    patient = get_object_or_404(Patient, pk=pk, created_by=request.user)
+    
+    if request.method == 'PUT':
         serializer = PatientUpdateSerializer(
             patient, 
             data=request.data, 
@@ -64,3 +241,14 @@ def patient_detail(request, pk):
         return Response({
             'message': 'Patient deleted successfully'
         }, status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def patient_export(request, export_format):
+    """
+    GET: Stream all of the authenticated user's patients as NDJSON or CSV
+    """
+    patients = Patient.objects.filter(
+        created_by=request.user
+    ).select_related('created_by').order_by('-created_at', '-id')
+    return stream_export(patients, PatientSerializer, export_format, 'patients')